@@ -0,0 +1,314 @@
+"""
+Benchmark de carga de ponta a ponta do bot, sem acessar nenhum serviço real.
+
+Sobe servidores falsos do Draft5 (a partir do fixture salvo), da Serper, do Gemini e da Bot API
+do Telegram (ver benchmarks.fake_services), monta a aplicação real de bot.main e injeta updates
+de milhares de usuários simulados, cada um percorrendo o fluxo:
+
+    /start → Ver resultados → Ver mais jogos → Voltar ao menu → Fazer pergunta → pergunta
+
+(com RESULTS_INLINE_KEYBOARD=1, o padrão, "Ver mais jogos" é um toque no botão inline e não há
+"Voltar ao menu"). Cada etapa termina quando o bot envia ou edita a mensagem com o teclado seguinte
+(o "ponto de parada" do fluxo). Ao final são exibidos a vazão e os percentis de latência por etapa, além das falhas
+(respostas de erro do bot e etapas que passaram do tempo limite).
+
+As demais variáveis de ambiente do bot (LLM_MAX_CONCURRENCY, RESULTS_CACHE_TTL etc.) continuam
+valendo. Os limites de envio do Telegram ficam desligados, a não ser que --telegram-limits seja usado.
+
+Uso: python -m benchmarks.bench_load [--users 2000] [--concurrency 200] [--gemini-latency 1.0] ...
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+from benchmarks.fake_services import FakeServices, FakeServicesConfig, ServiceConfig
+
+QUESTIONS = (
+    "Qual foi o último resultado da FURIA?",
+    "Quem são os jogadores do time de CS2 da FURIA?",
+    "Como a FURIA está se preparando para o próximo campeonato?",
+    "O que aconteceu na última partida contra a Vitality?",
+    "Quais são as novidades da FURIA nesta semana?",
+    "Quando a FURIA foi fundada?",
+)
+
+
+@dataclass(frozen=True)
+class Step:
+    name: str
+    text: str
+    # Toque em um botão inline da última mensagem com teclado: 'text' é o callback_data
+    callback: bool = False
+
+
+def user_steps(question: str) -> tuple[Step, ...]:
+    from bot.consts import BUTTON_ACTIONS, RESULTS_PAGE_SIZE
+    from bot.handlers.results import RESULTS_CALLBACK_PREFIX, RESULTS_INLINE_KEYBOARD
+
+    if RESULTS_INLINE_KEYBOARD:
+        # A página seguinte edita a mensagem dos resultados, que fica no menu principal
+        results_steps = (Step("mais_jogos", f"{RESULTS_CALLBACK_PREFIX}{RESULTS_PAGE_SIZE}", callback=True),)
+    else:
+        results_steps = (
+            Step("mais_jogos", BUTTON_ACTIONS["SHOW_MORE"][0]),
+            Step("voltar", BUTTON_ACTIONS["BACK_TO_MAIN"][0]),
+        )
+    return (
+        Step("start", "/start"),
+        Step("resultados", BUTTON_ACTIONS["SHOW_RESULTS"][0]),
+        *results_steps,
+        Step("pedir_pergunta", BUTTON_ACTIONS["ASK_QUESTION"][0]),
+        Step("pergunta", question),
+    )
+
+
+def error_texts() -> tuple[str, ...]:
+    from bot import consts
+
+    return (consts.TEXT_RESULTS_ERROR, consts.TEXT_LLM_ERROR, consts.TEXT_LLM_OVERLOADED,
+            consts.TEXT_QUESTION_UNAVAILABLE, consts.TEXT_ERROR, consts.TEXT_FALLBACK_GENERAL,
+            consts.TEXT_MAIN_MENU_FALLBACK)
+
+
+class LoadGenerator:
+    """Injeta os updates dos usuários simulados na aplicação e mede o tempo de cada etapa."""
+
+    def __init__(self, application, services: FakeServices, args: argparse.Namespace, pool=None):
+        from bot.metrics import Histogram
+
+        self.application = application
+        self.pool = pool
+        self.args = args
+        self.loop = asyncio.get_running_loop()
+        self.inboxes: dict[int, asyncio.Queue] = {}
+        # Última mensagem com teclado de cada usuário (alvo dos toques em botões inline)
+        self.keyboard_messages: dict[int, int] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self.failures: dict[str, int] = {}
+        self.timeouts: dict[str, int] = {}
+        self.completed_users = 0
+        self._update_ids = iter(range(1, sys.maxsize))
+        self._errors = error_texts()
+        self._histogram_class = Histogram
+        services.on_telegram_call = self._on_telegram_call
+
+    def _on_telegram_call(self, method: str, chat_id: int | None, data: dict) -> None:
+        # Roda na thread dos servidores falsos
+        if chat_id in self.inboxes:
+            self.loop.call_soon_threadsafe(self.inboxes[chat_id].put_nowait, data)
+
+    def _update(self, user_id: int, step: Step):
+        from telegram import Update
+
+        user = {"id": user_id, "is_bot": False, "first_name": f"Usuário {user_id}"}
+        update_id = next(self._update_ids)
+        message = {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            "text": step.text,
+        }
+        if step.callback:
+            message.update(message_id=self.keyboard_messages.get(user_id, 0), text="", **{"from": {
+                "id": 1, "is_bot": True, "first_name": "FURIA Bot"}})
+            callback_query = {"id": str(update_id), "from": user, "chat_instance": str(user_id),
+                              "data": step.text, "message": message}
+            return Update.de_json({"update_id": update_id, "callback_query": callback_query}, self._bot)
+        if step.text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(step.text.split()[0])}]
+        return Update.de_json({"update_id": update_id, "message": message}, self._bot)
+
+    @property
+    def _bot(self):
+        return self.application.bot if self.application is not None else None
+
+    async def _submit(self, update) -> None:
+        if self.pool is not None:
+            # Como o processo principal com BOT_WORKERS: o update vai para o worker do usuário
+            self.pool.submit(update)
+        else:
+            await self.application.update_queue.put(update)
+
+    async def _run_step(self, user_id: int, step: Step) -> bool:
+        inbox = self.inboxes[user_id]
+        started_at = time.perf_counter()
+        await self._submit(self._update(user_id, step))
+        failed = False
+        try:
+            async with asyncio.timeout(self.args.step_timeout):
+                while True:
+                    data = await inbox.get()
+                    failed = failed or any(error in data.get("text", "") for error in self._errors)
+                    if data.get("reply_markup"):
+                        self.keyboard_messages[user_id] = data["message_id"]
+                        break
+        except TimeoutError:
+            self.timeouts[step.name] = self.timeouts.get(step.name, 0) + 1
+            return False
+
+        histogram = self.histograms.get(step.name)
+        if histogram is None:
+            histogram = self.histograms[step.name] = self._histogram_class()
+        histogram.observe(time.perf_counter() - started_at)
+        if failed:
+            self.failures[step.name] = self.failures.get(step.name, 0) + 1
+        return True
+
+    async def _run_user(self, index: int, slots: asyncio.Semaphore) -> None:
+        user_id = self.args.first_user_id + index
+        question = QUESTIONS[index % len(QUESTIONS)]
+        if self.args.unique_questions:
+            question = f"{question} (pergunta {index})"
+        async with slots:
+            self.inboxes[user_id] = asyncio.Queue()
+            try:
+                for step in user_steps(question):
+                    if not await self._run_step(user_id, step):
+                        return
+                    if self.args.think_time:
+                        await asyncio.sleep(self.args.think_time)
+                self.completed_users += 1
+            finally:
+                del self.inboxes[user_id]
+                self.keyboard_messages.pop(user_id, None)
+
+    async def run(self) -> float:
+        slots = asyncio.Semaphore(self.args.concurrency)
+        started_at = time.perf_counter()
+        await asyncio.gather(*(self._run_user(index, slots) for index in range(self.args.users)))
+        return time.perf_counter() - started_at
+
+    def report(self, elapsed: float, services: FakeServices) -> str:
+        steps = sum(h.count for h in self.histograms.values())
+        lines = [
+            f"Usuários: {self.args.users} (concorrência {self.args.concurrency}"
+            f"{f', {self.args.workers} workers' if self.pool else ''}), "
+            f"concluídos: {self.completed_users}, tempo total: {elapsed:.2f}s",
+            f"Vazão: {self.completed_users / elapsed:.1f} usuários/s, {steps / elapsed:.1f} etapas/s",
+            "",
+            f"{'etapa':<16}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'máx':>9}{'falhas':>8}{'timeouts':>10}",
+        ]
+        for step in user_steps(""):
+            histogram = self.histograms.get(step.name)
+            if histogram is None:
+                continue
+            p50, p95, p99 = (histogram.quantile(q) * 1000 for q in (0.5, 0.95, 0.99))
+            lines.append(
+                f"{step.name:<16}{histogram.count:>7}{p50:>7.0f}ms{p95:>7.0f}ms{p99:>7.0f}ms"
+                f"{histogram.max * 1000:>7.0f}ms{self.failures.get(step.name, 0):>8}{self.timeouts.get(step.name, 0):>10}"
+            )
+        lines.append("")
+        lines.append("Requisições aos serviços falsos: " + ", ".join(
+            f"{name}={count} ({services.errors[name]} com erro)" for name, count in services.requests.items()))
+        lines.append("Chamadas à Bot API: " + ", ".join(
+            f"{method}={count}" for method, count in sorted(services.telegram_calls.items())))
+        return "\n".join(lines)
+
+
+def configure_environment(services: FakeServices, args: argparse.Namespace, data_dir: str) -> None:
+    """Aponta o bot para os servidores falsos; precisa rodar antes de importar os módulos do bot."""
+    os.environ.update(services.urls)
+    os.environ.update({
+        "TELEGRAM_TOKEN": "123456:benchmark",
+        "GEMINI_API_KEY": "benchmark",
+        "SERPER_API_KEY": "benchmark",
+        "PERSISTENCE_DB_PATH": os.path.join(data_dir, "furia_bot.sqlite3"),
+        "SEARCH_CACHE_PATH": os.path.join(data_dir, "search_cache.sqlite3"),
+        "MATCH_STORE_PATH": os.path.join(data_dir, "matches.sqlite3"),
+        "NOTIFICATIONS_DB_PATH": os.path.join(data_dir, "notifications.sqlite3"),
+        "MEMORY_DB_PATH": os.path.join(data_dir, "memory.sqlite3"),
+        "KNOWLEDGE_INDEX_PATH": os.path.join(data_dir, "knowledge_index.pickle"),
+        "METRICS_PORT": "0",
+    })
+    if args.workers >= 2:
+        os.environ["ANSWER_CACHE_DB_PATH"] = os.path.join(data_dir, "answer_cache.sqlite3")
+    if not args.telegram_limits:
+        os.environ.setdefault("TELEGRAM_GLOBAL_RATE", "1000000")
+        os.environ.setdefault("TELEGRAM_CHAT_RATE", "1000000")
+        os.environ.setdefault("TELEGRAM_CHAT_BURST", "1000000")
+
+
+async def run_benchmark(args: argparse.Namespace) -> None:
+    config = FakeServicesConfig(
+        draft5=ServiceConfig(args.draft5_latency, error_rate=args.draft5_error_rate),
+        serper=ServiceConfig(args.serper_latency, error_rate=args.serper_error_rate),
+        gemini=ServiceConfig(args.gemini_latency, error_rate=args.gemini_error_rate),
+        telegram=ServiceConfig(args.telegram_latency, error_rate=args.telegram_error_rate),
+        gemini_chunk_interval=args.gemini_chunk_interval,
+    )
+    services = FakeServices(config).start()
+    with tempfile.TemporaryDirectory(prefix="furia_bench_") as data_dir:
+        configure_environment(services, args, data_dir)
+
+        from bot.knowledge_index import get_knowledge_index
+        from bot.main import build_application
+        from bot.metrics import metrics
+
+        logging.getLogger().setLevel(args.log_level)
+        # O cliente REST do Gemini avisa a cada conexão extra além do pool do urllib3
+        logging.getLogger("urllib3").setLevel(logging.ERROR)
+        if args.workers >= 2:
+            from bot.workers import WorkerPool
+
+            pool = WorkerPool(args.workers)
+            pool.start()
+            try:
+                await asyncio.to_thread(pool.wait_ready)
+                generator = LoadGenerator(None, services, args, pool=pool)
+                elapsed = await generator.run()
+            finally:
+                await asyncio.to_thread(pool.stop)
+                services.stop()
+        else:
+            get_knowledge_index()
+            application = build_application()
+            await application.initialize()
+            await application.post_init(application)
+            await application.start()
+            try:
+                generator = LoadGenerator(application, services, args)
+                elapsed = await generator.run()
+            finally:
+                await application.stop()
+                await application.shutdown()
+                await application.post_shutdown(application)
+                services.stop()
+
+    print(generator.report(elapsed, services))
+    # Com --workers, as métricas internas ficam nos processos dos workers
+    if args.bot_metrics and args.workers < 2:
+        print("\nMétricas internas do bot:")
+        print(metrics.summary())
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=2000, help="usuários simulados")
+    parser.add_argument("--concurrency", type=int, default=200, help="usuários ativos ao mesmo tempo")
+    parser.add_argument("--think-time", type=float, default=0.0, help="pausa entre as etapas de um usuário (s)")
+    parser.add_argument("--step-timeout", type=float, default=60.0, help="tempo máximo de uma etapa (s)")
+    parser.add_argument("--unique-questions", action="store_true",
+                        help="perguntas diferentes por usuário (sem acertos no cache de respostas)")
+    parser.add_argument("--telegram-limits", action="store_true",
+                        help="mantém os limites de envio do Telegram no rate limiter do bot")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="processos do bot (como BOT_WORKERS); com 2 ou mais, os updates são distribuídos por chat")
+    parser.add_argument("--first-user-id", type=int, default=10_000_000)
+    parser.add_argument("--log-level", default="WARNING", help="nível de log do bot durante o benchmark")
+    parser.add_argument("--bot-metrics", action="store_true", help="exibe também as métricas internas do bot")
+    for service, latency in (("draft5", 0.3), ("serper", 0.4), ("gemini", 1.0), ("telegram", 0.05)):
+        parser.add_argument(f"--{service}-latency", type=float, default=latency, help="latência média (s)")
+        parser.add_argument(f"--{service}-error-rate", type=float, default=0.0, help="fração de respostas com erro")
+    parser.add_argument("--gemini-chunk-interval", type=float, default=0.2,
+                        help="intervalo entre os pedaços do streaming do Gemini (s)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark(parse_args()))
@@ -0,0 +1,56 @@
+"""
+Benchmark da extração do __NEXT_DATA__ da página de resultados do Draft5.
+
+Compara o caminho antigo (BeautifulSoup + json.loads do payload inteiro) com o extrator
+rápido (varredura em streaming + decodificação apenas de props.pageProps.results).
+
+Uso: python -m benchmarks.bench_next_data [arquivo.html ...]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+from bot.next_data import NextDataScanner, RESULTS_PATH, extract_json_path, extract_next_data_bs4, find_next_data
+
+FIXTURES_DIR = Path(__file__).with_name("fixtures")
+CHUNK_SIZE = 16 * 1024
+
+
+def current_path(html: str):
+    return extract_next_data_bs4(html)['props']['pageProps']['results']
+
+
+def fast_path_streaming(html: str):
+    scanner = NextDataScanner()
+    for start in range(0, len(html), CHUNK_SIZE):
+        if scanner.feed(html[start:start + CHUNK_SIZE]):
+            break
+    return extract_json_path(scanner.json_text, RESULTS_PATH)
+
+
+def fast_path_full_document(html: str):
+    return extract_json_path(find_next_data(html), RESULTS_PATH)
+
+
+def bench(label: str, func, html: str, number: int) -> float:
+    best = min(timeit.repeat(lambda: func(html), number=number, repeat=5)) / number
+    print(f"  {label:<32} {best * 1000:9.3f} ms")
+    return best
+
+
+def main(paths):
+    for path in paths:
+        html = Path(path).read_text(encoding="utf-8")
+        expected = current_path(html)
+        assert fast_path_streaming(html) == expected, "extrator rápido divergiu do caminho antigo"
+        assert fast_path_full_document(html) == expected, "extrator rápido divergiu do caminho antigo"
+
+        print(f"{Path(path).name}: {len(html) / 1024:.0f} KiB, {len(expected)} partidas")
+        baseline = bench("BeautifulSoup + json.loads", current_path, html, 5)
+        streaming = bench("streaming + caminho JSON", fast_path_streaming, html, 50)
+        full = bench("documento inteiro + caminho JSON", fast_path_full_document, html, 50)
+        print(f"  speedup: {baseline / streaming:.1f}x (streaming), {baseline / full:.1f}x (documento inteiro)\n")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or sorted(FIXTURES_DIR.glob("*.html")))
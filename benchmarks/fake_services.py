@@ -0,0 +1,295 @@
+"""
+Servidores falsos do Draft5, da Serper, do Gemini e da Bot API do Telegram para os benchmarks.
+
+Todos rodam em um processo separado do bot e aceitam latência e taxa de erro configuráveis por
+serviço. O servidor do Telegram repassa ao processo do bot as mensagens enviadas (e editadas) em cada chat
+(ver FakeServices.on_telegram_call).
+
+Uso isolado (para apontar um bot rodando em outro processo):
+    python -m benchmarks.fake_services
+"""
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import tornado.httpserver
+import tornado.netutil
+import tornado.web
+
+FIXTURES_DIR = Path(__file__).with_name("fixtures")
+DRAFT5_FIXTURE = FIXTURES_DIR / "draft5_resultados.html"
+
+GEMINI_ANSWER = (
+    "A FURIA é uma organização brasileira de esports fundada em 2017. No CS2, o time é conhecido "
+    "pelo estilo agressivo e disputa os principais campeonatos internacionais. Vamos, FURIA! 🐾"
+)
+
+
+@dataclass
+class ServiceConfig:
+    """Comportamento de um serviço falso: latência média (s), variação relativa e taxa de erro (0 a 1)."""
+    latency: float = 0.0
+    jitter: float = 0.5
+    error_rate: float = 0.0
+
+    def delay(self) -> float:
+        if not self.latency:
+            return 0.0
+        return max(0.0, self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+@dataclass
+class FakeServicesConfig:
+    draft5: ServiceConfig = field(default_factory=lambda: ServiceConfig(latency=0.3))
+    serper: ServiceConfig = field(default_factory=lambda: ServiceConfig(latency=0.4))
+    gemini: ServiceConfig = field(default_factory=lambda: ServiceConfig(latency=1.0))
+    telegram: ServiceConfig = field(default_factory=lambda: ServiceConfig(latency=0.05))
+    # Intervalo entre os pedaços da resposta em streaming do Gemini
+    gemini_chunk_interval: float = 0.2
+    gemini_chunks: int = 4
+
+
+class _ServiceHandler(tornado.web.RequestHandler):
+    def initialize(self, services: "_ServerState", config: ServiceConfig, name: str):
+        self.services = services
+        self.config = config
+        self.name = name
+
+    async def prepare(self):
+        self.services.requests[self.name] += 1
+        delay = self.config.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        if self.config.should_fail():
+            self.services.errors[self.name] += 1
+            self.fail()
+
+    def fail(self):
+        self.send_error(500)
+
+    def write_json(self, payload) -> None:
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(payload))
+
+
+class Draft5Handler(_ServiceHandler):
+    async def get(self, *args):
+        self.set_header("Content-Type", "text/html; charset=utf-8")
+        self.finish(self.services.draft5_html)
+
+
+class SerperHandler(_ServiceHandler):
+    async def post(self, *args):
+        query = json.loads(self.request.body or b"{}").get("q", "")
+        organic = [
+            {
+                "title": f"FURIA - resultado {i + 1} para '{query}'",
+                "link": f"https://exemplo.com/furia/{i + 1}",
+                "snippet": f"Notícia {i + 1} sobre a FURIA: o time segue na disputa dos principais torneios de CS2.",
+            }
+            for i in range(8)
+        ]
+        self.write_json({"searchParameters": {"q": query}, "organic": organic})
+
+
+class GeminiHandler(_ServiceHandler):
+    def fail(self):
+        self.set_status(500)
+        self.write_json({"error": {"code": 500, "message": "Internal error", "status": "INTERNAL"}})
+
+    @staticmethod
+    def _candidate(text: str) -> dict:
+        return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}]}
+
+    async def post(self, model_method: str):
+        if not model_method.endswith(":streamGenerateContent"):
+            self.write_json(self._candidate(GEMINI_ANSWER))
+            return
+
+        # O transporte REST recebe o streaming como um array JSON entregue aos poucos
+        config = self.services.config
+        words = GEMINI_ANSWER.split(" ")
+        size = -(-len(words) // config.gemini_chunks)
+        self.set_header("Content-Type", "application/json")
+        for index, start in enumerate(range(0, len(words), size)):
+            text = " ".join(words[start:start + size]) + ("" if start + size >= len(words) else " ")
+            self.write(("[" if index == 0 else ",") + json.dumps(self._candidate(text)))
+            await self.flush()
+            if config.gemini_chunk_interval:
+                await asyncio.sleep(config.gemini_chunk_interval)
+        self.finish("]")
+
+
+class TelegramHandler(_ServiceHandler):
+    def fail(self):
+        # Simula o limite de envio do Telegram (429), que o bot deve respeitar e tentar de novo
+        self.set_status(429)
+        self.write_json({"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                         "parameters": {"retry_after": 1}})
+
+    def _arguments(self) -> dict:
+        if self.request.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(self.request.body or b"{}")
+        return {key: values[-1].decode() for key, values in self.request.body_arguments.items()}
+
+    async def post(self, token: str, method: str):
+        data = self._arguments()
+        chat_id = int(data["chat_id"]) if "chat_id" in data else None
+        result = True
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "FURIA Bot", "username": "furia_bench_bot",
+                      "can_join_groups": True, "can_read_all_group_messages": False,
+                      "supports_inline_queries": False}
+        elif method in ("sendMessage", "editMessageText"):
+            message_id = int(data["message_id"]) if "message_id" in data else next(self.services.message_ids)
+            result = {"message_id": message_id, "date": int(time.time()),
+                      "chat": {"id": chat_id, "type": "private"}, "text": data.get("text", "")}
+        self.services.record_telegram_call(method, chat_id, data, result)
+        self.write_json({"ok": True, "result": result})
+
+    get = post
+
+
+class _ServerState:
+    """Estado do processo dos servidores: contadores e a fila de eventos do Telegram para o processo do bot."""
+
+    def __init__(self, config: FakeServicesConfig, events):
+        self.config = config
+        self.events = events
+        self.draft5_html = DRAFT5_FIXTURE.read_text(encoding="utf-8")
+        self.requests = {name: 0 for name in ("draft5", "serper", "gemini", "telegram")}
+        self.errors = dict.fromkeys(self.requests, 0)
+        self.telegram_calls: dict[str, int] = {}
+        self.message_ids = itertools.count(1)
+
+    def record_telegram_call(self, method: str, chat_id: int | None, data: dict, result) -> None:
+        self.telegram_calls[method] = self.telegram_calls.get(method, 0) + 1
+        if method in ("sendMessage", "editMessageText"):
+            self.events.put((method, chat_id, {"text": data.get("text", ""), "reply_markup": data.get("reply_markup"),
+                                               "message_id": result["message_id"]}))
+
+    def applications(self) -> dict[str, tornado.web.Application]:
+        def app(name: str, pattern: str, handler: type[_ServiceHandler]) -> tornado.web.Application:
+            kwargs = {"services": self, "config": getattr(self.config, name), "name": name}
+            return tornado.web.Application([(pattern, handler, kwargs)])
+
+        return {
+            "draft5": app("draft5", r"/(.*)", Draft5Handler),
+            "serper": app("serper", r"/(.*)", SerperHandler),
+            "gemini": app("gemini", r"/v1beta/models/([^/]+)", GeminiHandler),
+            "telegram": app("telegram", r"/bot([^/]+)/(\w+)", TelegramHandler),
+        }
+
+
+async def _serve(config: FakeServicesConfig, control, events) -> None:
+    state = _ServerState(config, events)
+    servers, ports = [], {}
+    for name, application in state.applications().items():
+        sockets = tornado.netutil.bind_sockets(0, "127.0.0.1")
+        server = tornado.httpserver.HTTPServer(application)
+        server.add_sockets(sockets)
+        servers.append(server)
+        ports[name] = sockets[0].getsockname()[1]
+    control.send(ports)
+
+    # Espera o pedido de parada do processo do bot sem bloquear o loop
+    stop_requested = asyncio.Event()
+    asyncio.get_running_loop().add_reader(control.fileno(), stop_requested.set)
+    await stop_requested.wait()
+    control.recv()
+    for server in servers:
+        server.stop()
+    control.send({"requests": state.requests, "errors": state.errors, "telegram_calls": state.telegram_calls})
+
+
+def _run_process(config: FakeServicesConfig, control, events) -> None:
+    # Os erros injetados são esperados: não polui a saída do benchmark com o log de acesso
+    logging.getLogger("tornado.access").setLevel(logging.CRITICAL)
+    asyncio.run(_serve(config, control, events))
+
+
+class FakeServices:
+    """
+    Sobe os quatro servidores falsos em portas livres de 127.0.0.1, em um processo separado
+    (para não disputarem a CPU e o GIL com o bot medido).
+    """
+
+    def __init__(self, config: FakeServicesConfig | None = None):
+        self.config = config or FakeServicesConfig()
+        self.requests: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.telegram_calls: dict[str, int] = {}
+        self.ports: dict[str, int] = {}
+        # Chamado (em uma thread do processo do bot) a cada sendMessage/editMessageText recebido:
+        # (método, chat_id, {"text", "reply_markup", "message_id"})
+        self.on_telegram_call: Callable[[str, int | None, dict], None] | None = None
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._control = None
+        self._events = None
+        self._events_thread: threading.Thread | None = None
+
+    @property
+    def urls(self) -> dict[str, str]:
+        """Variáveis de ambiente que apontam o bot para os servidores falsos."""
+        return {
+            "DRAFT5_RESULTS_URL": f"http://127.0.0.1:{self.ports['draft5']}/equipe/330-FURIA/resultados",
+            "SERPER_SEARCH_URL": f"http://127.0.0.1:{self.ports['serper']}/search",
+            "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{self.ports['gemini']}",
+            "TELEGRAM_BASE_URL": f"http://127.0.0.1:{self.ports['telegram']}",
+        }
+
+    def _dispatch_events(self) -> None:
+        while (event := self._events.get()) is not None:
+            if self.on_telegram_call is not None:
+                self.on_telegram_call(*event)
+
+    def start(self) -> "FakeServices":
+        self._control, child_control = self._context.Pipe()
+        self._events = self._context.Queue()
+        self._process = self._context.Process(target=_run_process, args=(self.config, child_control, self._events),
+                                              name="fake-services", daemon=True)
+        self._process.start()
+        deadline = time.monotonic() + 30
+        while not self._control.poll(timeout=0.1):
+            if not self._process.is_alive() or time.monotonic() > deadline:
+                self._process.kill()
+                raise RuntimeError("Os servidores falsos não subiram.")
+        self.ports = self._control.recv()
+        self._events_thread = threading.Thread(target=self._dispatch_events, name="fake-services-events", daemon=True)
+        self._events_thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Para os servidores e guarda os contadores de requisições (requests, errors, telegram_calls)."""
+        if self._process is None:
+            return
+        self._control.send("stop")
+        if self._control.poll(timeout=10):
+            stats = self._control.recv()
+            self.requests, self.errors, self.telegram_calls = stats["requests"], stats["errors"], stats["telegram_calls"]
+        self._process.join(timeout=5)
+        self._events.put(None)
+        self._events_thread.join(timeout=5)
+        self._process = None
+
+
+if __name__ == "__main__":
+    services = FakeServices().start()
+    for variable, url in services.urls.items():
+        print(f"{variable}={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        services.stop()
@@ -0,0 +1,152 @@
+"""
+Gera o fixture 'draft5_resultados.html' usado pelos benchmarks.
+
+A página imita a estrutura da página de resultados do Draft5 (Next.js): bastante HTML
+renderizado antes de um <script id="__NEXT_DATA__"> com props.pageProps.results e
+outros dados da página. O gerador é determinístico (seed fixa).
+
+Uso: python -m benchmarks.fixtures.make_draft5_fixture [quantidade_de_partidas]
+"""
+import json
+import random
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+FIXTURE_PATH = Path(__file__).with_name("draft5_resultados.html")
+
+TEAM_FURIA = {"teamId": 330, "teamName": "FURIA", "teamSlug": "330-FURIA", "teamLogo": "/img/teams/330.png"}
+OPPONENTS = [
+    "MIBR", "paiN", "Imperial", "G2", "Natus Vincere", "Vitality", "FaZe", "Team Liquid", "MOUZ", "Spirit",
+    "Heroic", "Complexity", "The MongolZ", "Virtus.pro", "Astralis", "Eternal Fire", "Falcons", "ODDIK",
+    "Legacy", "9z", "BESTIA", "Fluxo", "Sharks", "RED Canids",
+]
+TOURNAMENTS = [
+    "PGL Bucharest 2025", "BLAST Open Lisbon 2025", "IEM Katowice 2025", "PGL Cluj-Napoca 2025",
+    "BLAST Bounty 2025 Season 1", "Perfect World Shanghai Major 2024", "IEM Rio 2024", "ESL Pro League Season 20",
+    "Thunderpick World Championship 2024", "BLAST Premier Fall Final 2024",
+]
+
+
+def make_match(rng: random.Random, match_id: int, timestamp: int) -> dict:
+    opponent_name = rng.choice(OPPONENTS)
+    opponent = {
+        "teamId": 1000 + OPPONENTS.index(opponent_name),
+        "teamName": opponent_name,
+        "teamSlug": f"{1000 + OPPONENTS.index(opponent_name)}-{opponent_name.replace(' ', '-')}",
+        "teamLogo": f"/img/teams/{1000 + OPPONENTS.index(opponent_name)}.png",
+    }
+    best_of = rng.choice([1, 3, 3, 3, 5])
+    winning = best_of // 2 + 1
+    losing = rng.randint(0, winning - 1)
+    furia_won = rng.random() < 0.55
+    furia_score, opponent_score = (winning, losing) if furia_won else (losing, winning)
+    furia_is_a = rng.random() < 0.5
+    tournament_name = rng.choice(TOURNAMENTS)
+    maps = [
+        {
+            "mapName": rng.choice(["Mirage", "Inferno", "Nuke", "Ancient", "Anubis", "Dust2", "Train"]),
+            "scoreA": rng.randint(3, 16),
+            "scoreB": rng.randint(3, 16),
+        }
+        for _ in range(furia_score + opponent_score)
+    ]
+    return {
+        "matchId": match_id,
+        "matchDate": timestamp,
+        "bestOf": best_of,
+        "isFinished": True,
+        "isLive": False,
+        "matchSlug": f"{match_id}-furia-vs-{opponent['teamSlug'].lower()}",
+        "teamA": TEAM_FURIA if furia_is_a else opponent,
+        "teamB": opponent if furia_is_a else TEAM_FURIA,
+        "seriesScoreA": furia_score if furia_is_a else opponent_score,
+        "seriesScoreB": opponent_score if furia_is_a else furia_score,
+        "tournament": {
+            "tournamentId": 5000 + TOURNAMENTS.index(tournament_name),
+            "tournamentName": tournament_name,
+            "tournamentSlug": tournament_name.lower().replace(" ", "-"),
+            "tournamentLogo": f"/img/tournaments/{5000 + TOURNAMENTS.index(tournament_name)}.png",
+        },
+        "maps": maps,
+        "streams": [{"name": "Gaules", "url": "https://twitch.tv/gaules"}],
+    }
+
+
+def render_match_html(match: dict) -> str:
+    date = datetime.fromtimestamp(match["matchDate"], tz=timezone.utc).strftime("%d/%m/%Y")
+    return (
+        f'<a class="MatchCardSimple__MatchContainer-sc-wcmxha-0 kXbqjZ" href="/partidas/{match["matchSlug"]}">'
+        f'<div class="MatchCardSimple__Date-sc-wcmxha-1 gPqXYz"><small>{date}</small></div>'
+        f'<div class="MatchCardSimple__Team-sc-wcmxha-2 hKdSwQ"><img src="{match["teamA"]["teamLogo"]}" alt=""/>'
+        f'<span>{match["teamA"]["teamName"]}</span><span class="score">{match["seriesScoreA"]}</span></div>'
+        f'<div class="MatchCardSimple__Team-sc-wcmxha-2 hKdSwQ"><img src="{match["teamB"]["teamLogo"]}" alt=""/>'
+        f'<span>{match["teamB"]["teamName"]}</span><span class="score">{match["seriesScoreB"]}</span></div>'
+        f'<div class="MatchCardSimple__Tournament-sc-wcmxha-3 iWcLxP">{match["tournament"]["tournamentName"]}</div>'
+        f'</a>'
+    )
+
+
+def build_fixture(match_count: int = 60) -> str:
+    rng = random.Random(330)
+    timestamp = 1745800000
+    matches = []
+    for i in range(match_count):
+        timestamp -= rng.randint(1, 6) * 86400
+        matches.append(make_match(rng, 30000 - i * 7, timestamp))
+
+    next_data = {
+        "props": {
+            "pageProps": {
+                "team": dict(TEAM_FURIA, country="Brasil", ranking=rng.randint(10, 20)),
+                "players": [
+                    {"playerId": 100 + i, "nickname": nick, "role": role}
+                    for i, (nick, role) in enumerate(
+                        [("FalleN", "IGL"), ("KSCERATO", "Rifler"), ("yuurih", "Rifler"),
+                         ("YEKINDAR", "Entry"), ("molodoy", "AWPer")]
+                    )
+                ],
+                "results": matches,
+                "pagination": {"page": 1, "perPage": match_count, "total": match_count * 4},
+                "seo": {"title": "FURIA - Resultados | DRAFT5", "description": "Resultados da FURIA. " * 20},
+            },
+            "__N_SSP": True,
+        },
+        "page": "/equipe/[teamSlug]/resultados",
+        "query": {"teamSlug": "330-FURIA"},
+        "buildId": "k2f8Qm1x9ZpLr7TnVw3Hc",
+        "isFallback": False,
+        "gssp": True,
+        "scriptLoader": [],
+    }
+
+    head = (
+        '<!DOCTYPE html><html lang="pt-BR"><head><meta charSet="utf-8"/>'
+        '<title>FURIA - Resultados | DRAFT5</title>'
+        + "".join(f'<link rel="preload" href="/_next/static/chunks/{i:04x}.js" as="script"/>' for i in range(40))
+        + '<style data-styled="true">' + "".join(
+            f".sc-{i}{{display:flex;padding:{i % 9}px {i % 7}px;color:#{i * 2654435761 % 0xFFFFFF:06x};}}"
+            for i in range(600)
+        ) + "</style></head>"
+    )
+    body = (
+        '<body><div id="__next"><header><nav>'
+        + "".join(f'<a href="/secao/{i}">Seção {i}</a>' for i in range(30))
+        + "</nav></header><main>"
+        + "".join(render_match_html(m) for m in matches)
+        + "</main><footer>" + "<p>DRAFT5 - Cobertura de CS no Brasil</p>" * 10 + "</footer></div>"
+    )
+    script = (
+        '<script id="__NEXT_DATA__" type="application/json">'
+        + json.dumps(next_data, ensure_ascii=False, separators=(",", ":")).replace("<", "\\u003c")
+        + "</script>"
+        + "".join(f'<script src="/_next/static/chunks/{i:04x}.js" defer=""></script>' for i in range(40))
+        + "</body></html>"
+    )
+    return head + body + script
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    FIXTURE_PATH.write_text(build_fixture(count), encoding="utf-8")
+    print(f"Fixture salvo em {FIXTURE_PATH} ({FIXTURE_PATH.stat().st_size / 1024:.0f} KiB, {count} partidas)")
@@ -0,0 +1,344 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+from bot.db import connect_sqlite
+from bot.text_normalization import light_stem, normalize_question
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.7"))
+# Palavras diferentes entre duas perguntas quase iguais só são aceitas como variações de escrita
+# (plural, erro de digitação) acima desta semelhança; números precisam ser idênticos
+_VARIANT_SIMILARITY = 0.8
+# Banco SQLite em que as respostas são compartilhadas entre os processos do bot (definido
+# automaticamente com BOT_WORKERS); vazio desativa e o cache fica só em memória
+ANSWER_CACHE_DB_PATH = os.getenv("ANSWER_CACHE_DB_PATH", "")
+# Respostas expiradas ficam no banco por mais este tempo, como reserva para quando a LLM estiver fora do ar
+ANSWER_CACHE_MAX_STALE = float(os.getenv("ANSWER_CACHE_MAX_STALE", str(24 * 3600)))
+# A limpeza das respostas antigas do banco roda a cada tantas gravações
+_PURGE_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    question_key TEXT PRIMARY KEY,
+    answer TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_answers_expires_at ON answers (expires_at);
+"""
+
+# MinHash com LSH: 16 bandas de 4 linhas. Duas perguntas com similaridade de Jaccard 0.7
+# caem no mesmo balde em pelo menos uma banda com ~99% de probabilidade.
+_NUM_PERMUTATIONS = 64
+_BANDS = 16
+_ROWS_PER_BAND = _NUM_PERMUTATIONS // _BANDS
+_SHINGLE_SIZE = 3
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest()) % _MERSENNE_PRIME | 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest()) % _MERSENNE_PRIME)
+    for i in range(_NUM_PERMUTATIONS)
+]
+
+
+def _shingles(text: str) -> set[str]:
+    if len(text) <= _SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + _SHINGLE_SIZE] for i in range(len(text) - _SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> tuple[int, ...]:
+    """Assinatura MinHash dos trigramas de caracteres de um texto já normalizado."""
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest())
+              for shingle in _shingles(text)]
+    return tuple(
+        min((a * value + b) % _MERSENNE_PRIME for value in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def _bands(signature: tuple[int, ...]):
+    for band in range(_BANDS):
+        yield band, hash(signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND])
+
+
+def _similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+    """Estimativa da similaridade de Jaccard a partir das assinaturas."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / _NUM_PERMUTATIONS
+
+
+def _is_variant(token: str, others: set[str]) -> bool:
+    return any(light_stem(token) == light_stem(other)
+               or SequenceMatcher(None, token, other).ratio() >= _VARIANT_SIMILARITY for other in others)
+
+
+def same_question(key_a: str, key_b: str) -> bool:
+    """
+    Confere se duas perguntas normalizadas parecidas (MinHash) perguntam a mesma coisa: os trigramas
+    não distinguem "AWPer em 2023" de "AWPer em 2024" nem um jogador de outro com nome parecido.
+    Os números têm que ser os mesmos e as demais palavras diferentes, variações umas das outras.
+    """
+    tokens_a, tokens_b = set(key_a.split()), set(key_b.split())
+    if {t for t in tokens_a if any(c.isdigit() for c in t)} != {t for t in tokens_b if any(c.isdigit() for c in t)}:
+        return False
+    return (all(_is_variant(token, tokens_b) for token in tokens_a - tokens_b)
+            and all(_is_variant(token, tokens_a) for token in tokens_b - tokens_a))
+
+
+@dataclass(slots=True)
+class _Entry:
+    answer: str
+    signature: tuple[int, ...]
+    expires_at: float
+    size: int
+
+
+class SharedAnswerStore:
+    """
+    Respostas da LLM gravadas em SQLite, visíveis para todos os processos do bot.
+
+    Só guarda acertos exatos (pela pergunta normalizada): as perguntas quase iguais continuam sendo
+    procuradas no cache em memória de cada processo. Todo acesso ao banco roda em uma thread.
+    """
+
+    def __init__(self, path: str = ANSWER_CACHE_DB_PATH, max_stale: float = ANSWER_CACHE_MAX_STALE):
+        self.path = path
+        self.max_stale = max_stale
+        self._connection = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = connect_sqlite(self.path)
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def _get(self, key: str) -> tuple[str, float] | None:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT answer, expires_at FROM answers WHERE question_key = ?", (key,)).fetchone()
+
+    def _put(self, key: str, answer: str, expires_at: float) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO answers (question_key, answer, expires_at) VALUES (?, ?, ?)",
+                    (key, answer, expires_at),
+                )
+                self._writes += 1
+                if self._writes % _PURGE_EVERY == 0:
+                    connection.execute("DELETE FROM answers WHERE expires_at < ?", (time.time() - self.max_stale,))
+
+    async def get(self, key: str) -> tuple[str, float] | None:
+        """Retorna (resposta, expiração em time.time()) da pergunta já normalizada, se houver."""
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, answer: str, expires_at: float) -> None:
+        await asyncio.to_thread(self._put, key, answer, expires_at)
+
+
+class AnswerCache:
+    """
+    Cache de respostas da LLM indexado pela pergunta normalizada.
+
+    - Perguntas iguais após a normalização (acentos, caixa, pontuação e stopwords) são acertos exatos;
+    - Perguntas quase iguais são encontradas por MinHash/LSH sobre trigramas de caracteres e só
+      contam como acerto se forem a mesma pergunta escrita de outro jeito (ver same_question);
+    - Entradas expiram após 'ttl' segundos e são removidas por LRU ao passar de 'max_entries'
+      ou 'max_bytes' (tamanho aproximado); as expiradas ainda servem de resposta degradada;
+    - Perguntas idênticas em andamento compartilham a mesma chamada (single-flight);
+    - Com 'shared', as respostas também são gravadas no banco compartilhado entre os processos, que
+      é consultado (get_shared) quando a pergunta não está na memória.
+    """
+
+    def __init__(self, ttl: float = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 max_bytes: int = ANSWER_CACHE_MAX_BYTES, similarity: float = ANSWER_CACHE_SIMILARITY,
+                 shared: SharedAnswerStore | None = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.similarity = similarity
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._buckets: dict[tuple[int, int], set[str]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._shared = shared
+        self._shared_writes: set[asyncio.Task] = set()
+        self._bytes = 0
+        self.stats = {
+            "exact_hits": 0, "near_hits": 0, "misses": 0, "shared_inflight": 0, "shared_hits": 0,
+            "evictions": 0, "expirations": 0, "stale_hits": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        hits = (self.stats["exact_hits"] + self.stats["near_hits"] + self.stats["shared_inflight"]
+                + self.stats["shared_hits"])
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def get(self, question: str, allow_expired: bool = False) -> str | None:
+        """
+        Retorna a resposta em cache para a pergunta (ou para uma quase igual), se houver.
+
+        Entradas expiradas continuam guardadas até saírem por LRU: com 'allow_expired' elas também
+        são retornadas, como resposta degradada quando a LLM está fora do ar.
+        """
+        key = normalize_question(question)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return entry.answer
+            if allow_expired:
+                self.stats["stale_hits"] += 1
+                return entry.answer
+            self.stats["expirations"] += 1
+
+        signature = minhash_signature(key)
+        best_key, best_similarity = None, 0.0
+        candidates = set()
+        for bucket in _bands(signature):
+            candidates.update(self._buckets.get(bucket, ()))
+        for candidate in candidates:
+            if not allow_expired and self._entries[candidate].expires_at <= now:
+                continue
+            if not same_question(key, candidate):
+                continue
+            similarity = _similarity(signature, self._entries[candidate].signature)
+            if similarity > best_similarity:
+                best_key, best_similarity = candidate, similarity
+
+        if best_key is not None and best_similarity >= self.similarity:
+            entry = self._entries[best_key]
+            if entry.expires_at > now:
+                self._entries.move_to_end(best_key)
+                self.stats["near_hits"] += 1
+            else:
+                self.stats["stale_hits"] += 1
+            logger.debug(f"Cache de respostas: '{key}' ~ '{best_key}' ({best_similarity:.2f}).")
+            return entry.answer
+
+        return None
+
+    async def get_shared(self, question: str, allow_expired: bool = False) -> str | None:
+        """
+        Procura a pergunta (acerto exato) no banco compartilhado entre os processos e, se encontrar,
+        guarda a resposta também na memória, com o tempo de vida que lhe resta.
+        """
+        if self._shared is None:
+            return None
+        key = normalize_question(question)
+        row = await self._shared.get(key)
+        if row is None:
+            return None
+        answer, expires_at = row
+        remaining = expires_at - time.time()
+        if remaining <= 0 and not allow_expired:
+            return None
+        self.put(key, answer, ttl=remaining)
+        self.stats["shared_hits" if remaining > 0 else "stale_hits"] += 1
+        return answer
+
+    def put(self, question: str, answer: str, ttl: float | None = None) -> None:
+        """Guarda a resposta para a pergunta, removendo as entradas menos usadas se necessário."""
+        key = normalize_question(question)
+        if key in self._entries:
+            self._remove(key)
+
+        signature = minhash_signature(key)
+        size = sys.getsizeof(key) + sys.getsizeof(answer) + _NUM_PERMUTATIONS * 8
+        self._entries[key] = _Entry(answer, signature, time.monotonic() + (self.ttl if ttl is None else ttl), size)
+        self._bytes += size
+        for bucket in _bands(signature):
+            self._buckets.setdefault(bucket, set()).add(key)
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for bucket in _bands(entry.signature):
+            keys = self._buckets.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[bucket]
+
+    # --- Single-flight ---
+
+    async def wait_inflight(self, question: str) -> str | None:
+        """Se a mesma pergunta já está sendo respondida, aguarda e retorna essa resposta."""
+        future = self._inflight.get(normalize_question(question))
+        if future is None:
+            return None
+        answer = await asyncio.shield(future)
+        if answer is not None:
+            self.stats["shared_inflight"] += 1
+        return answer
+
+    def start_flight(self, question: str) -> str:
+        """Registra que a pergunta está sendo respondida; retorna a chave a ser passada para finish_flight."""
+        key = normalize_question(question)
+        self.stats["misses"] += 1
+        if key not in self._inflight:
+            self._inflight[key] = asyncio.get_running_loop().create_future()
+        return key
+
+    def finish_flight(self, key: str, answer: str | None) -> None:
+        """Entrega a resposta (ou None em caso de falha) a quem esperava e a guarda no cache."""
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(answer)
+        if answer:
+            self.put(key, answer)
+            if self._shared is not None:
+                task = asyncio.create_task(self._publish(key, answer))
+                self._shared_writes.add(task)
+                task.add_done_callback(self._shared_writes.discard)
+
+    async def _publish(self, key: str, answer: str) -> None:
+        try:
+            await self._shared.put(key, answer, time.time() + self.ttl)
+        except Exception as e:
+            # Os outros processos só deixam de aproveitar esta resposta
+            logger.warning(f"Falha ao gravar a resposta no cache compartilhado: {e}")
+
+    def report(self) -> str:
+        s = self.stats
+        return (
+            f"Cache de respostas: {len(self)} entradas (~{self._bytes / 1024:.0f} KiB), "
+            f"taxa de acerto {self.hit_rate:.1%} (exatos={s['exact_hits']}, similares={s['near_hits']}, "
+            f"compartilhados={s['shared_inflight']}, de outros processos={s['shared_hits']}, falhas={s['misses']}), "
+            f"remoções={s['evictions']}, expirados={s['expirations']}, "
+            f"expirados servidos com a LLM fora do ar={s['stale_hits']}"
+        )
+
+
+answer_cache = AnswerCache(shared=SharedAnswerStore() if ANSWER_CACHE_DB_PATH else None)
+
+
+async def report_answer_cache_stats(context) -> None:
+    """Job do JobQueue que registra no log as métricas do cache de respostas."""
+    logger.info(answer_cache.report())
@@ -11,6 +11,8 @@ logger = logging.getLogger(__name__)
 
 STATE_MAIN_MENU, STATE_SHOWING_RESULTS, STATE_AWAITING_QUESTION = range(3)
 
+RESULTS_PAGE_SIZE = 5
+
 # --- Textos e Regex dos Botões ---
 # Estrutura: {NOME_AÇÃO: (Texto Visível, Padrão Regex)}
 BUTTON_ACTIONS = {
@@ -18,6 +20,7 @@ BUTTON_ACTIONS = {
     "ASK_QUESTION": ("Fazer alguma pergunta", rf"^{re.escape('Fazer alguma pergunta')}$"),
     "SHOW_MORE": ("Ver mais jogos", rf"^{re.escape('Ver mais jogos')}$"),
     "BACK_TO_MAIN": ("Voltar ao menu principal", rf"^{re.escape('Voltar ao menu principal')}$"),
+    "NOTIFICATIONS": ("🔔 Avisos de resultados", rf"^{re.escape('🔔 Avisos de resultados')}$"),
     "EXIT": ("/sair", rf"^{re.escape('/sair')}$"),
 }
 
@@ -25,6 +28,7 @@ BUTTON_ACTIONS = {
 MENU_OPTIONS = [
     [BUTTON_ACTIONS["SHOW_RESULTS"][0]],
     [BUTTON_ACTIONS["ASK_QUESTION"][0]],
+    [BUTTON_ACTIONS["NOTIFICATIONS"][0]],
     [BUTTON_ACTIONS["EXIT"][0]]
 ]
 MENU_MARKUP = ReplyKeyboardMarkup(MENU_OPTIONS, one_time_keyboard=True, resize_keyboard=True)
@@ -49,7 +53,13 @@ TEXT_SEARCHING_MORE_RESULTS = "🔍 Buscando mais resultados..."
 TEXT_NO_MORE_RESULTS = "Não encontrei mais resultados."
 TEXT_NO_RESULTS_FOUND = "Não encontrei resultados recentes."
 TEXT_RESULTS_ERROR = "Desculpe, não consegui buscar os resultados agora. Tente novamente mais tarde."
+TEXT_NOTIFICATIONS_ON = "🔔 Pronto! Você vai receber uma mensagem sempre que sair um resultado novo da FURIA. Para parar, toque no botão de novo ou use /avisos."
+TEXT_NOTIFICATIONS_OFF = "🔕 Você não vai mais receber os avisos de resultados. Para voltar a receber, toque no botão de novo ou use /avisos."
+TEXT_NOTIFICATIONS_ERROR = "Desculpe, não consegui alterar os avisos agora. Tente novamente mais tarde."
 TEXT_QUESTION_UNAVAILABLE = "Desculpe, a função de perguntas está temporariamente indisponível."
 TEXT_LLM_ERROR = "Desculpe, não consegui gerar uma resposta neste momento. Tente novamente mais tarde."
+TEXT_LLM_DEGRADED = "⚠️ Não consegui gerar uma resposta nova agora; esta é a última resposta que dei para essa pergunta:"
+TEXT_LLM_OVERLOADED = "Estou recebendo muitas perguntas agora 😅 Tente novamente em alguns instantes."
+TEXT_LLM_BLOCKED = "Desculpe, não posso responder a essa pergunta devido às políticas de segurança."
 TEXT_LLM_DISCLAIMER = "_Resposta gerada por IA. Informações atuais dependem da busca de contexto._"
 TEXT_AWAITING_QUESTION_FALLBACK = "Por favor, digite sua pergunta ou use /cancel para voltar ao menu."
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from bot.match_store import get_results_page
+from bot.retriever import get_furia_snippets
+from bot.text_normalization import strip_accents
+
+logger = logging.getLogger(__name__)
+
+# Prazos (em segundos) de cada fonte de contexto
+CONTEXT_DEADLINE_WEB = float(os.getenv("CONTEXT_DEADLINE_WEB", "3.0"))
+CONTEXT_DEADLINE_DRAFT5 = float(os.getenv("CONTEXT_DEADLINE_DRAFT5", "1.0"))
+DRAFT5_CONTEXT_MATCHES = 10
+
+_RESULTS_QUESTION_RE = re.compile(
+    r"\b(jogo|jogos|partida|partidas|resultado|resultados|placar|venceu|vencemos|ganhou|ganhamos|perdeu|"
+    r"perdemos|vitoria|vitorias|derrota|derrotas|contra|campeonato|torneio|major|serie|ultimo|ultima)\b"
+)
+
+
+@dataclass(frozen=True)
+class ContextSource:
+    """Uma fonte de contexto para as perguntas, com seu prazo máximo de resposta."""
+    name: str
+    fetch: Callable[[str], Awaitable[list[str] | None]]
+    deadline: float
+
+
+async def web_context(question: str) -> list[str] | None:
+    """Contexto da base local de conhecimento ou da busca na web (Serper)."""
+    return await get_furia_snippets(question)
+
+
+async def draft5_context(question: str) -> list[str] | None:
+    """Resultados recentes do Draft5 (do histórico local), apenas para perguntas sobre jogos."""
+    if not _RESULTS_QUESTION_RE.search(strip_accents(question.lower())):
+        return None
+
+    results = await get_results_page(0, DRAFT5_CONTEXT_MATCHES)
+    if not results:
+        return None
+
+    lines = [
+        f"- {r.date}: FURIA {r.furia_score} x {r.opponent_score} {r.opponent_name} ({r.tournament_name})"
+        for r in results
+    ]
+    return ["Últimos resultados da FURIA no CS (fonte: Draft5):\n" + "\n".join(lines)]
+
+
+CONTEXT_SOURCES = [
+    ContextSource("draft5", draft5_context, CONTEXT_DEADLINE_DRAFT5),
+    ContextSource("web", web_context, CONTEXT_DEADLINE_WEB),
+]
+
+# Buscas que estouraram o prazo continuam em segundo plano (e alimentam os caches)
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _forget_task(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug(f"Busca de contexto em segundo plano falhou: {task.exception()}")
+
+
+async def _run_source(source: ContextSource, question: str) -> list[str] | None:
+    task = asyncio.create_task(source.fetch(question), name=f"context:{source.name}")
+    _background_tasks.add(task)
+    task.add_done_callback(_forget_task)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), source.deadline)
+    except asyncio.TimeoutError:
+        logger.warning(f"Fonte de contexto '{source.name}' não respondeu em {source.deadline}s; seguindo sem ela.")
+        return None
+    except Exception as e:
+        logger.error(f"Erro na fonte de contexto '{source.name}': {e}")
+        return None
+
+
+async def gather_context(question: str, sources=None) -> list[str] | None:
+    """
+    Consulta todas as fontes de contexto ao mesmo tempo, cada uma com seu prazo,
+    e junta os trechos que voltarem a tempo (na ordem de CONTEXT_SOURCES).
+
+    Returns:
+        Os trechos de contexto ou None se nenhuma fonte trouxe informação.
+    """
+    sources = CONTEXT_SOURCES if sources is None else sources
+    parts = await asyncio.gather(*(_run_source(source, question) for source in sources))
+
+    found = [(source.name, part) for source, part in zip(sources, parts) if part]
+    if not found:
+        return None
+
+    logger.info(f"Contexto obtido das fontes: {', '.join(name for name, _ in found)}.")
+    return [snippet for _, part in found for snippet in part]
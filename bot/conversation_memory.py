@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+from bot.db import connect_sqlite
+from bot.prompt_builder import estimate_tokens, rank_snippets
+from bot.text_normalization import content_tokens, tokenize
+
+logger = logging.getLogger(__name__)
+
+MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", "furia_bot_data/memory.sqlite3")
+# Conversas paradas há mais que isso são esquecidas (a pergunta seguinte não é mais uma continuação)
+MEMORY_TTL = float(os.getenv("MEMORY_TTL", str(2 * 3600)))
+
+# --- Orçamento da memória no prompt ---
+# As últimas MEMORY_RECENT_TURNS trocas vão literalmente (cortadas em MEMORY_TURN_MAX_TOKENS cada); as
+# mais antigas viram uma linha do resumo, que guarda só as mais recentes dentro de MEMORY_SUMMARY_TOKEN_BUDGET.
+# Com os valores padrão a memória nunca passa de ~480 tokens, por mais longa que seja a conversa.
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "3"))
+MEMORY_TURN_MAX_TOKENS = int(os.getenv("MEMORY_TURN_MAX_TOKENS", "120"))
+MEMORY_SUMMARY_TOKEN_BUDGET = int(os.getenv("MEMORY_SUMMARY_TOKEN_BUDGET", "120"))
+_QUESTION_MAX_TOKENS = 30
+_SUMMARY_LINE_MAX_TOKENS = 40
+_CHARS_PER_TOKEN = 4
+# A limpeza das conversas esquecidas roda a cada tantas gravações
+_PURGE_EVERY = 256
+
+# Palavras que só fazem sentido com a conversa anterior ("e ele?", "quando foi isso?")
+_REFERENCE_WORDS = frozenset("""
+ele ela eles elas dele dela deles delas nele nela neles nelas esse essa esses essas isso desse dessa
+desses dessas disso nesse nessa nisso aquele aquela aquilo daquele daquela mesmo mesma anterior
+""".split())
+_CONTINUATION_WORDS = frozenset({"e", "mas", "entao", "tambem", "outro", "outra"})
+_FOLLOW_UP_MAX_CONTENT_TOKENS = 1
+
+_MARKDOWN_RE = re.compile(r"[*_#`]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    user_id INTEGER PRIMARY KEY,
+    summary TEXT NOT NULL,
+    turns TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_memory_updated_at ON memory (updated_at);
+"""
+
+
+def looks_like_follow_up(question: str) -> bool:
+    """Indica se a pergunta depende da conversa anterior ("e o time de valorant?", "quem é ele?")."""
+    tokens = tokenize(question)
+    if not tokens:
+        return False
+    return (tokens[0] in _CONTINUATION_WORDS or any(token in _REFERENCE_WORDS for token in tokens)
+            or len(content_tokens(question)) <= _FOLLOW_UP_MAX_CONTENT_TOKENS)
+
+
+def _compact(text: str, max_tokens: int) -> str:
+    """Texto sem Markdown e quebras de linha, cortado (em um espaço) para caber em 'max_tokens'."""
+    text = " ".join(_MARKDOWN_RE.sub("", text).split())
+    max_chars = max_tokens * _CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1].rsplit(" ", 1)[0] + "…"
+
+
+def _summary_line(question: str, answer: str) -> str:
+    """Resumo extrativo de uma troca: a pergunta e a frase da resposta mais relacionada a ela."""
+    sentences = [sentence for sentence in _SENTENCE_RE.split(_compact(answer, 10_000)) if sentence]
+    ranked = rank_snippets(question, sentences) if sentences else []
+    key_sentence = ranked[0][1] if ranked and ranked[0][0] > 0 else (sentences[0] if sentences else "")
+    return _compact(f"{question} → {key_sentence}", _SUMMARY_LINE_MAX_TOKENS)
+
+
+@dataclass(slots=True)
+class Memory:
+    """Memória de um usuário: as trocas antigas resumidas (uma linha cada) e as recentes na íntegra."""
+    summary: list[str] = field(default_factory=list)
+    turns: list[tuple[str, str]] = field(default_factory=list)
+
+    def add(self, question: str, answer: str) -> None:
+        self.turns.append((_compact(question, _QUESTION_MAX_TOKENS),
+                           _compact(answer, MEMORY_TURN_MAX_TOKENS - _QUESTION_MAX_TOKENS)))
+        while len(self.turns) > MEMORY_RECENT_TURNS:
+            self.summary.append(_summary_line(*self.turns.pop(0)))
+        while self.summary and estimate_tokens("\n".join(self.summary)) > MEMORY_SUMMARY_TOKEN_BUDGET:
+            self.summary.pop(0)
+
+    def render(self) -> str:
+        """Texto da memória para o prompt."""
+        parts = []
+        if self.summary:
+            parts.append("Resumo do que já foi conversado:\n" + "\n".join(f"- {line}" for line in self.summary))
+        if self.turns:
+            parts.append("Últimas mensagens:\n" + "\n".join(
+                f"Fã: {question}\nAssistente: {answer}" for question, answer in self.turns))
+        return "\n\n".join(parts)
+
+
+class ConversationMemory:
+    """
+    Memória curta das perguntas de cada usuário, em SQLite (fora do user_data da persistência).
+
+    Cada usuário tem uma linha com as últimas trocas e um resumo das anteriores, de tamanho
+    limitado (ver MEMORY_*): o prompt das perguntas de continuação não cresce com a conversa.
+    Todo acesso ao banco roda em uma thread, fora do event loop.
+    """
+
+    def __init__(self, path: str = MEMORY_DB_PATH, ttl: float = MEMORY_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._connection = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = connect_sqlite(self.path)
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def _read(self, connection, user_id: int) -> Memory | None:
+        row = connection.execute(
+            "SELECT summary, turns FROM memory WHERE user_id = ? AND updated_at >= ?",
+            (user_id, time.time() - self.ttl),
+        ).fetchone()
+        if row is None:
+            return None
+        return Memory(json.loads(row[0]), [tuple(turn) for turn in json.loads(row[1])])
+
+    def _get(self, user_id: int) -> Memory | None:
+        with self._lock:
+            return self._read(self._connect(), user_id)
+
+    def _record(self, user_id: int, question: str, answer: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                # Leitura e gravação na mesma transação de escrita: com vários processos (BOT_WORKERS)
+                # uma troca gravada por outro processo no meio não se perde
+                connection.execute("BEGIN IMMEDIATE")
+                memory = self._read(connection, user_id) or Memory()
+                memory.add(question, answer)
+                connection.execute(
+                    "INSERT OR REPLACE INTO memory (user_id, summary, turns, updated_at) VALUES (?, ?, ?, ?)",
+                    (user_id, json.dumps(memory.summary, ensure_ascii=False),
+                     json.dumps(memory.turns, ensure_ascii=False), time.time()),
+                )
+                self._writes += 1
+                if self._writes % _PURGE_EVERY == 0:
+                    connection.execute("DELETE FROM memory WHERE updated_at < ?", (time.time() - self.ttl,))
+
+    def _forget(self, user_id: int) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM memory WHERE user_id = ?", (user_id,))
+
+    async def get(self, user_id: int) -> Memory | None:
+        """Memória do usuário, ou None se ele não fez nenhuma pergunta nos últimos MEMORY_TTL segundos."""
+        return await asyncio.to_thread(self._get, user_id)
+
+    async def record(self, user_id: int, question: str, answer: str) -> None:
+        """Acrescenta uma troca à memória do usuário (resumindo as mais antigas)."""
+        try:
+            await asyncio.to_thread(self._record, user_id, question, answer)
+        except Exception as e:
+            # Sem a memória, a próxima pergunta de continuação só perde o contexto
+            logger.warning(f"Falha ao gravar a memória da conversa do usuário {user_id}: {e}")
+
+    async def forget(self, user_id: int) -> None:
+        await asyncio.to_thread(self._forget, user_id)
+
+
+conversation_memory = ConversationMemory()
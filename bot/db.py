@@ -0,0 +1,17 @@
+import sqlite3
+from pathlib import Path
+
+
+def connect_sqlite(path: str | Path) -> sqlite3.Connection:
+    """
+    Abre uma conexão SQLite em modo WAL, pronta para ser usada a partir de threads (asyncio.to_thread).
+
+    O modo WAL permite leituras concorrentes com a escrita e 'synchronous=NORMAL' evita um fsync
+    por transação, o que é seguro em WAL (no pior caso perde-se a última transação em uma queda de energia).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
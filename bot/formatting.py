@@ -0,0 +1,28 @@
+from bot.scraper import MatchResult
+
+
+def match_outcome(result: MatchResult) -> int | None:
+    """1 para vitória da FURIA, -1 para derrota, 0 para empate e None se o placar não for numérico."""
+    try:
+        furia_score, opponent_score = int(result.furia_score), int(result.opponent_score)
+    except ValueError:
+        return None
+    return (furia_score > opponent_score) - (furia_score < opponent_score)
+
+
+def match_emoji(result: MatchResult) -> str:
+    return {1: "✅", -1: "❌"}.get(match_outcome(result), "❓")
+
+
+def format_match(result: MatchResult) -> str:
+    """Bloco de uma partida no formato usado nas listas de resultados do bot (Markdown)."""
+    return (
+        f"{match_emoji(result)} *FURIA {result.furia_score} x {result.opponent_score} {result.opponent_name}*\n"
+        f"📅 {result.date}\n"
+        f"🏆 _{result.tournament_name}_\n\n"
+    )
+
+
+def format_results_message(title: str, results) -> str:
+    """Mensagem com um título em negrito seguido das partidas."""
+    return f"*{title}*\n\n" + "".join(format_match(r) for r in results)
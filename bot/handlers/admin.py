@@ -0,0 +1,71 @@
+import os
+
+from telegram import Update
+from telegram.constants import MessageLimit
+from telegram.ext import CommandHandler, ContextTypes, filters
+
+from bot import resilience
+from bot.answer_cache import answer_cache
+from bot.consts import logger
+from bot.metrics import metrics
+from bot.notifications import notifications
+from bot.profiler import PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS, ProfileResult, profiler
+
+# IDs (separados por vírgula) dos usuários do Telegram que podem usar os comandos de administração
+ADMIN_IDS = frozenset(int(user_id) for user_id in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",") if user_id)
+
+admin_filter = filters.User(user_id=ADMIN_IDS)
+
+
+def _code_block(text: str) -> str:
+    limit = MessageLimit.MAX_TEXT_LENGTH - 8
+    if len(text) > limit:
+        text = text[:limit - 4] + "\n..."
+    return f"```\n{text}\n```"
+
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Envia as latências (p50/p95/p99) por etapa, os contadores de erros e de cache e o estado dos circuitos."""
+    logger.info(f"Administrador {update.effective_user.id} pediu as estatísticas.")
+    text = (f"{metrics.summary()}\n\n{answer_cache.report()}\n\n{resilience.report()}\n\n"
+            f"{await notifications.report()}")
+    await update.message.reply_text(_code_block(text))
+
+
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Captura um perfil de CPU dos handlers da conversa.
+
+    Uso: /profile [segundos] [máximo de updates] — ex.: "/profile 60 200" captura por até 60s ou até
+    200 updates; "/profile parar" encerra a captura em andamento.
+    """
+    args = context.args or []
+    if args and args[0].lower() in ("parar", "stop"):
+        if profiler.stop() is None:
+            await update.message.reply_text("Nenhuma captura de perfil em andamento.")
+        return
+
+    try:
+        seconds = float(args[0]) if args else PROFILE_DEFAULT_SECONDS
+        max_updates = int(args[1]) if len(args) > 1 else 0
+    except ValueError:
+        await update.message.reply_text("Uso: /profile [segundos] [máximo de updates] ou /profile parar")
+        return
+
+    chat_id = update.effective_chat.id
+
+    def on_finish(result: ProfileResult) -> None:
+        context.application.create_task(context.bot.send_message(chat_id, _code_block(result.summary())))
+
+    logger.info(f"Administrador {update.effective_user.id} iniciou uma captura de perfil.")
+    if not profiler.start(seconds, max_updates, on_finish=on_finish):
+        await update.message.reply_text("Já existe uma captura de perfil em andamento.")
+        return
+    await update.message.reply_text(
+        f"Capturando o perfil por até {min(seconds, PROFILE_MAX_SECONDS):.0f}s"
+        + (f" ou {max_updates} updates" if max_updates else "") + ". Aviso quando terminar."
+    )
+
+
+stats_handler = CommandHandler("stats", stats, filters=admin_filter)
+profile_handler = CommandHandler("profile", profile, filters=admin_filter)
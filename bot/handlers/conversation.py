@@ -12,6 +12,7 @@ from bot.consts import (
     STATE_MAIN_MENU,
     STATE_SHOWING_RESULTS,
     STATE_AWAITING_QUESTION,
+    RESULTS_PAGE_SIZE,
     MENU_MARKUP,
     RESULTS_MARKUP,
     BUTTON_ACTIONS,
@@ -29,97 +30,99 @@ from bot.consts import (
     TEXT_RESULTS_ERROR,
     TEXT_QUESTION_UNAVAILABLE,
     TEXT_LLM_ERROR,
+    TEXT_LLM_BLOCKED,
+    TEXT_LLM_DEGRADED,
+    TEXT_LLM_OVERLOADED,
     TEXT_LLM_DISCLAIMER,
+    TEXT_NOTIFICATIONS_ON,
+    TEXT_NOTIFICATIONS_OFF,
+    TEXT_NOTIFICATIONS_ERROR,
     logger
 )
-from bot.llm_integrator import generate_llm_response, gemini_configured
-from bot.retriever import get_current_furia_context
-from bot.scraper import get_furia_latest_results
+from bot.answer_cache import answer_cache
+from bot.context_gatherer import gather_context
+from bot.conversation_memory import Memory, conversation_memory, looks_like_follow_up
+from bot.handlers.results import RESULTS_INLINE_KEYBOARD, results_keyboard
+from bot.intent_router import route_question
+from bot.llm_integrator import (
+    LLM_STREAMING,
+    LLMIncompleteError,
+    LLMOverloadedError,
+    generate_llm_response,
+    is_gemini_available,
+    stream_llm_response,
+)
+from bot.metrics import instrumented_handler, metrics
+from bot.notifications import notifications
+from bot.outbox import reply
+from bot.results_pages import results_pages
+from bot.streaming_reply import StreamingReply
 
 
+@instrumented_handler
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Inicia a conversa com o usuário e exibe o menu principal."""
     logger.info(f"Usuário {update.effective_user.id} iniciou a conversa.")
     context.user_data.clear()
-    await update.message.reply_text(TEXT_WELCOME, reply_markup=MENU_MARKUP)
+    await conversation_memory.forget(update.effective_user.id)
+    await reply(update.message, TEXT_WELCOME, reply_markup=MENU_MARKUP)
     return STATE_MAIN_MENU
 
 
+@instrumented_handler
 async def show_results(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Exibe os últimos resultados da FURIA."""
     user_id = update.effective_user.id
     logger.info(f"Usuário {user_id} pediu resultados.")
-    await update.message.reply_text(TEXT_SEARCHING_LAST_RESULTS)
+    if RESULTS_INLINE_KEYBOARD:
+        # Uma única mensagem, navegada pelos botões inline (ver handlers.results)
+        page = await results_pages.get(0, RESULTS_PAGE_SIZE)
+        if page is None:
+            await reply(update.message, TEXT_RESULTS_ERROR, reply_markup=MENU_MARKUP)
+        elif not page.count:
+            await reply(update.message, TEXT_NO_RESULTS_FOUND, reply_markup=MENU_MARKUP)
+        else:
+            await reply(update.message, page.text, reply_markup=results_keyboard(page), parse_mode='Markdown')
+        return STATE_MAIN_MENU
 
-    results = get_furia_latest_results(count=5)
+    await reply(update.message, TEXT_SEARCHING_LAST_RESULTS, transient=True)
+    page = await results_pages.get(0, RESULTS_PAGE_SIZE)
 
-    if results is None:
-        await update.message.reply_text(TEXT_RESULTS_ERROR, reply_markup=MENU_MARKUP)
+    if page is None:
+        await reply(update.message, TEXT_RESULTS_ERROR, reply_markup=MENU_MARKUP)
         return STATE_MAIN_MENU
-    elif not results:
-        await update.message.reply_text(TEXT_NO_RESULTS_FOUND, reply_markup=RESULTS_MARKUP)
+    elif not page.count:
+        await reply(update.message, TEXT_NO_RESULTS_FOUND, reply_markup=RESULTS_MARKUP)
     else:
-        message_text = "*Últimos Resultados da FURIA:*\n\n"
-        for r in results:
-            emoji = "❓"
-            try:
-                if int(r['furia_score']) > int(r['opponent_score']):
-                    emoji = "✅"
-                elif int(r['furia_score']) < int(r['opponent_score']):
-                    emoji = "❌"
-            except ValueError:
-                pass
-            message_text += (
-                f"{emoji} *FURIA {r['furia_score']} x {r['opponent_score']} {r['opponent_name']}*\n"
-                f"📅 {r['date']}\n"
-                f"🏆 _{r['tournament_name']}_\n\n"
-            )
-        context.user_data['last_results'] = results
-        context.user_data['results_offset'] = len(results)
-        await update.message.reply_text(message_text, reply_markup=RESULTS_MARKUP, parse_mode='Markdown')
+        context.user_data['results_offset'] = page.count
+        await reply(update.message, page.text, reply_markup=RESULTS_MARKUP, parse_mode='Markdown')
 
     return STATE_SHOWING_RESULTS
 
 
+@instrumented_handler
 async def show_more_results(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Exibe mais resultados da FURIA."""
     user_id = update.effective_user.id
     logger.info(f"Usuário {user_id} pediu mais resultados.")
-    current_offset = context.user_data.get('results_offset', 5)
-    results_to_fetch = 5
-    await update.message.reply_text(TEXT_SEARCHING_MORE_RESULTS)
+    current_offset = context.user_data.get('results_offset', RESULTS_PAGE_SIZE)
+    await reply(update.message, TEXT_SEARCHING_MORE_RESULTS, transient=True)
 
-    total_to_fetch = current_offset + results_to_fetch
-    all_results = get_furia_latest_results(count=total_to_fetch)
+    page = await results_pages.get(current_offset, RESULTS_PAGE_SIZE)
 
-    if all_results is None:
-        await update.message.reply_text(TEXT_RESULTS_ERROR, reply_markup=RESULTS_MARKUP)
+    if page is None:
+        await reply(update.message, TEXT_RESULTS_ERROR, reply_markup=RESULTS_MARKUP)
         return STATE_SHOWING_RESULTS
-    elif len(all_results) <= current_offset:
-        await update.message.reply_text(TEXT_NO_MORE_RESULTS, reply_markup=RESULTS_MARKUP)
+    elif not page.count:
+        await reply(update.message, TEXT_NO_MORE_RESULTS, reply_markup=RESULTS_MARKUP)
     else:
-        new_results = all_results[current_offset:total_to_fetch]
-        message_text = "*Resultados Adicionais:*\n\n"
-        for r in new_results:
-            emoji = "❓"
-            try:
-                if int(r['furia_score']) > int(r['opponent_score']):
-                    emoji = "✅"
-                elif int(r['furia_score']) < int(r['opponent_score']):
-                    emoji = "❌"
-            except ValueError:
-                pass
-            message_text += (
-                f"{emoji} *FURIA {r['furia_score']} x {r['opponent_score']} {r['opponent_name']}*\n"
-                f"📅 {r['date']}\n"
-                f"🏆 _{r['tournament_name']}_\n\n"
-            )
-        context.user_data['results_offset'] = len(all_results)
-        await update.message.reply_text(message_text, reply_markup=RESULTS_MARKUP, parse_mode='Markdown')
+        context.user_data['results_offset'] = current_offset + page.count
+        await reply(update.message, page.text, reply_markup=RESULTS_MARKUP, parse_mode='Markdown')
 
     return STATE_SHOWING_RESULTS
 
 
+@instrumented_handler
 async def back_to_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Retorna o usuário ao menu principal."""
     user_id = update.effective_user.id
@@ -127,77 +130,179 @@ async def back_to_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
     context.user_data.pop('choice', None)
     context.user_data.pop('last_results', None)
     context.user_data.pop('results_offset', None)
-    await update.message.reply_text(TEXT_BACK_TO_MAIN, reply_markup=MENU_MARKUP)
+    await reply(update.message, TEXT_BACK_TO_MAIN, reply_markup=MENU_MARKUP)
     return STATE_MAIN_MENU
 
 
+@instrumented_handler
 async def exit_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Encerra a conversa com o usuário."""
     user_id = update.effective_user.id
     logger.info(f"Usuário {user_id} encerrou a conversa via {update.message.text}.")
     context.user_data.clear()
-    await update.message.reply_text(TEXT_EXIT, reply_markup=ReplyKeyboardRemove())
+    await reply(update.message, TEXT_EXIT, reply_markup=ReplyKeyboardRemove())
     return ConversationHandler.END
 
 
+@instrumented_handler
+async def toggle_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Inscreve o chat nos avisos de resultados novos, ou cancela a inscrição se ele já estiver inscrito."""
+    chat_id = update.effective_chat.id
+    try:
+        if await notifications.unsubscribe(chat_id):
+            logger.info(f"Chat {chat_id} cancelou os avisos de resultados.")
+            text = TEXT_NOTIFICATIONS_OFF
+        else:
+            await notifications.subscribe(chat_id)
+            logger.info(f"Chat {chat_id} se inscreveu nos avisos de resultados.")
+            text = TEXT_NOTIFICATIONS_ON
+    except Exception as e:
+        logger.error(f"Erro ao alterar os avisos do chat {chat_id}: {e}")
+        text = TEXT_NOTIFICATIONS_ERROR
+    await reply(update.message, text, reply_markup=MENU_MARKUP)
+    return STATE_MAIN_MENU
+
+
+@instrumented_handler
 async def prompt_for_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Solicita ao usuário que faça uma pergunta."""
     logger.info(f"Usuário {update.effective_user.id} selecionou fazer pergunta.")
-    await update.message.reply_text(TEXT_ASK_QUESTION_PROMPT, reply_markup=ReplyKeyboardRemove())
+    await reply(update.message, TEXT_ASK_QUESTION_PROMPT, reply_markup=ReplyKeyboardRemove())
     return STATE_AWAITING_QUESTION
 
 
+async def _generate_answer(update: Update, user_question: str, user_id: int,
+                           memory: Memory | None = None) -> tuple[str | None, bool, bool]:
+    """
+    Busca contexto e gera a resposta da LLM.
+
+    Args:
+        memory: memória da conversa, para perguntas de continuação: vai no prompt, e a pergunta
+            anterior entra na busca de contexto ("e o time de valorant?" sozinha não diz de quem).
+
+    Returns:
+        A resposta (ou None em caso de erro), se ela já foi enviada ao usuário (streaming) e se ela
+        está completa: respostas interrompidas ou bloqueadas não vão para o cache.
+    """
+    search_question = f"{memory.turns[-1][0]} {user_question}" if memory and memory.turns else user_question
+    history = memory.render() if memory else None
+    logger.info(f"Buscando contexto atual para a pergunta: '{search_question}'")
+    with metrics.track("stage", stage="context"):
+        context_snippets = await gather_context(search_question)
+
+    if context_snippets:
+        logger.info(f"Contexto encontrado: {len(context_snippets)} trecho(s).")
+    else:
+        logger.info("Nenhum contexto adicional encontrado, usando conhecimento geral da LLM.")
+
+    if LLM_STREAMING:
+        streaming = StreamingReply(update.message)
+        complete = True
+        try:
+            async for chunk in stream_llm_response(user_question, context_snippets, user_id=user_id, history=history):
+                await streaming.append(chunk)
+        except LLMIncompleteError:
+            # O texto parcial continua na tela, mas não é uma resposta para ser reaproveitada
+            complete = False
+        return await streaming.finish(footer=TEXT_LLM_DISCLAIMER), True, complete
+
+    answer = await generate_llm_response(user_question, context_snippets, user_id=user_id, history=history)
+    return answer, False, answer != TEXT_LLM_BLOCKED
+
+
+@instrumented_handler
 async def handle_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Processa a pergunta do usuário e gera uma resposta usando LLM."""
     user_question = update.message.text
     user_id = update.effective_user.id
     logger.info(f"Usuário {user_id} fez a pergunta: '{user_question}'")
 
-    if not gemini_configured:
+    # Perguntas estruturadas (último resultado, confronto, campanha) saem direto dos dados do Draft5
+    with metrics.track("stage", stage="intent_router"):
+        routed_answer = await route_question(user_question)
+    if routed_answer:
+        await reply(update.message, routed_answer, parse_mode='Markdown')
+        await conversation_memory.record(user_id, user_question, routed_answer)
+        return await back_to_main_menu(update, context)
+
+    if not is_gemini_available():
         logger.error(f"Tentativa de usar LLM sem configuração pelo usuário {user_id}.")
-        await update.message.reply_text(TEXT_QUESTION_UNAVAILABLE, reply_markup=MENU_MARKUP)
+        await reply(update.message, TEXT_QUESTION_UNAVAILABLE, reply_markup=MENU_MARKUP)
         return STATE_MAIN_MENU
 
     await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
 
-    logger.info(f"Buscando contexto atual para a pergunta: '{user_question}'")
-    context_info = await get_current_furia_context(user_question)
-
-    if context_info:
-        logger.info(f"Contexto encontrado: {context_info[:100]}...")
+    # Uma continuação ("e o time de valorant?") só tem sentido com a conversa anterior: a resposta
+    # depende da memória do usuário e não passa pelo cache de respostas
+    memory = await conversation_memory.get(user_id) if looks_like_follow_up(user_question) else None
+    if memory is not None:
+        llm_response_text = None
+        metrics.inc("cache_requests_total", cache="answers", result="bypass")
+        logger.info(f"Pergunta '{user_question}' tratada como continuação da conversa.")
     else:
-        logger.info("Nenhum contexto adicional encontrado, usando conhecimento geral da LLM.")
+        llm_response_text = (answer_cache.get(user_question) or await answer_cache.wait_inflight(user_question)
+                             or await answer_cache.get_shared(user_question))
+    already_sent = False
+    complete = True
 
-    llm_response_text = generate_llm_response(user_question, context_info)
+    if llm_response_text:
+        metrics.inc("cache_requests_total", cache="answers", result="hit")
+        logger.info(f"Resposta para '{user_question}' servida pelo cache de respostas.")
+    else:
+        flight = None
+        if memory is None:
+            metrics.inc("cache_requests_total", cache="answers", result="miss")
+            flight = answer_cache.start_flight(user_question)
+        try:
+            llm_response_text, already_sent, complete = await _generate_answer(
+                update, user_question, user_id, memory)
+        except LLMOverloadedError:
+            await reply(update.message, TEXT_LLM_OVERLOADED)
+            return await back_to_main_menu(update, context)
+        finally:
+            if flight is not None:
+                answer_cache.finish_flight(flight, llm_response_text if complete else None)
 
     if llm_response_text:
-        await update.message.reply_text(llm_response_text)
-        await update.message.reply_text(TEXT_LLM_DISCLAIMER, parse_mode='Markdown')
+        if not already_sent:
+            await StreamingReply(update.message).send_complete(llm_response_text, footer=TEXT_LLM_DISCLAIMER)
+        if complete:
+            # Um texto cortado ou bloqueado não serve de contexto para a próxima pergunta
+            await conversation_memory.record(user_id, user_question, llm_response_text)
+    elif memory is None and (stale_answer := (answer_cache.get(user_question, allow_expired=True)
+                                              or await answer_cache.get_shared(user_question, allow_expired=True))):
+        # LLM fora do ar: uma resposta antiga é melhor do que nenhuma
+        logger.warning(f"Resposta expirada do cache servida para '{user_question}'.")
+        await StreamingReply(update.message).send_complete(f"{TEXT_LLM_DEGRADED}\n\n{stale_answer}",
+                                                           footer=TEXT_LLM_DISCLAIMER)
     else:
-        await update.message.reply_text(TEXT_LLM_ERROR)
+        await reply(update.message, TEXT_LLM_ERROR)
 
     return await back_to_main_menu(update, context)
 
 
+@instrumented_handler
 async def cancel_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancela a ação atual e retorna ao menu principal."""
     user_id = update.effective_user.id
     logger.info(f"Usuário {user_id} cancelou a ação via /cancel.")
-    await update.message.reply_text(TEXT_CANCEL_ACTION)
+    await reply(update.message, TEXT_CANCEL_ACTION)
     return await back_to_main_menu(update, context)
 
 
+@instrumented_handler
 async def main_menu_fallback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Lida com entradas inesperadas no menu principal."""
     logger.warning(f"Input inesperado no menu principal do usuário {update.effective_user.id}: {update.message.text}")
-    await update.message.reply_text(TEXT_MAIN_MENU_FALLBACK, reply_markup=MENU_MARKUP)
+    await reply(update.message, TEXT_MAIN_MENU_FALLBACK, reply_markup=MENU_MARKUP)
     return STATE_MAIN_MENU
 
 
+@instrumented_handler
 async def results_fallback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Lida com entradas inesperadas na tela de resultados."""
     logger.warning(f"Input inesperado nos resultados do usuário {update.effective_user.id}: {update.message.text}")
-    await update.message.reply_text(TEXT_FALLBACK_GENERAL, reply_markup=RESULTS_MARKUP)
+    await reply(update.message, TEXT_FALLBACK_GENERAL, reply_markup=RESULTS_MARKUP)
     return STATE_SHOWING_RESULTS
 
 
@@ -208,6 +313,7 @@ conv_handler = ConversationHandler(
         STATE_MAIN_MENU: [
             MessageHandler(filters.Regex(BUTTON_ACTIONS["SHOW_RESULTS"][1]), show_results),
             MessageHandler(filters.Regex(BUTTON_ACTIONS["ASK_QUESTION"][1]), prompt_for_question),
+            MessageHandler(filters.Regex(BUTTON_ACTIONS["NOTIFICATIONS"][1]), toggle_notifications),
             MessageHandler(filters.TEXT & ~filters.COMMAND, main_menu_fallback),
         ],
         STATE_SHOWING_RESULTS: [
@@ -216,12 +322,15 @@ conv_handler = ConversationHandler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, results_fallback),
         ],
         STATE_AWAITING_QUESTION: [
+            # Bloqueante de propósito: os updates deste chat esperam a resposta (e /cancel não se perde
+            # em um estado pendente); os outros chats seguem em paralelo (ver ChatSerializedUpdateProcessor)
             MessageHandler(filters.TEXT & ~filters.COMMAND, handle_question),
         ],
     },
     fallbacks=[
         CommandHandler("start", start),
         CommandHandler("cancel", cancel_action),
+        CommandHandler("avisos", toggle_notifications),
         CommandHandler("sair", exit_conversation),
     ],
     name="furia_conversation",
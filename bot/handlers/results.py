@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest
+from telegram.ext import CallbackQueryHandler, ContextTypes
+
+from bot.consts import RESULTS_PAGE_SIZE, TEXT_RESULTS_ERROR, logger
+from bot.metrics import instrumented_handler
+from bot.results_pages import ResultsPage, results_pages
+
+# "1" (padrão): os resultados são navegados por botões na própria mensagem, que é editada a cada página.
+# "0": fluxo antigo, com o teclado "Ver mais jogos" / "Voltar ao menu principal" e uma mensagem por página.
+RESULTS_INLINE_KEYBOARD = os.getenv("RESULTS_INLINE_KEYBOARD", "1") == "1"
+
+RESULTS_CALLBACK_PREFIX = "results:"
+
+
+def results_keyboard(page: ResultsPage) -> InlineKeyboardMarkup | None:
+    """Botões de página anterior/seguinte da mensagem de resultados."""
+    buttons = []
+    if page.has_previous:
+        previous_offset = max(page.offset - RESULTS_PAGE_SIZE, 0)
+        buttons.append(InlineKeyboardButton("⬅️ Mais recentes", callback_data=f"{RESULTS_CALLBACK_PREFIX}{previous_offset}"))
+    if page.has_next:
+        next_offset = page.offset + page.count
+        buttons.append(InlineKeyboardButton("Mais antigos ➡️", callback_data=f"{RESULTS_CALLBACK_PREFIX}{next_offset}"))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+@instrumented_handler
+async def results_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Troca a página de resultados editando a própria mensagem (botões inline)."""
+    query = update.callback_query
+    offset = int(query.data.removeprefix(RESULTS_CALLBACK_PREFIX))
+    page = await results_pages.get(offset, RESULTS_PAGE_SIZE)
+
+    if page is None:
+        await query.answer(TEXT_RESULTS_ERROR, show_alert=True)
+        return
+    if not page.count:
+        # Botão de uma mensagem antiga, de quando o histórico era diferente: volta ao início
+        page = await results_pages.get(0, RESULTS_PAGE_SIZE)
+
+    logger.info(f"Usuário {update.effective_user.id} foi para a página de resultados {page.offset}.")
+    try:
+        # A resposta ao callback (que tira o "carregando" do botão) não é uma mensagem e vai junto com a edição
+        await asyncio.gather(
+            query.answer(),
+            query.edit_message_text(page.text, reply_markup=results_keyboard(page), parse_mode='Markdown'),
+        )
+    except BadRequest as e:
+        # Dois toques seguidos no mesmo botão: a mensagem já está na página pedida
+        if "not modified" not in str(e).lower():
+            raise
+
+
+results_callback_handler = CallbackQueryHandler(results_page_callback, pattern=rf"^{RESULTS_CALLBACK_PREFIX}\d+$")
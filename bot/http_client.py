@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# --- Configuração do pool de conexões ---
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+_client: httpx.AsyncClient | None = None
+_host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+
+def _http2_available() -> bool:
+    """Verifica se o pacote 'h2' está instalado (necessário para HTTP/2 no httpx)."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Cria o cliente HTTP assíncrono compartilhado (keep-alive, pool de conexões e HTTP/2 quando disponível)."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        return _client
+
+    http2 = _http2_available()
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    _client = httpx.AsyncClient(http2=http2, limits=limits, follow_redirects=True)
+    _host_semaphores.clear()
+    logger.info(f"Cliente HTTP compartilhado criado (HTTP/2: {'Sim' if http2 else 'Não'}).")
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Retorna o cliente HTTP compartilhado, criando-o se necessário."""
+    if _client is None or _client.is_closed:
+        return create_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Fecha o cliente HTTP compartilhado e libera as conexões abertas."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Cliente HTTP compartilhado finalizado.")
+
+
+@asynccontextmanager
+async def host_slot(url: str):
+    """Limita o número de requisições simultâneas por host (HTTP_MAX_CONNECTIONS_PER_HOST)."""
+    host = urlsplit(url).netloc
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = _host_semaphores[host] = asyncio.Semaphore(HTTP_MAX_CONNECTIONS_PER_HOST)
+    async with semaphore:
+        yield
+
+
+async def request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Executa uma requisição usando o cliente compartilhado, respeitando o limite por host."""
+    async with host_slot(url):
+        return await get_http_client().request(method, url, **kwargs)
+
+
+@asynccontextmanager
+async def stream(method: str, url: str, **kwargs):
+    """Abre uma resposta em modo streaming usando o cliente compartilhado, respeitando o limite por host."""
+    async with host_slot(url):
+        async with get_http_client().stream(method, url, **kwargs) as response:
+            yield response
@@ -0,0 +1,175 @@
+import logging
+import re
+from dataclasses import dataclass
+
+from bot.formatting import format_match, format_results_message, match_outcome
+from bot.match_store import ensure_results, match_store
+from bot.text_normalization import STOPWORDS, strip_accents, tokenize
+
+logger = logging.getLogger(__name__)
+
+MAX_LISTED_RESULTS = 10
+
+# Os resultados do Draft5 são só do time de CS; perguntas sobre outras modalidades vão para a LLM
+_OTHER_GAMES_RE = re.compile(
+    r"\b(valorant|lol|league|legends|rocket|r6|rainbow|siege|kings|futebol|apex|pubg|fortnite|free fire|fifa)\b"
+)
+_NEXT_MATCH_RE = re.compile(r"\b(proxim[oa]s?|agenda|calendario|quando joga|vai jogar)\b")
+_LAST_RE = re.compile(r"\b(ultim[oa]s?|recentes?)\b")
+_MATCH_WORD_RE = re.compile(r"\b(jogos?|partidas?|resultados?|placar|placares|confrontos?|mapas?|series?)\b")
+_LAST_COUNT_RE = re.compile(r"\bultim[oa]s\s+(\d{1,2})\b|\b(\d{1,2})\s+ultim[oa]s\b")
+_RECORD_RE = re.compile(
+    r"\b(retrospecto|historico|confrontos?|contra|x|vs|versus|quantas vezes|venceu|ganhou|perdeu|"
+    r"vitorias?|derrotas?)\b"
+)
+_WINS_RE = re.compile(r"\b(quantas|quantos|numero de|total de)\b.*\b(vitorias?|derrotas?|jogos|partidas|venceu|ganhou|perdeu)\b")
+
+# Palavras que indicam a intenção, mas não fazem parte do nome de um time ou campeonato
+_INTENT_WORDS = frozenset("""
+furia cs cs2 csgo counter strike time jogo jogos partida partidas resultado resultados placar placares
+confronto confrontos retrospecto historico contra x vs versus quantas quantos vezes numero total venceu
+ganhou perdeu vitoria vitorias derrota derrotas ultimo ultima ultimos ultimas recente recentes mapa mapas
+campeonato campeonatos torneio torneios serie series qual quais como quem quando onde foi foram
+""".split()) | STOPWORDS
+
+
+@dataclass(frozen=True)
+class Intent:
+    """Intenção reconhecida em uma pergunta livre."""
+    name: str  # "last_result", "recent_results", "record_vs" ou "tournament_record"
+    count: int = 1
+    opponent: str | None = None
+    tournament_terms: frozenset[str] = frozenset()
+
+
+def _normalize(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+_TEAM_NAME_AFFIXES_RE = re.compile(r"^(team|the|time)\s+|\s+(esports|e sports|gaming|club)$")
+
+
+def _name_variants(name: str) -> set[str]:
+    """Formas de citar um time: 'Team Liquid' -> {'team liquid', 'liquid'}."""
+    normalized = _normalize(name)
+    short = _TEAM_NAME_AFFIXES_RE.sub("", normalized)
+    return {variant for variant in (normalized, short) if variant}
+
+
+def _find_opponent(normalized_question: str, names) -> str | None:
+    """Nome do adversário (como aparece no Draft5) citado na pergunta, preferindo o nome mais longo."""
+    padded = f" {normalized_question} "
+    cited = [name for name in names if any(f" {variant} " in padded for variant in _name_variants(name))]
+    return max(cited, key=len) if cited else None
+
+
+def classify(question: str, opponent_names) -> Intent | None:
+    """
+    Classifica a pergunta por regras e palavras-chave; 'opponent_names' são os adversários do histórico.
+
+    Returns:
+        A intenção reconhecida ou None para perguntas abertas (que seguem para a LLM).
+    """
+    text = _normalize(question)
+    if not text or _OTHER_GAMES_RE.search(text) or _NEXT_MATCH_RE.search(text):
+        # Não há agenda de jogos nos dados do scraper: "próximo jogo" fica com a busca + LLM
+        return None
+
+    opponent = _find_opponent(text, opponent_names)
+    if opponent and _RECORD_RE.search(text):
+        if _LAST_RE.search(text) and not _WINS_RE.search(text):
+            return Intent("record_vs", count=1, opponent=opponent)
+        return Intent("record_vs", count=0, opponent=opponent)
+
+    if _WINS_RE.search(text):
+        terms = frozenset(token for token in text.split() if token not in _INTENT_WORDS and not token.isdigit())
+        if terms:
+            return Intent("tournament_record", tournament_terms=terms)
+
+    if _LAST_RE.search(text) and _MATCH_WORD_RE.search(text):
+        count_match = _LAST_COUNT_RE.search(text)
+        if count_match:
+            count = int(count_match.group(1) or count_match.group(2))
+            return Intent("recent_results", count=max(1, min(count, MAX_LISTED_RESULTS)))
+        if re.search(r"\bultim[oa]s\b|\brecentes\b", text):
+            return Intent("recent_results", count=5)
+        return Intent("last_result")
+
+    return None
+
+
+def _record_line(results) -> str:
+    outcomes = [match_outcome(r) for r in results]
+    wins, losses, draws = outcomes.count(1), outcomes.count(-1), outcomes.count(0)
+    line = f"{wins} vitória(s) e {losses} derrota(s)"
+    if draws:
+        line += f" e {draws} empate(s)"
+    return line + f" em {len(results)} jogo(s)"
+
+
+def _tournaments_matching(terms: frozenset[str], tournaments) -> list[str]:
+    """Campeonatos cujo nome tem mais termos em comum com a pergunta (pode ser mais de um, ex.: 'blast')."""
+    overlap = {name: len(terms & set(tokenize(name))) for name in tournaments}
+    best = max(overlap.values(), default=0)
+    return [name for name, score in overlap.items() if score and score == best]
+
+
+async def answer(intent: Intent) -> str | None:
+    """Monta a resposta (Markdown) para a intenção a partir do histórico local, ou None se os dados não a respondem."""
+    if intent.name == "last_result":
+        results = await match_store.page(0, 1)
+        return format_results_message("Último resultado da FURIA:", results) if results else None
+
+    if intent.name == "recent_results":
+        results = await match_store.page(0, intent.count)
+        if not results:
+            return None
+        return format_results_message(f"Últimos {len(results)} resultados da FURIA:", results)
+
+    if intent.name == "record_vs":
+        matches = await match_store.against(intent.opponent)
+        if not matches:
+            return None
+        if intent.count == 1:
+            return format_results_message(f"Último jogo da FURIA contra {intent.opponent}:", matches[:1])
+        listed = "".join(format_match(r) for r in matches[:MAX_LISTED_RESULTS])
+        return (
+            f"*FURIA x {intent.opponent}*\n"
+            f"Em todos os jogos registrados: {_record_line(matches)}.\n\n{listed}"
+        )
+
+    if intent.name == "tournament_record":
+        tournaments = _tournaments_matching(intent.tournament_terms, await match_store.tournaments())
+        if not tournaments:
+            return None
+        lines = []
+        for tournament in tournaments:
+            matches = await match_store.in_tournament(tournament)
+            lines.append(f"🏆 _{tournament}_: {_record_line(matches)}")
+        return "*Campanha da FURIA nos jogos registrados:*\n\n" + "\n".join(lines)
+
+    return None
+
+
+async def route_question(question: str) -> str | None:
+    """
+    Tenta responder a pergunta direto do histórico de partidas do Draft5 (sem busca na web nem LLM).
+
+    Returns:
+        A resposta formatada ou None se a pergunta não for estruturada (ou não houver dados para ela).
+    """
+    text = strip_accents(question.lower())
+    if not _MATCH_WORD_RE.search(text) and not _RECORD_RE.search(text) and not _WINS_RE.search(text):
+        return None
+
+    if not await ensure_results():
+        return None
+
+    intent = classify(question, await match_store.opponents())
+    if intent is None:
+        return None
+
+    response = await answer(intent)
+    if response:
+        logger.info(f"Pergunta '{question}' respondida pelo roteador de intenções ({intent.name}).")
+    return response
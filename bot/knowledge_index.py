@@ -0,0 +1,216 @@
+import hashlib
+import logging
+import math
+import os
+import pickle
+import re
+import sys
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from bot.text_normalization import content_tokens, light_stem
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_DIR = Path(__file__).with_name("knowledge")
+KNOWLEDGE_INDEX_PATH = os.getenv("KNOWLEDGE_INDEX_PATH", "furia_bot_data/knowledge_index.pickle")
+# Fração mínima do "peso" (idf) da pergunta coberta pelo melhor trecho para dispensar a busca na web
+KNOWLEDGE_MIN_CONFIDENCE = float(os.getenv("KNOWLEDGE_MIN_CONFIDENCE", "0.6"))
+KNOWLEDGE_MIN_SCORE = float(os.getenv("KNOWLEDGE_MIN_SCORE", "2.0"))
+
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+# Palavras de pergunta que não ajudam a escolher um trecho (só valem para o índice)
+_INDEX_STOPWORDS = frozenset("quem qual quais quando onde como quanto quantos quantas atual atuais hoje".split())
+
+
+def index_terms(text: str) -> list[str]:
+    """Termos usados no índice: palavras de conteúdo, sem acento e com stemming leve."""
+    return [light_stem(token) for token in content_tokens(text) if token not in _INDEX_STOPWORDS]
+
+
+def _corpus_files(directory: Path) -> list[Path]:
+    return sorted(directory.glob("*.md"))
+
+
+def _corpus_fingerprint(files: list[Path]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for file in files:
+        stat = file.stat()
+        digest.update(f"{file.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+class KnowledgeIndex:
+    """
+    Índice invertido (BM25) sobre a base local de conhecimento da FURIA (bot/knowledge/*.md).
+
+    Cada parágrafo dos arquivos é um documento. As listas de postings são guardadas em
+    arrays compactos (ids de documento e frequências), o que deixa o índice pequeno para
+    salvar em disco e carregar na inicialização.
+    """
+
+    def __init__(self, passages, sources, vocabulary, postings_docs, postings_tfs, doc_lengths, fingerprint=""):
+        self.passages: list[str] = passages
+        self.sources: list[str] = sources
+        self.vocabulary: dict[str, int] = vocabulary
+        self.postings_docs: list[array] = postings_docs
+        self.postings_tfs: list[array] = postings_tfs
+        self.doc_lengths: array = doc_lengths
+        self.fingerprint = fingerprint
+        total = len(passages)
+        self._avg_length = (sum(doc_lengths) / total) if total else 0.0
+        self._idf = [
+            math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5)) for docs in postings_docs
+        ]
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    @classmethod
+    def build(cls, directory: Path = KNOWLEDGE_DIR) -> "KnowledgeIndex":
+        """Monta o índice a partir dos arquivos Markdown do diretório."""
+        files = _corpus_files(directory)
+        passages, sources = [], []
+        vocabulary: dict[str, int] = {}
+        postings_docs: list[array] = []
+        postings_tfs: list[array] = []
+        doc_lengths = array("H")
+
+        for file in files:
+            title = ""
+            for block in _PARAGRAPH_SPLIT_RE.split(file.read_text(encoding="utf-8")):
+                block = block.strip()
+                if not block:
+                    continue
+                if block.startswith("#"):
+                    title = block.lstrip("#").strip()
+                    continue
+
+                doc_id = len(passages)
+                passages.append(block)
+                sources.append(file.stem)
+                terms = index_terms(f"{title} {block}")
+                doc_lengths.append(min(len(terms), 0xFFFF))
+                for term, frequency in Counter(terms).items():
+                    term_id = vocabulary.setdefault(term, len(vocabulary))
+                    if term_id == len(postings_docs):
+                        postings_docs.append(array("I"))
+                        postings_tfs.append(array("H"))
+                    postings_docs[term_id].append(doc_id)
+                    postings_tfs[term_id].append(min(frequency, 0xFFFF))
+
+        logger.info(f"Índice de conhecimento local montado: {len(passages)} trechos, {len(vocabulary)} termos.")
+        return cls(passages, sources, vocabulary, postings_docs, postings_tfs, doc_lengths,
+                   _corpus_fingerprint(files))
+
+    def _rank(self, terms: set[str], k: int) -> list[tuple[int, float]]:
+        scores: dict[int, float] = defaultdict(float)
+        for term in terms:
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            idf = self._idf[term_id]
+            for doc_id, frequency in zip(self.postings_docs[term_id], self.postings_tfs[term_id]):
+                length_norm = 1 - _BM25_B + _BM25_B * self.doc_lengths[doc_id] / self._avg_length
+                scores[doc_id] += idf * frequency * (_BM25_K1 + 1) / (frequency + _BM25_K1 * length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def search(self, query: str, k: int = 3) -> list[tuple[float, str, str]]:
+        """
+        Busca os trechos mais relevantes para a consulta.
+
+        Returns:
+            Lista de até 'k' tuplas (pontuação BM25, trecho, arquivo de origem), da maior para a menor pontuação.
+        """
+        best = self._rank(set(index_terms(query)), k)
+        return [(score, self.passages[doc_id], self.sources[doc_id]) for doc_id, score in best]
+
+    def lookup(self, query: str, k: int = 3) -> list[tuple[float, str, str]]:
+        """
+        Como 'search', mas só retorna trechos quando a base local parece responder a pergunta:
+        o melhor trecho precisa ter pontuação mínima e conter os termos que mais pesam na consulta
+        (termos desconhecidos pelo índice contam com o peso máximo). Caso contrário, retorna lista vazia.
+        """
+        terms = set(index_terms(query))
+        best = self._rank(terms, k)
+        if not best or best[0][1] < KNOWLEDGE_MIN_SCORE:
+            return []
+
+        top_doc = best[0][0]
+        max_idf = max(self._idf, default=0.0)
+        total_weight = covered_weight = 0.0
+        for term in terms:
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                total_weight += max_idf
+                continue
+            total_weight += self._idf[term_id]
+            if top_doc in self.postings_docs[term_id]:
+                covered_weight += self._idf[term_id]
+
+        confidence = covered_weight / total_weight if total_weight else 0.0
+        if confidence < KNOWLEDGE_MIN_CONFIDENCE:
+            logger.debug(f"Base local insuficiente para '{query}' (confiança {confidence:.2f}).")
+            return []
+        return [(score, self.passages[doc_id], self.sources[doc_id]) for doc_id, score in best]
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "passages": self.passages, "sources": self.sources, "vocabulary": self.vocabulary,
+            "postings_docs": self.postings_docs, "postings_tfs": self.postings_tfs,
+            "doc_lengths": self.doc_lengths, "fingerprint": self.fingerprint,
+        }
+        path.write_bytes(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def load(cls, path: str | Path) -> "KnowledgeIndex":
+        return cls(**pickle.loads(Path(path).read_bytes()))
+
+
+_knowledge_index: KnowledgeIndex | None = None
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """
+    Retorna o índice local, carregando-o uma única vez: usa o arquivo salvo em KNOWLEDGE_INDEX_PATH
+    se ele corresponder aos arquivos atuais da base, senão monta o índice e o salva.
+    """
+    global _knowledge_index
+    if _knowledge_index is not None:
+        return _knowledge_index
+
+    fingerprint = _corpus_fingerprint(_corpus_files(KNOWLEDGE_DIR))
+    try:
+        index = KnowledgeIndex.load(KNOWLEDGE_INDEX_PATH)
+        if index.fingerprint == fingerprint:
+            _knowledge_index = index
+            return index
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Índice de conhecimento salvo inválido ({e}); montando novamente.")
+
+    _knowledge_index = KnowledgeIndex.build()
+    try:
+        _knowledge_index.save(KNOWLEDGE_INDEX_PATH)
+    except OSError as e:
+        logger.warning(f"Não foi possível salvar o índice de conhecimento: {e}")
+    return _knowledge_index
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    rebuilt = KnowledgeIndex.build()
+    rebuilt.save(KNOWLEDGE_INDEX_PATH)
+    print(f"Índice salvo em {KNOWLEDGE_INDEX_PATH}.")
+    for question in sys.argv[1:]:
+        print(f"\n{question}")
+        found = rebuilt.lookup(question)
+        print(f"  -> {'base local' if found else 'busca na web'}")
+        for score, passage, source in rebuilt.search(question):
+            print(f"  {score:6.2f} [{source}] {passage[:100]}")
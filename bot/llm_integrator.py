@@ -1,33 +1,155 @@
+import asyncio
 import logging
 import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
 
-import google.generativeai as genai
 from dotenv import load_dotenv
 
+from bot.consts import TEXT_LLM_BLOCKED
+from bot.metrics import metrics
+from bot.prompt_builder import SYSTEM_PROMPT, build_prompt
+from bot.resilience import CircuitOpenError, Upstream, is_transient
+
 logger = logging.getLogger(__name__)
 load_dotenv()
 
 # --- Configuração do Gemini ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Endpoint alternativo da API (ex.: um proxy ou o servidor falso dos benchmarks); usa o transporte REST
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
 model = None
 gemini_configured = False
-response = None
+_gemini_failed = False
+_gemini_setup: asyncio.Task | None = None
+
+# --- Limites das chamadas ao Gemini ---
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "50"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"
+
+# Disjuntor, timeout adaptativo (de 5s a LLM_TIMEOUT) e uma nova tentativa nas chamadas ao Gemini.
+# No streaming o timeout adaptativo vale até o primeiro pedaço e não há novas tentativas.
+gemini_upstream = Upstream("gemini", min_timeout=5.0, max_timeout=LLM_TIMEOUT, max_retries=1)
+
+
+class LLMOverloadedError(Exception):
+    """A fila de chamadas ao Gemini está cheia."""
+
+
+class LLMIncompleteError(Exception):
+    """O streaming foi interrompido (erro, timeout ou bloqueio) depois de parte do texto já ter sido entregue."""
+
+
+class FairLLMScheduler:
+    """
+    Limita o número de chamadas simultâneas ao Gemini e distribui as vagas de forma justa
+    entre os usuários: cada usuário tem sua própria fila e as filas são atendidas em rodízio,
+    então um usuário com várias perguntas pendentes não atrasa os demais.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._active = 0
+        self._queued = 0
+        self._queues: OrderedDict[object, deque[asyncio.Future]] = OrderedDict()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @asynccontextmanager
+    async def slot(self, key):
+        """
+        Aguarda uma vaga para o usuário 'key'.
+
+        Raises:
+            LLMOverloadedError: se a fila estiver cheia.
+        """
+        if self._active < self.max_concurrency and not self._queued:
+            self._active += 1
+        else:
+            if self._queued >= self.max_queue:
+                raise LLMOverloadedError()
+            waiter = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(key, deque()).append(waiter)
+            self._queued += 1
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # A vaga já tinha sido repassada para esta chamada: devolve para o próximo da fila
+                    self._release()
+                else:
+                    self._remove_waiter(key, waiter)
+                raise
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _remove_waiter(self, key, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(key)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[key]
+
+    def _release(self) -> None:
+        """Repassa a vaga para o próximo usuário do rodízio ou a libera."""
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+
+llm_scheduler = FairLLMScheduler(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE)
 
 
 def configure_gemini():
-    """Configura a API e o modelo do Gemini."""
-    global model, gemini_configured
+    """
+    Configura a API e o modelo do Gemini.
+
+    O google.generativeai é importado aqui (e não no topo do módulo) porque a importação é lenta:
+    assim o bot começa a receber updates sem esperar por ela.
+    """
+    global model, gemini_configured, _gemini_failed
     if gemini_configured:
         return True
 
     if not GEMINI_API_KEY:
         logger.warning("A API key do GEMINI não está definida")
+        _gemini_failed = True
         return False
     else:
         try:
-            genai.configure(api_key=GEMINI_API_KEY)
+            import google.generativeai as genai
+
+            if GEMINI_API_ENDPOINT:
+                genai.configure(api_key=GEMINI_API_KEY, transport="rest",
+                                client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+                logger.info(f"Usando o endpoint alternativo do Gemini: {GEMINI_API_ENDPOINT}")
+            else:
+                genai.configure(api_key=GEMINI_API_KEY)
             logger.info("API Key do Gemini configurada com sucesso.")
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')  # gemini-1.5-flash-latest
+            model = genai.GenerativeModel('gemini-2.0-flash-exp', system_instruction=SYSTEM_PROMPT)  # gemini-1.5-flash-latest
             logger.info(f"Modelo Gemini '{model.model_name}' inicializado.")
             gemini_configured = True
             return True
@@ -35,66 +157,106 @@ def configure_gemini():
             logger.error(f"Falha ao configurar a API do Gemini ou inicializar o modelo: {e}")
             model = None
             gemini_configured = False
+            _gemini_failed = True
             return False
 
 
-def generate_llm_response(user_question: str, context_info: str = None):
+def is_gemini_available() -> bool:
+    """Indica se o Gemini pode ser usado (já configurado ou ainda não tentado, com API key definida)."""
+    return gemini_configured or (bool(GEMINI_API_KEY) and not _gemini_failed)
+
+
+async def ensure_gemini() -> bool:
+    """
+    Garante que o Gemini esteja configurado, rodando configure_gemini em uma thread uma única vez
+    (chamadas simultâneas aguardam a mesma configuração).
+    """
+    global _gemini_setup
+    if gemini_configured:
+        return True
+    if _gemini_failed:
+        return False
+    if _gemini_setup is None:
+        _gemini_setup = asyncio.create_task(asyncio.to_thread(configure_gemini), name="configure_gemini")
+    return await asyncio.shield(_gemini_setup)
+
+
+async def _generate_content(prompt: str, stream: bool = False):
+    """
+    Chama o modelo sem bloquear o loop. O cliente assíncrono do SDK só funciona com o transporte
+    gRPC; com o transporte REST (GEMINI_API_ENDPOINT) a chamada síncrona roda em uma thread.
+    """
+    if GEMINI_API_ENDPOINT:
+        return await asyncio.to_thread(model.generate_content, prompt, stream=stream)
+    return await model.generate_content_async(prompt, stream=stream)
+
+
+async def _generate_tracked(prompt: str):
+    with metrics.track("upstream", upstream="gemini"):
+        return await _generate_content(prompt)
+
+
+async def _iterate_in_thread(iterable):
+    """Percorre um iterador síncrono (streaming do transporte REST) sem bloquear o loop."""
+    iterator = iter(iterable)
+    done = object()
+    while (item := await asyncio.to_thread(next, iterator, done)) is not done:
+        yield item
+
+
+async def generate_llm_response(user_question: str, context_snippets: list[str] = None, user_id=None, history=None):
     """
     Gera uma resposta usando o Gemini, opcionalmente usando informações de contexto (grounding).
 
+    A chamada é assíncrona, passa pelo limite de concorrência (fila justa por usuário) e tem timeout.
+
     Args:
         user_question: A pergunta original do usuário;
-        context_info: string contendo informação atual relevante (opcional).
+        context_snippets: trechos de informação atual relevante (opcional); os mais relevantes
+            para a pergunta são escolhidos dentro do orçamento de tokens do prompt;
+        user_id: identificador do usuário, usado para a fila justa (opcional);
+        history: memória da conversa com o usuário, para perguntas de continuação (opcional).
 
     Returns:
         A resposta de texto gerada pela LLM ou None em caso de erro.
+
+    Raises:
+        LLMOverloadedError: se a fila de chamadas ao Gemini estiver cheia.
     """
-    global response
-    if not gemini_configured or model is None:
-        logger.error("Tentativa de gerar resposta LLM sem configuração prévia.")
+    if not await ensure_gemini() or model is None:
+        logger.error("Tentativa de gerar resposta LLM sem o Gemini configurado.")
         return None
 
+    response = None
     try:
-        system_prompt = (
-            "Você é um assistente chatbot especialista na equipe brasileira de e-sports FURIA. "
-            "Responda a seguinte pergunta sobre a equipe (jogadores atuais, staff, resultados recentes, história, etc.) "
-            "de forma informativa e engajada.\n"
-            "**Instrução Importante:** "
-        )
-
-        if context_info:
-            system_prompt += (
-                "Use PRIMARIAMENTE a 'Informação Atual Relevante' fornecida abaixo para formular sua resposta. "
-                "Se a informação necessária não estiver no contexto, use seu conhecimento geral, mas AVISE que a informação pode não ser a mais recente.\n\n"
-                "## Informação Atual Relevante:\n"
-                f"{context_info}\n\n"
-                "## Pergunta do Fã:\n"
-                f"{user_question}\n\n"
-                "## Sua Resposta:"
-            )
-        else:
-            system_prompt += (
-                "Responda à pergunta do fã usando seu conhecimento geral. AVISE que a informação pode não ser a mais recente.\n\n"
-                "## Pergunta do Fã:\n"
-                f"{user_question}\n\n"
-                "## Sua Resposta:"
-            )
+        full_prompt = build_prompt(user_question, context_snippets, history)
+        if gemini_upstream.is_open():
+            raise CircuitOpenError(gemini_upstream.name)
 
-        full_prompt = system_prompt
-
-        assert isinstance(model, genai.GenerativeModel)
-        response = model.generate_content(full_prompt)
+        queued_at = time.perf_counter()
+        async with llm_scheduler.slot(user_id):
+            metrics.observe("llm_queue_wait_seconds", time.perf_counter() - queued_at)
+            response = await gemini_upstream.call(lambda timeout: _generate_tracked(full_prompt))
 
         if not response.candidates:
             logger.warning(
                 f"Resposta bloqueada para a pergunta '{user_question}'. Feedback: {response.prompt_feedback}")
-            return "Desculpe, não posso responder a essa pergunta devido às políticas de segurança."
+            return TEXT_LLM_BLOCKED
 
         llm_response_text = response.text
         logger.info(
-            f"Resposta do Gemini para '{user_question}' (com contexto? {'Sim' if context_info else 'Não'}): {llm_response_text[:100]}...")
+            f"Resposta do Gemini para '{user_question}' (com contexto? {'Sim' if context_snippets else 'Não'}): {llm_response_text[:100]}...")
         return llm_response_text
 
+    except LLMOverloadedError:
+        logger.warning(f"Fila do Gemini cheia ({llm_scheduler.queued} pendentes). Pergunta '{user_question}' recusada.")
+        raise
+    except CircuitOpenError:
+        logger.warning(f"Gemini indisponível (circuito aberto). Pergunta '{user_question}' sem resposta nova.")
+        return None
+    except asyncio.TimeoutError:
+        logger.error(f"Timeout ({gemini_upstream.timeout():.0f}s) ao chamar a API Gemini para a pergunta '{user_question}'.")
+        return None
     except Exception as e:
         logger.error(f"Erro ao chamar a API Gemini para a pergunta '{user_question}': {e}")
         try:
@@ -104,4 +266,101 @@ def generate_llm_response(user_question: str, context_info: str = None):
         return None
 
 
-configure_gemini()
+async def stream_llm_response(user_question: str, context_snippets: list[str] = None, user_id=None, history=None):
+    """
+    Versão em streaming de generate_llm_response: gera os pedaços de texto conforme o Gemini os produz.
+
+    Em caso de erro ou timeout a geração é interrompida (o texto parcial já entregue é mantido);
+    quem consome identifica a falha quando nenhum texto foi gerado.
+
+    Raises:
+        LLMOverloadedError: se a fila de chamadas ao Gemini estiver cheia;
+        LLMIncompleteError: se a geração falhou ou foi bloqueada depois de algum texto ter sido
+            entregue (inclusive o aviso de bloqueio): esse texto não deve ser reaproveitado.
+    """
+    if not await ensure_gemini() or model is None:
+        logger.error("Tentativa de gerar resposta LLM sem o Gemini configurado.")
+        return
+
+    response = None
+    received = 0
+    completed = False
+    try:
+        full_prompt = build_prompt(user_question, context_snippets, history)
+        if gemini_upstream.is_open():
+            raise CircuitOpenError(gemini_upstream.name)
+
+        queued_at = time.perf_counter()
+        async with llm_scheduler.slot(user_id):
+            started_at = time.perf_counter()
+            metrics.observe("llm_queue_wait_seconds", started_at - queued_at)
+            # A duração do streaming inclui o tempo de entrega de cada pedaço ao usuário
+            with metrics.track("upstream", upstream="gemini_stream"):
+                gemini_upstream.allow()
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + LLM_TIMEOUT
+                # Até o primeiro pedaço vale o timeout adaptativo; depois, o prazo total LLM_TIMEOUT
+                first_chunk_deadline = min(loop.time() + gemini_upstream.timeout(), deadline)
+                try:
+                    response = await asyncio.wait_for(_generate_content(full_prompt, stream=True),
+                                                      first_chunk_deadline - loop.time())
+                    chunks = _iterate_in_thread(response) if GEMINI_API_ENDPOINT else aiter(response)
+                    chunk = await asyncio.wait_for(anext(chunks), max(first_chunk_deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    chunk = None
+                except Exception as e:
+                    if is_transient(e):
+                        gemini_upstream.record_failure(e)
+                    raise
+                gemini_upstream.record_success(time.perf_counter() - started_at)
+
+                pending = [chunk] if chunk is not None else []
+                blocked = False
+                while True:
+                    if pending:
+                        chunk = pending.pop()
+                    else:
+                        try:
+                            chunk = await asyncio.wait_for(anext(chunks), max(deadline - loop.time(), 0))
+                        except StopAsyncIteration:
+                            break
+
+                    if not chunk.candidates:
+                        logger.warning(
+                            f"Resposta bloqueada para a pergunta '{user_question}'. Feedback: {chunk.prompt_feedback}")
+                        if not received:
+                            yield TEXT_LLM_BLOCKED
+                            received = len(TEXT_LLM_BLOCKED)
+                        blocked = True
+                        break
+
+                    if not chunk.parts:
+                        continue
+                    text = chunk.text
+                    if not received:
+                        metrics.observe("upstream_duration_seconds", time.perf_counter() - started_at,
+                                        upstream="gemini_first_chunk")
+                    received += len(text)
+                    yield text
+                completed = not blocked
+
+        logger.info(
+            f"Resposta do Gemini (streaming) para '{user_question}' (com contexto? {'Sim' if context_snippets else 'Não'}): {received} caracteres.")
+
+    except LLMOverloadedError:
+        logger.warning(f"Fila do Gemini cheia ({llm_scheduler.queued} pendentes). Pergunta '{user_question}' recusada.")
+        raise
+    except CircuitOpenError:
+        logger.warning(f"Gemini indisponível (circuito aberto). Pergunta '{user_question}' sem resposta nova.")
+    except asyncio.TimeoutError:
+        logger.error(f"Timeout no streaming da API Gemini para a pergunta '{user_question}'.")
+    except Exception as e:
+        logger.error(f"Erro no streaming da API Gemini para a pergunta '{user_question}': {e}")
+        try:
+            logger.error(f"Gemini prompt feedback: {response.prompt_feedback}")
+        except (Exception,):
+            pass
+
+    if received and not completed:
+        raise LLMIncompleteError()
+
@@ -1,59 +1,279 @@
+from bot import startup  # primeiro import: marca o início da inicialização
+
+import asyncio
 import os
+import time
 
 import httpx
 from dotenv import load_dotenv
+from telegram import Update
 from telegram.constants import ParseMode
-from telegram.ext import Application, PicklePersistence, Defaults
+from telegram.error import NetworkError
+from telegram.ext import Application, Defaults, TypeHandler
 
+from bot import http_client
+from bot.answer_cache import report_answer_cache_stats
 from bot.consts import logger
+from bot.handlers.admin import profile_handler, stats_handler
 from bot.handlers.conversation import conv_handler
 from bot.handlers.error import error_handler
+from bot.handlers.results import results_callback_handler
+from bot.knowledge_index import get_knowledge_index
+from bot.llm_integrator import ensure_gemini
+from bot.match_store import (
+    MATCH_BACKFILL_RETRY_INTERVAL, RESULTS_CACHE_TTL, backfill_matches_job, refresh_results_job
+)
+from bot.metrics import METRICS_PORT, start_metrics_server
+from bot.notifications import check_new_results_job, notifications
+from bot.persistence import SQLitePersistence
+from bot.profiler import profiler
+from bot.rate_limiter import TokenBucketRateLimiter
+from bot.update_processor import ChatSerializedUpdateProcessor
+from bot.workers import BOT_WORKERS, WorkerPool, forward_update
 
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+# Servidor da Bot API (ex.: um servidor local da Bot API ou o servidor falso dos benchmarks)
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+PERSISTENCE_DB_PATH = os.getenv("PERSISTENCE_DB_PATH", "furia_bot_data/furia_bot.sqlite3")
+LEGACY_PICKLE_PATH = "../furia_bot_data"
 
-if not TELEGRAM_TOKEN or not GEMINI_API_KEY or not SERPER_API_KEY:
-    logger.critical("Variáveis de ambiente vazias")
-    exit(1)
+# --- Modo de execução ---
+# "polling" (padrão) ou "webhook" (servidor HTTP embutido recebendo os updates do Telegram)
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # URL pública, ex.: https://bot.exemplo.com/telegram
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN")
+# Updates processados ao mesmo tempo (os de um mesmo chat são sempre processados em ordem)
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "64"))
+# Espera entre reinícios após falha de rede: dobra a cada falha seguida, até o máximo
+RESTART_BACKOFF_INITIAL = float(os.getenv("RESTART_BACKOFF_INITIAL", "1"))
+RESTART_BACKOFF_MAX = float(os.getenv("RESTART_BACKOFF_MAX", "300"))
+# Uma execução que durou pelo menos isso zera o backoff
+RESTART_BACKOFF_RESET_AFTER = 300
 
+_background_tasks: set[asyncio.Task] = set()
+_metrics_server: asyncio.Server | None = None
+# Índice do worker deste processo (None com um único processo); só o primeiro roda os jobs e os avisos
+_worker_index: int | None = None
 
-def main() -> None:
-    """Essa função inicia o bot e configura os handlers de
-    conversação e de erro, além de lidar com exceções."""
-    logger.info("Iniciando o bot...")
 
-    persistence = PicklePersistence(filepath="../furia_bot_data")
+def _is_primary() -> bool:
+    return not _worker_index
+
+
+def check_environment() -> None:
+    """Encerra o processo se a configuração obrigatória estiver ausente ou inválida."""
+    if not TELEGRAM_TOKEN or not GEMINI_API_KEY or not SERPER_API_KEY:
+        logger.critical("Variáveis de ambiente vazias")
+        exit(1)
+
+    if BOT_MODE not in ("polling", "webhook"):
+        logger.critical(f"BOT_MODE inválido: '{BOT_MODE}' (use 'polling' ou 'webhook')")
+        exit(1)
+
+    if BOT_MODE == "webhook" and not WEBHOOK_URL:
+        logger.critical("BOT_MODE=webhook exige a variável WEBHOOK_URL")
+        exit(1)
+
+    if BOT_WORKERS < 0:
+        logger.critical(f"BOT_WORKERS inválido: {BOT_WORKERS}")
+        exit(1)
+
+
+async def warm_up_gemini() -> None:
+    """Configura o Gemini em segundo plano, enquanto o bot já recebe updates."""
+    if await ensure_gemini():
+        startup.mark("gemini_pronto")
+        logger.info(startup.report())
+
+
+async def on_startup(application: Application) -> None:
+    """Cria os recursos compartilhados antes de começar a receber updates."""
+    global _metrics_server
+    http_client.create_http_client()
+    try:
+        # Com vários workers, cada um expõe as suas métricas na porta seguinte à do anterior
+        _metrics_server = await start_metrics_server(
+            port=METRICS_PORT + (_worker_index or 0) if METRICS_PORT else 0)
+    except OSError as e:
+        logger.error(f"Não foi possível iniciar o endpoint de métricas: {e}")
+
+    profiler.install_signal_handler(asyncio.get_running_loop())
+    if _is_primary():
+        # Retoma os avisos de resultados que ficaram pela metade antes de um reinício
+        notifications.start(application.bot)
+
+    task = asyncio.create_task(warm_up_gemini(), name="warm_up_gemini")
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+    startup.mark("escutando")
+    logger.info(startup.report())
+
+
+async def on_shutdown(application: Application) -> None:
+    """Libera os recursos compartilhados ao finalizar o bot."""
+    global _metrics_server
+    profiler.stop()
+    await notifications.stop()
+    await http_client.close_http_client()
+    if _metrics_server is not None:
+        _metrics_server.close()
+        await _metrics_server.wait_closed()
+        _metrics_server = None
+
+
+def _application_builder():
+    builder = Application.builder().token(TELEGRAM_TOKEN)
+    if TELEGRAM_BASE_URL:
+        base_url = TELEGRAM_BASE_URL.rstrip("/")
+        builder = builder.base_url(f"{base_url}/bot").base_file_url(f"{base_url}/file/bot")
+    return builder
+
+
+def build_application(worker_index: int | None = None) -> Application:
+    """
+    Monta a aplicação com persistência, handlers e jobs.
+
+    Args:
+        worker_index: índice do worker (modo com BOT_WORKERS); os jobs só rodam no worker 0.
+    """
+    global _worker_index
+    _worker_index = worker_index
+    persistence = SQLitePersistence(filepath=PERSISTENCE_DB_PATH, legacy_pickle_path=LEGACY_PICKLE_PATH)
 
     defaults = Defaults(parse_mode=ParseMode.MARKDOWN)
 
     application = (
-        Application.builder()
-        .token(TELEGRAM_TOKEN)
+        _application_builder()
         .persistence(persistence)
         .defaults(defaults)
+        .concurrent_updates(ChatSerializedUpdateProcessor(UPDATE_CONCURRENCY))
+        .rate_limiter(TokenBucketRateLimiter())
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
         .build()
     )
 
+    application.add_handler(TypeHandler(Update, startup.log_first_update, block=False), group=-1)
     application.add_handler(conv_handler)
+    # Fora do ConversationHandler: os botões de página funcionam em qualquer estado da conversa
+    application.add_handler(results_callback_handler)
+    application.add_handler(stats_handler)
+    application.add_handler(profile_handler)
+    profiler.attach(conv_handler)
 
     application.add_error_handler(error_handler)
 
-    try:
-        logger.info("Bot iniciado e escutando por updates...")
-        application.run_polling()
+    if application.job_queue and not _is_primary():
+        # Os outros workers leem o histórico e os avisos gravados pelo primeiro
+        application.job_queue.run_repeating(
+            report_answer_cache_stats, interval=600, first=600, name="report_answer_cache_stats"
+        )
+    elif application.job_queue:
+        application.job_queue.run_repeating(
+            refresh_results_job, interval=RESULTS_CACHE_TTL, first=0, name="refresh_results_cache"
+        )
+        application.job_queue.run_repeating(
+            check_new_results_job, interval=RESULTS_CACHE_TTL, first=RESULTS_CACHE_TTL / 2, name="check_new_results"
+        )
+        # Carrega o histórico antigo de partidas; depois de concluída, cada execução só consulta o progresso salvo
+        application.job_queue.run_repeating(
+            backfill_matches_job, interval=MATCH_BACKFILL_RETRY_INTERVAL, first=5, name="backfill_matches"
+        )
+        application.job_queue.run_repeating(
+            report_answer_cache_stats, interval=600, first=600, name="report_answer_cache_stats"
+        )
+    else:
+        logger.warning("JobQueue indisponível; os resultados serão atualizados apenas sob demanda, o histórico "
+                       "antigo não será carregado, os inscritos não receberão avisos de resultados novos "
+                       "e as métricas do cache de respostas não serão registradas.")
+
+    return application
+
+
+def build_ingress_application(pool: WorkerPool) -> Application:
+    """
+    Monta a aplicação do processo principal no modo com vários workers: ela só recebe os updates
+    (polling ou webhook) e os repassa, em ordem, ao worker de cada chat.
+    """
+    application = _application_builder().job_queue(None).build()
+    application.bot_data["worker_pool"] = pool
+    application.add_handler(TypeHandler(Update, forward_update))
+    return application
+
+
+def run_application(application: Application) -> None:
+    """Executa a aplicação no modo configurado até ela ser parada (Ctrl+C/SIGTERM) ou falhar."""
+    if BOT_MODE == "webhook":
+        logger.info(f"Bot iniciado em modo webhook, escutando em {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}...")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET_TOKEN,
+            allowed_updates=Update.ALL_TYPES,
+            close_loop=False,
+        )
+    else:
+        logger.info("Bot iniciado e escutando por updates (polling)...")
+        application.run_polling(allowed_updates=Update.ALL_TYPES, close_loop=False)
+
+
+def main() -> None:
+    """Essa função inicia o bot e configura os handlers de
+    conversação e de erro, além de lidar com exceções.
+
+    Falhas de rede reiniciam o bot em um laço com espera exponencial (sem recursão)."""
+    logger.info("Iniciando o bot...")
+    startup.mark("imports")
+    check_environment()
+
+    pool = None
+    if BOT_WORKERS >= 2:
+        # Cada worker carrega a base de conhecimento e monta a aplicação completa
+        pool = WorkerPool(BOT_WORKERS)
+        pool.start()
+        logger.info(f"Updates distribuídos por chat entre {BOT_WORKERS} workers.")
+    else:
+        # Carrega a base local de conhecimento antes da primeira pergunta
+        get_knowledge_index()
+
+    backoff = RESTART_BACKOFF_INITIAL
+    while True:
+        started_at = time.monotonic()
+        try:
+            run_application(build_ingress_application(pool) if pool else build_application())
+            break
+
+        except (KeyboardInterrupt, SystemExit):
+            logger.info("Bot sendo parado manualmente (Ctrl+C ou SystemExit)...")
+            break
+        except (NetworkError, httpx.ConnectError) as e:
+            if time.monotonic() - started_at >= RESTART_BACKOFF_RESET_AFTER:
+                backoff = RESTART_BACKOFF_INITIAL
+            logger.exception(f"Erro de conexão com o servidor: {e}. Reiniciando em {backoff:.0f}s...")
+            try:
+                time.sleep(backoff)
+            except KeyboardInterrupt:
+                logger.info("Bot sendo parado manualmente durante a espera para reiniciar...")
+                break
+            backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+        except Exception as e:
+            logger.exception(f"Ocorreu uma exceção fatal no loop principal: {e}")
+            break
 
-    except (KeyboardInterrupt, SystemExit):
-        logger.info("Bot sendo parado manualmente (Ctrl+C ou SystemExit)...")
-    except httpx.ConnectError as e:
-        logger.exception("Erro de conexão com o servidor: %s", e)
-        main()
-    except Exception as e:
-        logger.exception(f"Ocorreu uma exceção fatal no loop principal: {e}")
-    finally:
-        logger.info("Bot finalizado.")
+    if pool is not None:
+        pool.stop()
+    logger.info("Bot finalizado.")
 
 
-main()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Iterable
+
+from bot.db import connect_sqlite
+from bot.metrics import metrics
+from bot.scraper import DRAFT5_FURIA_RESULTS_URL, MatchResult, load_furia_results
+
+logger = logging.getLogger(__name__)
+
+MATCH_STORE_PATH = os.getenv("MATCH_STORE_PATH", "furia_bot_data/matches.sqlite3")
+
+# --- Atualização dos resultados (stale-while-revalidate) ---
+# Depois de RESULTS_CACHE_TTL segundos desde a última sincronização os dados locais ficam "velhos":
+# continuam sendo servidos enquanto a busca incremental roda em segundo plano. Só depois de
+# RESULTS_CACHE_MAX_STALE segundos o usuário precisa esperar pelo Draft5.
+RESULTS_CACHE_TTL = float(os.getenv("RESULTS_CACHE_TTL", "120"))
+RESULTS_CACHE_MAX_STALE = float(os.getenv("RESULTS_CACHE_MAX_STALE", "3600"))
+
+# --- Carga do histórico ---
+# Na primeira execução as páginas antigas (?page=2, 3, ...) são baixadas em segundo plano, uma a
+# cada MATCH_CRAWL_PAGE_DELAY segundos; a carga é retomada de onde parou se o bot for reiniciado.
+MATCH_BACKFILL_MAX_PAGES = int(os.getenv("MATCH_BACKFILL_MAX_PAGES", "100"))
+MATCH_CRAWL_PAGE_DELAY = float(os.getenv("MATCH_CRAWL_PAGE_DELAY", "1.0"))
+# Intervalo entre as tentativas de carga (se uma falhar, a próxima retoma da página salva)
+MATCH_BACKFILL_RETRY_INTERVAL = 600
+# Páginas lidas por uma sincronização incremental antes de desistir de encontrar uma partida já conhecida
+MATCH_SYNC_MAX_PAGES = 5
+# Com vários workers (BOT_WORKERS), outros processos também gravam no histórico: o estado em
+# memória é relido do banco quando ele muda, verificando no máximo uma vez a cada tantos segundos
+MATCH_STORE_RECHECK_INTERVAL = 5.0
+
+_BACKFILL_STATE = "backfill_next_page"
+_BACKFILL_DONE = "done"
+_SYNCED_AT_STATE = "synced_at"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id INTEGER PRIMARY KEY,
+    match_date INTEGER,
+    date TEXT NOT NULL,
+    opponent_name TEXT NOT NULL COLLATE NOCASE,
+    tournament_name TEXT NOT NULL COLLATE NOCASE,
+    furia_score,
+    opponent_score
+);
+CREATE INDEX IF NOT EXISTS idx_matches_date ON matches (match_date);
+CREATE INDEX IF NOT EXISTS idx_matches_opponent ON matches (opponent_name, match_date);
+CREATE INDEX IF NOT EXISTS idx_matches_tournament ON matches (tournament_name, match_date);
+CREATE TABLE IF NOT EXISTS crawl_state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_COLUMNS = "furia_score, opponent_score, opponent_name, tournament_name, date, match_id, match_date"
+_ORDER = "ORDER BY match_date DESC, match_id DESC"
+
+
+class MatchStore:
+    """
+    Histórico local (SQLite) de todas as partidas da FURIA no Draft5, indexado por matchId,
+    data, adversário e campeonato.
+
+    As partidas são gravadas pela sincronização (sync_latest_matches) e pela carga do histórico
+    (backfill_matches); as telas de resultados e o roteador de intenções só leem daqui.
+    Todo acesso ao banco roda em uma thread, fora do event loop.
+    """
+
+    def __init__(self, path: str = MATCH_STORE_PATH):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+        # Mantidos em memória: consultados a cada tela de resultados ou pergunta
+        self.size: int | None = None
+        self.synced_at = 0.0
+        # Muda sempre que alguma partida é gravada ou alterada (chave dos caches derivados do histórico)
+        self.version = 0
+        self._data_version = None
+        self._checked_at = 0.0
+        self._opponents: list[str] | None = None
+        self._tournaments: list[str] | None = None
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = connect_sqlite(self.path)
+            self._connection.executescript(_SCHEMA)
+            self._load_state()
+        return self._connection
+
+    def _load_state(self) -> None:
+        connection = self._connection
+        # 'data_version' só muda quando outra conexão (de outro processo) grava no banco
+        self._data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+        self.size = connection.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+        row = connection.execute("SELECT value FROM crawl_state WHERE key = ?", (_SYNCED_AT_STATE,)).fetchone()
+        self.synced_at = float(row[0]) if row else 0.0
+
+    def _sync_state(self) -> bool:
+        # Chamado com self._lock: relê o estado se outro processo gravou no banco
+        connection = self._connect()
+        if connection.execute("PRAGMA data_version").fetchone()[0] == self._data_version:
+            return False
+        self._load_state()
+        self.version += 1
+        self._opponents = self._tournaments = None
+        return True
+
+    def _reload_if_changed(self) -> bool:
+        with self._lock:
+            return self._sync_state()
+
+    def _query(self, sql: str, params=()) -> tuple[MatchResult, ...]:
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return tuple(MatchResult(*row) for row in rows)
+
+    def _add(self, results: Iterable[MatchResult]) -> int:
+        rows = [
+            (r.match_id, r.timestamp, r.date, r.opponent_name, r.tournament_name, r.furia_score, r.opponent_score)
+            for r in results if r.match_id is not None
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            connection = self._connect()
+            # O tamanho em memória precisa refletir o que outros processos já gravaram
+            self._sync_state()
+            placeholders = ",".join("?" * len(rows))
+            known = connection.execute(
+                f"SELECT COUNT(*) FROM matches WHERE match_id IN ({placeholders})", [row[0] for row in rows]
+            ).fetchone()[0]
+            with connection:
+                # Partidas já conhecidas são atualizadas (o placar pode ter sido corrigido)
+                changed = connection.executemany(
+                    "INSERT INTO matches (match_id, match_date, date, opponent_name, tournament_name, "
+                    "furia_score, opponent_score) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (match_id) DO UPDATE SET match_date = excluded.match_date, date = excluded.date, "
+                    "opponent_name = excluded.opponent_name, tournament_name = excluded.tournament_name, "
+                    "furia_score = excluded.furia_score, opponent_score = excluded.opponent_score "
+                    "WHERE (match_date, date, opponent_name, tournament_name, furia_score, opponent_score) "
+                    "IS NOT (excluded.match_date, excluded.date, excluded.opponent_name, excluded.tournament_name, "
+                    "excluded.furia_score, excluded.opponent_score)",
+                    rows,
+                ).rowcount
+            new = len({row[0] for row in rows}) - known
+            if new:
+                self.size += new
+                self._opponents = self._tournaments = None
+            if changed:
+                self.version += 1
+        return new
+
+    def _get_state(self, key: str) -> str | None:
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM crawl_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO crawl_state (key, value) VALUES (?, ?)", (key, value))
+
+    def _distinct(self, column: str) -> list[str]:
+        with self._lock:
+            rows = self._connect().execute(f"SELECT DISTINCT {column} FROM matches").fetchall()
+        return [row[0] for row in rows]
+
+    # --- Interface assíncrona ---
+
+    async def load(self) -> None:
+        """Abre o banco (se ainda não estiver aberto) e carrega o tamanho e a data da última sincronização."""
+        if self.size is None:
+            await asyncio.to_thread(self._connect)
+
+    async def reload_if_changed(self) -> None:
+        """Relê o tamanho e a data da última sincronização se outro processo gravou no banco."""
+        now = time.monotonic()
+        if now - self._checked_at < MATCH_STORE_RECHECK_INTERVAL:
+            return
+        self._checked_at = now
+        if await asyncio.to_thread(self._reload_if_changed):
+            logger.debug(f"Histórico alterado por outro processo; {self.size} partidas.")
+
+    async def add(self, results: Iterable[MatchResult]) -> int:
+        """Grava (ou atualiza) as partidas e retorna quantas eram novas."""
+        return await asyncio.to_thread(self._add, tuple(results))
+
+    async def mark_synced(self) -> None:
+        self.synced_at = time.time()
+        await asyncio.to_thread(self._set_state, _SYNCED_AT_STATE, str(self.synced_at))
+
+    async def get_state(self, key: str) -> str | None:
+        return await asyncio.to_thread(self._get_state, key)
+
+    async def set_state(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self._set_state, key, value)
+
+    async def page(self, offset: int = 0, count: int = 5) -> tuple[MatchResult, ...]:
+        """Partidas da mais recente para a mais antiga, a partir da posição 'offset'."""
+        return await asyncio.to_thread(
+            self._query, f"SELECT {_COLUMNS} FROM matches {_ORDER} LIMIT ? OFFSET ?", (count, offset))
+
+    async def against(self, opponent: str) -> tuple[MatchResult, ...]:
+        """Todas as partidas contra o adversário (sem diferenciar maiúsculas), da mais recente para a mais antiga."""
+        return await asyncio.to_thread(
+            self._query, f"SELECT {_COLUMNS} FROM matches WHERE opponent_name = ? {_ORDER}", (opponent,))
+
+    async def in_tournament(self, tournament: str) -> tuple[MatchResult, ...]:
+        """Todas as partidas do campeonato, da mais recente para a mais antiga."""
+        return await asyncio.to_thread(
+            self._query, f"SELECT {_COLUMNS} FROM matches WHERE tournament_name = ? {_ORDER}", (tournament,))
+
+    async def opponents(self) -> list[str]:
+        """Nomes de todos os adversários do histórico."""
+        if self._opponents is None:
+            self._opponents = await asyncio.to_thread(self._distinct, "opponent_name")
+        return self._opponents
+
+    async def tournaments(self) -> list[str]:
+        """Nomes de todos os campeonatos do histórico."""
+        if self._tournaments is None:
+            self._tournaments = await asyncio.to_thread(self._distinct, "tournament_name")
+        return self._tournaments
+
+
+match_store = MatchStore()
+
+_sync_task: asyncio.Task | None = None
+_backfill_task: asyncio.Task | None = None
+
+
+def results_page_url(page: int) -> str:
+    """URL da página 'page' (a partir de 1) dos resultados da FURIA no Draft5."""
+    return DRAFT5_FURIA_RESULTS_URL if page == 1 else f"{DRAFT5_FURIA_RESULTS_URL}?page={page}"
+
+
+async def sync_latest_matches() -> int | None:
+    """
+    Busca incremental: lê as páginas a partir da primeira até encontrar uma partida já conhecida
+    (pelo matchId), gravando só o que é novo.
+
+    Returns:
+        Quantas partidas novas foram gravadas, ou None se a primeira página não pôde ser lida.
+    """
+    await match_store.load()
+    was_empty = not match_store.size
+    new_total = 0
+    for page in range(1, MATCH_SYNC_MAX_PAGES + 1):
+        results = await load_furia_results(results_page_url(page))
+        if results is None:
+            if page == 1:
+                return None
+            break
+        new = await match_store.add(results)
+        new_total += new
+        # Com o banco vazio, as páginas seguintes ficam para a carga do histórico
+        if was_empty or not results or new < len(results):
+            break
+
+    await match_store.mark_synced()
+    if new_total:
+        logger.info(f"{new_total} partida(s) nova(s) gravada(s); {match_store.size} no histórico.")
+    return new_total
+
+
+def _start_sync() -> asyncio.Task:
+    """Dispara a sincronização (single-flight: chamadas simultâneas compartilham a mesma task)."""
+    global _sync_task
+    if _sync_task is None or _sync_task.done():
+        _sync_task = asyncio.create_task(sync_latest_matches())
+    return _sync_task
+
+
+async def ensure_results() -> bool:
+    """
+    Garante que o histórico local está atualizado o bastante para ser servido.
+
+    Returns:
+        False se não há nenhum dado disponível (histórico vazio e Draft5 fora do ar).
+    """
+    await match_store.load()
+    await match_store.reload_if_changed()
+    has_data = match_store.size is not None and match_store.size > 0
+    age = time.time() - match_store.synced_at
+    if has_data and age < RESULTS_CACHE_TTL:
+        metrics.inc("cache_requests_total", cache="results", result="hit")
+        return True
+    if has_data and age < RESULTS_CACHE_MAX_STALE:
+        metrics.inc("cache_requests_total", cache="results", result="stale")
+        _start_sync()
+        return True
+
+    metrics.inc("cache_requests_total", cache="results", result="miss")
+    # asyncio.shield evita que o cancelamento de um handler cancele a busca compartilhada
+    new = await asyncio.shield(_start_sync())
+    if new is None:
+        if has_data:
+            # Draft5 fora do ar: resultados antigos são melhores do que nenhum
+            metrics.inc("cache_requests_total", cache="results", result="fallback")
+            logger.warning("Draft5 indisponível; servindo o histórico local.")
+            return True
+        return False
+    return True
+
+
+async def get_results_page(offset=0, count=5):
+    """
+    Retorna uma página dos resultados da FURIA a partir do histórico local.
+
+    Args:
+        offset: posição (cursor) do primeiro resultado da página;
+        count: quantidade de resultados da página.
+
+    Returns:
+        Uma tupla com até 'count' resultados (vazia se não houver mais) ou None se não houver dados disponíveis.
+    """
+    if not await ensure_results():
+        return None
+    return await match_store.page(offset, count)
+
+
+async def get_furia_latest_results(count=5):
+    """Retorna os 'count' últimos resultados da FURIA (do histórico local)."""
+    return await get_results_page(0, count)
+
+
+async def refresh_results_job(context) -> None:
+    """Job do JobQueue que mantém o histórico atualizado com as partidas novas."""
+    new = await asyncio.shield(_start_sync())
+    if new is None:
+        logger.warning("Falha ao sincronizar os resultados; mantendo o histórico local.")
+
+
+async def backfill_matches() -> None:
+    """
+    Carrega o histórico antigo, página por página, até uma página vazia ou além do fim (ou
+    MATCH_BACKFILL_MAX_PAGES). O progresso fica salvo e a carga é retomada de onde parou.
+
+    Páginas só com partidas conhecidas não encerram a carga: partidas novas empurram as antigas
+    para as páginas seguintes, então a página salva pode repetir partidas já gravadas.
+    """
+    state = await match_store.get_state(_BACKFILL_STATE)
+    if state == _BACKFILL_DONE:
+        return
+    page = int(state or 2)
+    logger.info(f"Carregando o histórico de partidas a partir da página {page}...")
+    previous_ids = None
+    while page <= MATCH_BACKFILL_MAX_PAGES:
+        results = await load_furia_results(results_page_url(page))
+        if results is None:
+            logger.warning(f"Falha ao carregar a página {page} do histórico; a carga continua na próxima execução.")
+            return
+        # Página vazia, ou a mesma página de novo (número de página além do fim): acabou o histórico
+        match_ids = {result.match_id for result in results}
+        if not results or match_ids == previous_ids:
+            break
+        previous_ids = match_ids
+        await match_store.add(results)
+        page += 1
+        await match_store.set_state(_BACKFILL_STATE, str(page))
+        await asyncio.sleep(MATCH_CRAWL_PAGE_DELAY)
+
+    await match_store.set_state(_BACKFILL_STATE, _BACKFILL_DONE)
+    logger.info(f"Histórico de partidas carregado: {match_store.size} partidas.")
+
+
+async def backfill_matches_job(context) -> None:
+    """Job do JobQueue que carrega o histórico antigo (tenta de novo a cada execução até concluir)."""
+    global _backfill_task
+    if _backfill_task is not None:
+        return
+    if await asyncio.shield(_start_sync()) is None:
+        return
+    _backfill_task = asyncio.current_task()
+    try:
+        await backfill_matches()
+    finally:
+        _backfill_task = None
@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 desativa o endpoint /metrics
+METRICS_PREFIX = "furia_bot_"
+
+# Limites dos baldes dos histogramas (segundos): progressão geométrica de 1 ms a ~2 min,
+# o que dá percentis com erro relativo de no máximo ~25%.
+_BUCKET_FACTOR = 1.5
+BUCKETS = tuple(round(0.001 * _BUCKET_FACTOR ** i, 6) for i in range(30))
+
+
+def _is_timeout(error: BaseException) -> bool:
+    name = type(error).__name__
+    return isinstance(error, TimeoutError) or "Timeout" in name or "TimedOut" in name
+
+
+class Histogram:
+    """Histograma de latências com baldes fixos: registrar um valor é uma busca binária e um incremento."""
+
+    __slots__ = ("counts", "total", "count", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # o último balde é o +Inf
+        self.total = 0.0
+        self.count = 0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimativa do percentil 'q' (0 a 1) por interpolação dentro do balde."""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = max(BUCKETS[index - 1] if index > 0 else 0.0, self.min)
+                upper = min(BUCKETS[index] if index < len(BUCKETS) else self.max, self.max)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max
+
+
+class MetricsRegistry:
+    """Histogramas e contadores em memória, identificados por nome e rótulos."""
+
+    def __init__(self):
+        self.histograms: dict[tuple[str, tuple], Histogram] = {}
+        self.counters: dict[tuple[str, tuple], int] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple[str, tuple]:
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def inc(self, name: str, amount: int = 1, **labels) -> None:
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def track(self, name: str, **labels):
+        """
+        Mede a duração do bloco no histograma '<name>_duration_seconds' e conta as falhas em
+        '<name>_errors_total' / '<name>_timeouts_total'. A exceção é propagada normalmente.
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            if isinstance(e, (asyncio.CancelledError, GeneratorExit)):
+                raise
+            self.inc(f"{name}_timeouts_total" if _is_timeout(e) else f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_duration_seconds", time.perf_counter() - started_at, **labels)
+
+    def render_prometheus(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus."""
+        lines = []
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} histogram")
+            for (metric, labels), histogram in sorted(self.histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS + (math.inf,), histogram.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f"{METRICS_PREFIX}{name}_bucket{_labels(labels, le=le)} {cumulative}")
+                lines.append(f"{METRICS_PREFIX}{name}_sum{_labels(labels)} {histogram.total}")
+                lines.append(f"{METRICS_PREFIX}{name}_count{_labels(labels)} {histogram.count}")
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} counter")
+            for (metric, labels), value in sorted(self.counters.items()):
+                if metric == name:
+                    lines.append(f"{METRICS_PREFIX}{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Resumo legível (para o comando /stats): percentis por etapa e contadores."""
+        lines = []
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            label_text = ",".join(str(value) for _, value in labels) or "-"
+            lines.append(
+                f"{name.removesuffix('_duration_seconds')}[{label_text}] n={histogram.count} "
+                f"p50={histogram.quantile(0.5) * 1000:.0f}ms p95={histogram.quantile(0.95) * 1000:.0f}ms "
+                f"p99={histogram.quantile(0.99) * 1000:.0f}ms"
+            )
+        for (name, labels), value in sorted(self.counters.items()):
+            label_text = ",".join(str(value) for _, value in labels) or "-"
+            lines.append(f"{name}[{label_text}] = {value}")
+        return "\n".join(lines) or "Nenhuma métrica registrada ainda."
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple, **extra) -> str:
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+metrics = MetricsRegistry()
+
+
+def instrumented_handler(handler):
+    """Decorator para handlers do bot: mede a duração e conta as falhas de cada handler."""
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        with metrics.track("handler", handler=handler.__name__):
+            return await handler(update, context)
+    return wrapper
+
+
+# --- Endpoint HTTP (/metrics) ---
+
+async def _handle_metrics_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+        method, path, *_ = request.split(b"\r\n", 1)[0].decode("latin-1").split(" ")
+        if method == "GET" and path.split("?")[0] == "/metrics":
+            status, body = "200 OK", metrics.render_prometheus().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError,
+            ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> asyncio.Server | None:
+    """Inicia o endpoint Prometheus em http://host:port/metrics (se METRICS_PORT estiver definida)."""
+    if not port:
+        return None
+    server = await asyncio.start_server(_handle_metrics_request, host, port)
+    logger.info(f"Métricas disponíveis em http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,165 @@
+import json
+import re
+from json.decoder import scanstring
+
+# Atributo que identifica a tag <script id="__NEXT_DATA__" type="application/json"> das páginas Next.js
+NEXT_DATA_MARKER = 'id="__NEXT_DATA__"'
+SCRIPT_END = "</script>"
+RESULTS_PATH = ("props", "pageProps", "results")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_SCALAR_END = re.compile(r"[,}\]\s]")
+
+
+class NextDataScanner:
+    """
+    Localiza o JSON do __NEXT_DATA__ enquanto o corpo da resposta chega em pedaços,
+    sem montar a árvore DOM da página.
+
+    Uso: chamar feed() para cada pedaço de texto até ele retornar True; o JSON fica em json_text.
+    Todo o texto recebido é mantido em html para permitir o fallback com BeautifulSoup.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._buffer = ""
+        self._inside_script = False
+        self._search_from = 0
+        self.json_text = None
+
+    @property
+    def html(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> bool:
+        """Processa mais um pedaço do HTML. Retorna True quando o JSON completo foi encontrado."""
+        if self.json_text is not None:
+            return True
+        self._chunks.append(chunk)
+        self._buffer += chunk
+
+        if not self._inside_script:
+            marker_index = self._buffer.find(NEXT_DATA_MARKER)
+            if marker_index == -1:
+                # Mantém só o final do buffer, caso o marcador esteja dividido entre dois pedaços
+                self._buffer = self._buffer[-len(NEXT_DATA_MARKER):]
+                return False
+            tag_end = self._buffer.find(">", marker_index)
+            if tag_end == -1:
+                self._buffer = self._buffer[marker_index:]
+                return False
+            self._buffer = self._buffer[tag_end + 1:]
+            self._inside_script = True
+            self._search_from = 0
+
+        end_index = self._buffer.find(SCRIPT_END, self._search_from)
+        if end_index == -1:
+            self._search_from = max(0, len(self._buffer) - len(SCRIPT_END))
+            return False
+
+        self.json_text = self._buffer[:end_index]
+        self._buffer = ""
+        return True
+
+
+def find_next_data(html: str) -> str | None:
+    """Retorna o texto JSON do __NEXT_DATA__ contido em um documento HTML completo."""
+    scanner = NextDataScanner()
+    scanner.feed(html)
+    return scanner.json_text
+
+
+def _skip_whitespace(text: str, index: int) -> int:
+    return _WHITESPACE.match(text, index).end()
+
+
+def _skip_value(text: str, index: int) -> int:
+    """Pula um valor JSON a partir de 'index' sem decodificá-lo, retornando a posição seguinte."""
+    char = text[index]
+    if char == '"':
+        return scanstring(text, index + 1)[1]
+
+    if char in "{[":
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(text, index)
+            if match is None:
+                raise ValueError("JSON truncado: container não foi fechado")
+            index = match.end()
+            token = match.group()
+            if token == '"':
+                index = scanstring(text, index)[1]
+            elif token in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return index
+
+    match = _SCALAR_END.search(text, index)
+    return match.start() if match else len(text)
+
+
+def _find_key(text: str, index: int, key: str) -> int | None:
+    """Procura 'key' no objeto que começa em 'index' e retorna a posição do seu valor."""
+    if text[index] != "{":
+        raise ValueError(f"Esperado um objeto JSON na posição {index}")
+
+    index = _skip_whitespace(text, index + 1)
+    if text[index] == "}":
+        return None
+
+    while True:
+        if text[index] != '"':
+            raise ValueError(f"Chave JSON inválida na posição {index}")
+        current_key, index = scanstring(text, index + 1)
+        index = _skip_whitespace(text, index)
+        if text[index] != ":":
+            raise ValueError(f"Esperado ':' na posição {index}")
+        index = _skip_whitespace(text, index + 1)
+
+        if current_key == key:
+            return index
+
+        index = _skip_whitespace(text, _skip_value(text, index))
+        if text[index] == ",":
+            index = _skip_whitespace(text, index + 1)
+        elif text[index] == "}":
+            return None
+        else:
+            raise ValueError(f"Esperado ',' ou '}}' na posição {index}")
+
+
+def extract_json_path(json_text: str, path=RESULTS_PATH):
+    """
+    Decodifica apenas o valor em 'path' (ex.: props.pageProps.results) de um texto JSON,
+    pulando o resto do payload sem materializá-lo.
+
+    Raises:
+        KeyError: se alguma chave do caminho não existir;
+        ValueError: se o JSON estiver malformado.
+    """
+    index = _skip_whitespace(json_text, 0)
+    try:
+        for key in path:
+            value_index = _find_key(json_text, index, key)
+            if value_index is None:
+                raise KeyError(key)
+            index = value_index
+        return _decoder.raw_decode(json_text, index)[0]
+    except IndexError as e:
+        raise ValueError("JSON truncado") from e
+
+
+def extract_next_data_bs4(html: str):
+    """Caminho antigo (e mais lento): monta o DOM com BeautifulSoup e decodifica o JSON inteiro."""
+    # Importado aqui: o BeautifulSoup só é usado quando a extração rápida falha
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    script_tag = soup.find('script', {'id': '__NEXT_DATA__'})
+    if not script_tag:
+        return None
+    return json.loads(script_tag.string)
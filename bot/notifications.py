@@ -0,0 +1,240 @@
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, TelegramError
+
+from bot.db import connect_sqlite
+from bot.formatting import format_results_message
+from bot.match_store import ensure_results, match_store
+from bot.metrics import metrics
+from bot.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS_DB_PATH = os.getenv("NOTIFICATIONS_DB_PATH", "furia_bot_data/notifications.sqlite3")
+
+# --- Envio dos avisos (fan-out) ---
+# Os inscritos são lidos em lotes de FANOUT_BATCH_SIZE (o progresso é salvo a cada lote) e recebem
+# o aviso a no máximo FANOUT_RATE mensagens/s, abaixo do limite global do Telegram (~30/s), para
+# sobrar espaço para as respostas da conversa. A 25/s, 10 mil inscritos levam ~7 minutos.
+FANOUT_RATE = float(os.getenv("FANOUT_RATE", "25"))
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "50"))
+FANOUT_BATCH_SIZE = int(os.getenv("FANOUT_BATCH_SIZE", "500"))
+# Novas tentativas de um envio que recebeu 429 (RetryAfter), feitas pelo limitador de envio
+FANOUT_MAX_RETRIES = 2
+
+# Partidas avisadas de uma vez; de uma rajada maior (ex.: o bot ficou dias parado), só as mais recentes
+NOTIFY_MAX_NEW_MATCHES = 5
+
+_LAST_SEEN_STATE = "last_seen_match_id"
+_MIN_CHAT_ID = -(2 ** 63)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS subscribers (chat_id INTEGER PRIMARY KEY, subscribed_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    cursor INTEGER NOT NULL DEFAULT ({_MIN_CHAT_ID}),
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_SENT, _FAILED, _GONE = "sent", "failed", "gone"
+
+
+class NotificationCenter:
+    """
+    Inscrições nos avisos de resultados e fila persistente de envio desses avisos.
+
+    Cada aviso é uma linha da tabela 'notifications' com um cursor (o último chat_id atendido):
+    o envio percorre os inscritos em ordem de chat_id, em lotes, e grava o cursor ao fim de cada
+    lote. Depois de um reinício o envio continua do cursor (no máximo um lote pode receber o aviso
+    duas vezes). Chats que bloquearam o bot são removidos da lista durante o envio.
+    """
+
+    def __init__(self, path: str = NOTIFICATIONS_DB_PATH, rate: float = FANOUT_RATE,
+                 concurrency: int = FANOUT_CONCURRENCY, batch_size: int = FANOUT_BATCH_SIZE):
+        self.path = path
+        self.rate = rate
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self._connection = None
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+        self.stats = {"sent": 0, "failed": 0, "unsubscribed_blocked": 0}
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = connect_sqlite(self.path)
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def _execute(self, sql: str, params=()) -> int:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                return connection.execute(sql, params).rowcount
+
+    def _fetch(self, sql: str, params=()) -> list[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _advance(self, notification_id: int, cursor: int, sent: int, failed: int, gone: list[int]) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "UPDATE notifications SET cursor = ?, sent = sent + ?, failed = failed + ? WHERE id = ?",
+                    (cursor, sent, failed, notification_id),
+                )
+                connection.executemany("DELETE FROM subscribers WHERE chat_id = ?", [(chat_id,) for chat_id in gone])
+
+    # --- Inscrições ---
+
+    async def subscribe(self, chat_id: int) -> bool:
+        """Inscreve o chat nos avisos. Retorna False se ele já estava inscrito."""
+        return bool(await asyncio.to_thread(
+            self._execute, "INSERT OR IGNORE INTO subscribers (chat_id, subscribed_at) VALUES (?, ?)",
+            (chat_id, time.time())))
+
+    async def unsubscribe(self, chat_id: int) -> bool:
+        """Cancela a inscrição do chat. Retorna False se ele não estava inscrito."""
+        return bool(await asyncio.to_thread(self._execute, "DELETE FROM subscribers WHERE chat_id = ?", (chat_id,)))
+
+    async def is_subscribed(self, chat_id: int) -> bool:
+        return bool(await asyncio.to_thread(self._fetch, "SELECT 1 FROM subscribers WHERE chat_id = ?", (chat_id,)))
+
+    # --- Fila de envio ---
+
+    async def enqueue(self, text: str) -> None:
+        """Grava um aviso para todos os inscritos; o envio começa em segundo plano."""
+        await asyncio.to_thread(
+            self._execute, "INSERT INTO notifications (text, created_at) VALUES (?, ?)", (text, time.time()))
+        self._wakeup.set()
+
+    def start(self, bot: Bot) -> None:
+        """Inicia a tarefa de envio (retomando os avisos que ficaram pela metade)."""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run(bot), name="notifications-fanout")
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _run(self, bot: Bot) -> None:
+        while True:
+            self._wakeup.clear()
+            pending = await asyncio.to_thread(
+                self._fetch, "SELECT id, text, cursor FROM notifications WHERE finished_at IS NULL ORDER BY id")
+            for notification_id, text, cursor in pending:
+                try:
+                    await self._deliver(bot, notification_id, text, cursor)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Erro do banco, por exemplo: tenta de novo no próximo aviso ou reinício
+                    logger.exception(f"Falha no envio do aviso {notification_id}: {e}")
+                    await asyncio.sleep(30)
+            if not pending:
+                await self._wakeup.wait()
+
+    async def _deliver(self, bot: Bot, notification_id: int, text: str, cursor: int) -> None:
+        bucket = TokenBucket(self.rate, self.rate)
+        slots = asyncio.Semaphore(self.concurrency)
+        started_at = time.perf_counter()
+        total = 0
+        if cursor == _MIN_CHAT_ID:
+            logger.info(f"Enviando o aviso {notification_id} aos inscritos...")
+        else:
+            logger.info(f"Retomando o envio do aviso {notification_id} a partir do chat {cursor}...")
+
+        while chat_ids := [row[0] for row in await asyncio.to_thread(
+                self._fetch, "SELECT chat_id FROM subscribers WHERE chat_id > ? ORDER BY chat_id LIMIT ?",
+                (cursor, self.batch_size))]:
+            outcomes = await asyncio.gather(*(self._send(bot, chat_id, text, bucket, slots) for chat_id in chat_ids))
+            gone = [chat_id for chat_id, outcome in zip(chat_ids, outcomes) if outcome == _GONE]
+            sent, failed = outcomes.count(_SENT), outcomes.count(_FAILED)
+            cursor = chat_ids[-1]
+            await asyncio.to_thread(self._advance, notification_id, cursor, sent, failed, gone)
+            total += len(chat_ids)
+            self.stats["sent"] += sent
+            self.stats["failed"] += failed
+            self.stats["unsubscribed_blocked"] += len(gone)
+
+        await asyncio.to_thread(
+            self._execute, "UPDATE notifications SET finished_at = ? WHERE id = ?", (time.time(), notification_id))
+        logger.info(f"Aviso {notification_id} enviado a {total} chat(s) em {time.perf_counter() - started_at:.1f}s.")
+
+    async def _send(self, bot: Bot, chat_id: int, text: str, bucket: TokenBucket, slots: asyncio.Semaphore) -> str:
+        async with slots:
+            await bucket.acquire()
+            try:
+                await bot.send_message(chat_id=chat_id, text=text, rate_limit_args=FANOUT_MAX_RETRIES)
+                outcome = _SENT
+            except Forbidden:
+                # O usuário bloqueou o bot (ou saiu do grupo)
+                outcome = _GONE
+            except TelegramError as e:
+                outcome = _GONE if isinstance(e, BadRequest) and "chat not found" in str(e).lower() else _FAILED
+                if outcome == _FAILED:
+                    logger.warning(f"Aviso não enviado ao chat {chat_id}: {e}")
+        metrics.inc("notifications_sent_total", result=outcome)
+        return outcome
+
+    async def report(self) -> str:
+        subscribers = (await asyncio.to_thread(self._fetch, "SELECT COUNT(*) FROM subscribers"))[0][0]
+        pending = (await asyncio.to_thread(
+            self._fetch, "SELECT COUNT(*) FROM notifications WHERE finished_at IS NULL"))[0][0]
+        s = self.stats
+        return (f"Avisos de resultados: {subscribers} inscritos, {pending} aviso(s) na fila, "
+                f"enviados={s['sent']}, falhas={s['failed']}, removidos por bloqueio={s['unsubscribed_blocked']}")
+
+    # --- Partidas novas ---
+
+    async def check_new_results(self) -> None:
+        """
+        Compara as partidas mais recentes do histórico com a última já vista (pelo match_id)
+        e enfileira um aviso com as novas. Na primeira execução só registra a última partida.
+        """
+        if not await ensure_results():
+            return
+        latest = await match_store.page(0, NOTIFY_MAX_NEW_MATCHES + 1)
+        if not latest:
+            return
+        last_seen = await asyncio.to_thread(self._fetch, "SELECT value FROM state WHERE key = ?", (_LAST_SEEN_STATE,))
+        head = latest[0].match_id
+        if last_seen and int(last_seen[0][0]) == head:
+            return
+        await asyncio.to_thread(
+            self._execute, "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (_LAST_SEEN_STATE, str(head)))
+        if not last_seen:
+            return
+
+        last_seen_id = int(last_seen[0][0])
+        new = list(itertools.takewhile(lambda r: r.match_id != last_seen_id, latest))[:NOTIFY_MAX_NEW_MATCHES]
+        title = "🔔 Novo resultado da FURIA!" if len(new) == 1 else "🔔 Novos resultados da FURIA!"
+        logger.info(f"{len(new)} partida(s) nova(s) desde a {last_seen_id}; enfileirando aviso.")
+        await self.enqueue(format_results_message(title, new))
+
+
+notifications = NotificationCenter()
+
+
+async def check_new_results_job(context) -> None:
+    """Job do JobQueue que procura partidas novas e avisa os inscritos."""
+    await notifications.check_new_results()
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+
+from telegram import Bot, Message
+from telegram.constants import MessageLimit
+
+logger = logging.getLogger(__name__)
+
+_SEPARATOR = "\n\n"
+
+
+@dataclass
+class _Outgoing:
+    text: str
+    kwargs: dict
+    transient: bool
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+def _can_merge(batch: list[_Outgoing], item: _Outgoing) -> bool:
+    first = batch[0]
+    if item.kwargs.get("parse_mode") != first.kwargs.get("parse_mode"):
+        return False
+    # A mensagem juntada só pode levar um teclado
+    if item.kwargs.get("reply_markup") is not None and any(o.kwargs.get("reply_markup") is not None for o in batch):
+        return False
+    other_kwargs = {k: v for k, v in item.kwargs.items() if k not in ("parse_mode", "reply_markup")}
+    if other_kwargs != {k: v for k, v in first.kwargs.items() if k not in ("parse_mode", "reply_markup")}:
+        return False
+    length = sum(len(o.text) for o in batch) + len(_SEPARATOR) * len(batch) + len(item.text)
+    return length <= MessageLimit.MAX_TEXT_LENGTH
+
+
+class ChatOutbox:
+    """
+    Fila de envio de mensagens por chat.
+
+    Cada chat tem uma fila atendida por uma única tarefa, então as mensagens saem na ordem em
+    que foram pedidas. Quando várias mensagens do mesmo chat estão esperando (por exemplo, porque
+    o limitador de envio segurou a anterior), elas são juntadas em uma só; mensagens provisórias
+    ('transient', como "Buscando...") são descartadas se outra mensagem já estiver na fila depois delas.
+
+    Para isso a mensagem provisória não pode ser aguardada por quem a pediu (ver reply): o
+    handler segue com o trabalho e, se o resultado ficar pronto antes de ela sair, só o resultado
+    é enviado.
+    """
+
+    def __init__(self):
+        self._queues: dict[int, deque[_Outgoing]] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self.stats = {"requested": 0, "sent": 0, "coalesced": 0, "dropped_transient": 0}
+
+    def post(self, bot: Bot, chat_id: int, text: str, transient: bool = False, **kwargs) -> asyncio.Future:
+        """
+        Enfileira uma mensagem para o chat sem aguardar o envio.
+
+        Returns:
+            O futuro com a mensagem enviada (que pode conter também o texto de outras mensagens
+            juntadas a ela) ou None se a mensagem provisória foi descartada.
+        """
+        # Sem parse_mode explícito vale o padrão do bot: assim "Markdown" e o padrão se juntam
+        defaults = getattr(bot, "defaults", None)
+        if "parse_mode" not in kwargs and defaults is not None and defaults.parse_mode is not None:
+            kwargs["parse_mode"] = defaults.parse_mode
+        item = _Outgoing(text, kwargs, transient)
+        self.stats["requested"] += 1
+        self._queues.setdefault(chat_id, deque()).append(item)
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._drain(bot, chat_id), name=f"outbox:{chat_id}")
+        return item.future
+
+    async def send(self, bot: Bot, chat_id: int, text: str, transient: bool = False, **kwargs) -> Message | None:
+        """Enfileira uma mensagem para o chat e aguarda o envio (ver post)."""
+        return await asyncio.shield(self.post(bot, chat_id, text, transient=transient, **kwargs))
+
+    def _next_batch(self, queue: deque[_Outgoing]) -> list[_Outgoing]:
+        batch: list[_Outgoing] = []
+        while queue:
+            item = queue[0]
+            if item.transient and len(queue) > 1:
+                queue.popleft()
+                item.future.set_result(None)
+                self.stats["dropped_transient"] += 1
+                continue
+            if batch and not _can_merge(batch, item):
+                break
+            batch.append(queue.popleft())
+        return batch
+
+    async def _drain(self, bot: Bot, chat_id: int) -> None:
+        queue = self._queues[chat_id]
+        try:
+            while queue:
+                batch = self._next_batch(queue)
+                if not batch:
+                    continue
+                kwargs = dict(batch[0].kwargs)
+                for item in batch:
+                    if item.kwargs.get("reply_markup") is not None:
+                        kwargs["reply_markup"] = item.kwargs["reply_markup"]
+                text = _SEPARATOR.join(item.text for item in batch)
+                try:
+                    message = await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                except Exception as e:
+                    for item in batch:
+                        item.future.set_exception(e)
+                    continue
+                self.stats["sent"] += 1
+                self.stats["coalesced"] += len(batch) - 1
+                for item in batch:
+                    item.future.set_result(message)
+        finally:
+            del self._workers[chat_id]
+            if queue:
+                # Só acontece se a tarefa for cancelada: falha as mensagens que ficaram
+                for item in queue:
+                    if not item.future.done():
+                        item.future.cancel()
+            del self._queues[chat_id]
+
+
+outbox = ChatOutbox()
+
+
+def _log_transient_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"Falha ao enviar mensagem provisória: {future.exception()}")
+
+
+async def reply(message: Message, text: str, transient: bool = False, **kwargs) -> Message | None:
+    """
+    Envia uma mensagem para o chat de 'message' pela fila de envio (ver ChatOutbox).
+
+    Mensagens provisórias não são aguardadas (retorna None na hora): elas só servem enquanto a
+    resposta de verdade não fica pronta e são descartadas se ela chegar à fila antes.
+    """
+    if transient:
+        future = outbox.post(message.get_bot(), message.chat_id, text, transient=True, **kwargs)
+        future.add_done_callback(_log_transient_failure)
+        return None
+    return await outbox.send(message.get_bot(), message.chat_id, text, **kwargs)
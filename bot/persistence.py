@@ -0,0 +1,321 @@
+import asyncio
+import hashlib
+import json
+import logging
+import pickle
+import threading
+from pathlib import Path
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from bot.db import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS chat_data (chat_id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS singletons (name TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    conversation_key TEXT NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (name, conversation_key)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# Tabela e coluna de cada tipo de linha gravada pela persistência
+_ROW_TABLES = {
+    "user": ("user_data", "user_id"),
+    "chat": ("chat_data", "chat_id"),
+    "singleton": ("singletons", "name"),
+}
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """Lê arquivos do PicklePersistence, que substitui referências ao Bot por persistent ids."""
+
+    def persistent_load(self, pid):
+        return None
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    Persistência incremental em SQLite (modo WAL) para o python-telegram-bot.
+
+    - Cada usuário/chat é uma linha: só as linhas que mudaram são regravadas, em lote,
+      em uma única transação por rodada de atualização da Application;
+    - user_data e chat_data são carregados sob demanda (refresh_*) na primeira vez que
+      o usuário/chat aparece, em vez de todos de uma vez na inicialização;
+    - Um arquivo antigo do PicklePersistence é migrado uma única vez.
+
+    Args:
+        filepath: caminho do banco SQLite;
+        legacy_pickle_path: arquivo do PicklePersistence a ser migrado (opcional);
+        store_data: quais dados persistir (padrão: todos);
+        update_interval: intervalo, em segundos, entre as gravações feitas pela Application.
+    """
+
+    def __init__(
+        self,
+        filepath: str | Path,
+        legacy_pickle_path: str | Path | None = None,
+        store_data: PersistenceInput | None = None,
+        update_interval: float = 60,
+    ):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.filepath = Path(filepath)
+        self.legacy_pickle_path = Path(legacy_pickle_path) if legacy_pickle_path else None
+        self._connection = None
+        self._db_lock = threading.Lock()
+        self._write_lock = asyncio.Lock()
+        self._loaded_users: set[int] = set()
+        self._loaded_chats: set[int] = set()
+        self._digests: dict[tuple, bytes] = {}
+        self._batch: dict[tuple, bytes | None] | None = None
+        self._batch_task: asyncio.Task | None = None
+
+    # --- Acesso ao banco (sempre fora do event loop) ---
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = connect_sqlite(self.filepath)
+            self._connection.executescript(_SCHEMA)
+            self._migrate_legacy_pickle()
+        return self._connection
+
+    def _query(self, sql: str, params=()):
+        with self._db_lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    async def _run(self, func, *args):
+        return await asyncio.to_thread(func, *args)
+
+    def _migrate_legacy_pickle(self) -> None:
+        """
+        Importa o arquivo do PicklePersistence (se existir) e o renomeia para '.migrated'.
+
+        Com vários workers (BOT_WORKERS) todos tentam ao mesmo tempo: a marca em 'meta' é conferida
+        de novo dentro da transação de escrita, então só um deles importa os dados.
+        """
+        path = self.legacy_pickle_path
+        if path is None or not path.is_file():
+            return
+        connection = self._connection
+        if connection.execute("SELECT 1 FROM meta WHERE key = 'legacy_pickle_migrated'").fetchone():
+            return
+
+        try:
+            with path.open("rb") as file:
+                data = _LegacyUnpickler(file).load()
+        except FileNotFoundError:
+            # Outro worker já migrou e renomeou o arquivo
+            return
+        except Exception as e:
+            logger.error(f"Falha ao ler o arquivo antigo de persistência '{path}': {e}")
+            return
+
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            if connection.execute("SELECT 1 FROM meta WHERE key = 'legacy_pickle_migrated'").fetchone():
+                return
+            connection.executemany(
+                "INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)",
+                ((user_id, _dumps(value)) for user_id, value in (data.get("user_data") or {}).items()),
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO chat_data (chat_id, data) VALUES (?, ?)",
+                ((chat_id, _dumps(value)) for chat_id, value in (data.get("chat_data") or {}).items()),
+            )
+            for name in ("bot_data", "callback_data"):
+                if data.get(name) is not None:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO singletons (name, data) VALUES (?, ?)", (name, _dumps(data[name]))
+                    )
+            for name, conversations in (data.get("conversations") or {}).items():
+                connection.executemany(
+                    "INSERT OR REPLACE INTO conversations (name, conversation_key, state) VALUES (?, ?, ?)",
+                    ((name, json.dumps(key), _dumps(state)) for key, state in conversations.items()),
+                )
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_pickle_migrated', ?)",
+                               (str(path),))
+
+        try:
+            path.rename(path.with_name(path.name + ".migrated"))
+        except FileNotFoundError:
+            pass
+        logger.info(f"Persistência antiga migrada de '{path}' para '{self.filepath}'.")
+
+    def _write_batch(self, batch: dict) -> None:
+        upserts: dict[str, list] = {}
+        deletes: dict[str, list] = {}
+        conversations = []
+        for (kind, key), blob in batch.items():
+            if kind == "conversation":
+                conversations.append((key, blob))
+            elif blob is None:
+                deletes.setdefault(kind, []).append((key,))
+            else:
+                upserts.setdefault(kind, []).append((key, blob))
+
+        with self._db_lock:
+            connection = self._connect()
+            with connection:
+                for kind, rows in upserts.items():
+                    table, column = _ROW_TABLES[kind]
+                    connection.executemany(
+                        f"INSERT OR REPLACE INTO {table} ({column}, data) VALUES (?, ?)", rows
+                    )
+                for kind, rows in deletes.items():
+                    table, column = _ROW_TABLES[kind]
+                    connection.executemany(f"DELETE FROM {table} WHERE {column} = ?", rows)
+                for (name, conversation_key), blob in conversations:
+                    if blob is None:
+                        connection.execute(
+                            "DELETE FROM conversations WHERE name = ? AND conversation_key = ?",
+                            (name, conversation_key),
+                        )
+                    else:
+                        connection.execute(
+                            "INSERT OR REPLACE INTO conversations (name, conversation_key, state) VALUES (?, ?, ?)",
+                            (name, conversation_key, blob),
+                        )
+
+    # --- Gravação em lote ---
+
+    async def _stage(self, key: tuple, blob: bytes | None) -> None:
+        """
+        Agenda a gravação de uma linha. Todas as linhas agendadas na mesma rodada de
+        update_persistence são gravadas juntas, em uma única transação.
+        Linhas cujo conteúdo não mudou desde a última gravação são ignoradas.
+        """
+        digest = hashlib.blake2b(blob, digest_size=16).digest() if blob is not None else None
+        if key in self._digests and self._digests[key] == digest:
+            return
+        self._digests[key] = digest
+
+        if self._batch is None:
+            self._batch = {}
+            self._batch_task = asyncio.create_task(self._commit_batch(self._batch))
+        self._batch[key] = blob
+        await asyncio.shield(self._batch_task)
+
+    async def _commit_batch(self, batch: dict) -> None:
+        # Deixa as demais corrotinas da mesma rodada (asyncio.gather) entrarem no lote
+        await asyncio.sleep(0)
+        if self._batch is batch:
+            self._batch = None
+        async with self._write_lock:
+            try:
+                await self._run(self._write_batch, batch)
+            except Exception:
+                # Esquece os digests para que as linhas sejam regravadas na próxima rodada
+                for key in batch:
+                    self._digests.pop(key, None)
+                raise
+        logger.debug(f"Persistência: {len(batch)} linha(s) gravada(s).")
+
+    # --- Leitura ---
+
+    def _load_row(self, kind: str, key):
+        table, column = _ROW_TABLES[kind]
+        rows = self._query(f"SELECT data FROM {table} WHERE {column} = ?", (key,))
+        if not rows:
+            return None
+        self._digests[(kind, key)] = hashlib.blake2b(rows[0][0], digest_size=16).digest()
+        return pickle.loads(rows[0][0])
+
+    async def get_user_data(self) -> dict:
+        # Carregamento sob demanda: os dados de cada usuário são lidos em refresh_user_data
+        await self._run(self._connect)
+        return {}
+
+    async def get_chat_data(self) -> dict:
+        await self._run(self._connect)
+        return {}
+
+    async def get_bot_data(self):
+        data = await self._run(self._load_row, "singleton", "bot_data")
+        return data if data is not None else {}
+
+    async def get_callback_data(self):
+        return await self._run(self._load_row, "singleton", "callback_data")
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = await self._run(
+            self._query, "SELECT conversation_key, state FROM conversations WHERE name = ?", (name,)
+        )
+        conversations = {}
+        for conversation_key, state in rows:
+            self._digests[("conversation", (name, conversation_key))] = hashlib.blake2b(
+                state, digest_size=16).digest()
+            conversations[tuple(json.loads(conversation_key))] = pickle.loads(state)
+        return conversations
+
+    async def refresh_user_data(self, user_id: int, user_data) -> None:
+        if user_id in self._loaded_users:
+            return
+        self._loaded_users.add(user_id)
+        stored = await self._run(self._load_row, "user", user_id)
+        if stored:
+            for key, value in stored.items():
+                user_data.setdefault(key, value)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data) -> None:
+        if chat_id in self._loaded_chats:
+            return
+        self._loaded_chats.add(chat_id)
+        stored = await self._run(self._load_row, "chat", chat_id)
+        if stored:
+            for key, value in stored.items():
+                chat_data.setdefault(key, value)
+
+    async def refresh_bot_data(self, bot_data) -> None:
+        pass
+
+    # --- Escrita ---
+
+    async def update_user_data(self, user_id: int, data) -> None:
+        self._loaded_users.add(user_id)
+        await self._stage(("user", user_id), _dumps(data))
+
+    async def update_chat_data(self, chat_id: int, data) -> None:
+        self._loaded_chats.add(chat_id)
+        await self._stage(("chat", chat_id), _dumps(data))
+
+    async def update_bot_data(self, data) -> None:
+        await self._stage(("singleton", "bot_data"), _dumps(data))
+
+    async def update_callback_data(self, data) -> None:
+        await self._stage(("singleton", "callback_data"), _dumps(data))
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        blob = _dumps(new_state) if new_state is not None else None
+        await self._stage(("conversation", (name, json.dumps(key))), blob)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._loaded_users.add(user_id)
+        await self._stage(("user", user_id), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._loaded_chats.add(chat_id)
+        await self._stage(("chat", chat_id), None)
+
+    async def flush(self) -> None:
+        """Aguarda as gravações pendentes e fecha a conexão (chamado pela Application ao finalizar)."""
+        if self._batch_task is not None:
+            await asyncio.gather(self._batch_task, return_exceptions=True)
+        async with self._write_lock:
+            if self._connection is not None:
+                await self._run(self._close)
+
+    def _close(self) -> None:
+        with self._db_lock:
+            self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._connection.close()
+            self._connection = None
+
+
+def _dumps(data) -> bytes:
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
@@ -0,0 +1,222 @@
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from telegram.ext import BaseHandler, ConversationHandler
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "furia_bot_data/profiles")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+# Duração da captura iniciada pelo sinal SIGUSR1 (kill -USR1 <pid>) ou por /profile sem argumentos
+PROFILE_DEFAULT_SECONDS = float(os.getenv("PROFILE_DEFAULT_SECONDS", "30"))
+PROFILE_MAX_SECONDS = 600
+PROFILE_MAX_DEPTH = 64
+
+OUTSIDE_HANDLER = "(fora de handler)"
+IDLE = "(ocioso)"
+
+
+@dataclass
+class ProfileResult:
+    path: str | None
+    samples: int
+    duration: float
+    handler_samples: Counter
+    handler_calls: Counter
+
+    def summary(self) -> str:
+        """Resumo legível: amostras e chamadas por handler."""
+        lines = [f"{self.samples} amostras em {self.duration:.1f}s" + (f", salvas em {self.path}" if self.path else "")]
+        for name, count in self.handler_samples.most_common():
+            share = count / self.samples * 100 if self.samples else 0
+            calls = self.handler_calls.get(name)
+            lines.append(f"{name}: {count} amostras ({share:.0f}%)" + (f", {calls} chamadas" if calls else ""))
+        return "\n".join(lines)
+
+
+class _StackSampler(threading.Thread):
+    """Thread que lê periodicamente a pilha da thread do loop e conta as pilhas (formato 'folded')."""
+
+    def __init__(self, thread_id: int, interval: float, handler_codes: dict):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.handler_codes = handler_codes
+        self.stacks: Counter = Counter()
+        self.handler_samples: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._sample(frame)
+
+    def _sample(self, frame) -> None:
+        frames = []
+        handler = None
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            handler = self.handler_codes.get(code)
+            if handler is not None:
+                # A pilha acima do handler (loop, PTB) é a mesma para todos: corta nele
+                break
+            frame = frame.f_back
+
+        self.samples += 1
+        if handler is None:
+            # O loop parado no select() é tempo ocioso, não trabalho
+            if frames and frames[0].startswith("select (selectors.py"):
+                self.handler_samples[IDLE] += 1
+                self.stacks[IDLE] += 1
+                return
+            handler = OUTSIDE_HANDLER
+            frames = frames[:PROFILE_MAX_DEPTH]
+        self.handler_samples[handler] += 1
+        self.stacks[";".join([handler, *reversed(frames)])] += 1
+
+
+class HandlerProfiler:
+    """
+    Captura sob demanda um perfil por amostragem da thread do loop de eventos, atribuído aos
+    handlers do ConversationHandler, por T segundos ou pelas próximas N chamadas de handlers.
+
+    Desligado, não há custo nenhum: os callbacks dos handlers só são trocados por versões que
+    contam as chamadas enquanto a captura está ativa, e a thread de amostragem só existe durante ela.
+    O resultado é gravado em PROFILE_DIR no formato "folded" (uma pilha por linha seguida da contagem),
+    aceito pelo flamegraph.pl, speedscope e similares.
+    """
+
+    def __init__(self):
+        self._conversation: ConversationHandler | None = None
+        self._original_callbacks: list[tuple[BaseHandler, Callable]] = []
+        self._sampler: _StackSampler | None = None
+        self._started_at = 0.0
+        self._timer: asyncio.TimerHandle | None = None
+        self._max_calls = 0
+        self._calls: Counter = Counter()
+        self._on_finish: Callable[[ProfileResult], None] | None = None
+
+    @property
+    def active(self) -> bool:
+        return self._sampler is not None
+
+    def attach(self, conversation: ConversationHandler) -> None:
+        """Define o ConversationHandler cujos handlers serão medidos."""
+        self._conversation = conversation
+
+    def _handlers(self) -> list[BaseHandler]:
+        conversation = self._conversation
+        if conversation is None:
+            return []
+        handlers = list(conversation.entry_points) + list(conversation.fallbacks)
+        for state_handlers in conversation.states.values():
+            handlers.extend(state_handlers)
+        return handlers
+
+    def start(self, seconds: float | None = None, max_calls: int = 0,
+              on_finish: Callable[[ProfileResult], None] | None = None) -> bool:
+        """
+        Inicia a captura (precisa ser chamado na thread do loop). Termina após 'seconds' segundos
+        ou após 'max_calls' chamadas de handlers, o que vier primeiro.
+
+        Returns:
+            False se já houver uma captura em andamento.
+        """
+        if self.active:
+            return False
+        seconds = min(seconds or PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS)
+
+        handler_codes = {}
+        for handler in self._handlers():
+            callback = handler.callback
+            function = inspect.unwrap(callback)
+            name = getattr(function, "__name__", repr(callback))
+            if hasattr(function, "__code__"):
+                handler_codes[function.__code__] = name
+            self._original_callbacks.append((handler, callback))
+            handler.callback = self._counting(name, callback)
+
+        self._calls = Counter()
+        self._max_calls = max_calls
+        self._on_finish = on_finish
+        self._started_at = time.perf_counter()
+        self._sampler = _StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL, handler_codes)
+        self._sampler.start()
+        self._timer = asyncio.get_running_loop().call_later(seconds, self.stop)
+        logger.warning(f"Captura de perfil iniciada por {seconds:.0f}s"
+                       + (f" ou {max_calls} chamadas de handlers." if max_calls else "."))
+        return True
+
+    def _counting(self, name: str, callback):
+        @functools.wraps(callback)
+        async def counted(update, context):
+            try:
+                return await callback(update, context)
+            finally:
+                self._calls[name] += 1
+                if self._max_calls and self.active and sum(self._calls.values()) >= self._max_calls:
+                    self.stop()
+        return counted
+
+    def stop(self) -> ProfileResult | None:
+        """Encerra a captura, restaura os handlers e grava o perfil."""
+        if not self.active:
+            return None
+        for handler, callback in self._original_callbacks:
+            handler.callback = callback
+        self._original_callbacks.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        sampler, self._sampler = self._sampler, None
+        sampler.stop()
+        result = ProfileResult(None, sampler.samples, time.perf_counter() - self._started_at,
+                               sampler.handler_samples, self._calls)
+        try:
+            result.path = self._write(sampler.stacks)
+        except OSError as e:
+            logger.error(f"Não foi possível gravar o perfil: {e}")
+        logger.warning(f"Captura de perfil encerrada. {result.summary()}")
+
+        on_finish, self._on_finish = self._on_finish, None
+        if on_finish is not None:
+            on_finish(result)
+        return result
+
+    @staticmethod
+    def _write(stacks: Counter) -> str:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        return path
+
+    def install_signal_handler(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Inicia uma captura de PROFILE_DEFAULT_SECONDS ao receber SIGUSR1 (onde houver esse sinal)."""
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, self.start)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            logger.debug("SIGUSR1 indisponível; o perfil só pode ser capturado pelo comando /profile.")
+
+
+profiler = HandlerProfiler()
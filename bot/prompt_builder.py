@@ -0,0 +1,101 @@
+import math
+import os
+from collections import Counter
+
+from bot.knowledge_index import index_terms
+
+# Orçamento (aproximado, em tokens) para os trechos de contexto incluídos no prompt
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "600"))
+# Trechos com ao menos esta fração de termos em comum são considerados repetidos
+_DUPLICATE_SIMILARITY = 0.8
+_CHARS_PER_TOKEN = 4
+
+# Instrução fixa do assistente: é a mesma em todas as chamadas e vai como system_instruction
+# do modelo, então não é remontada nem reenviada junto com cada pergunta.
+SYSTEM_PROMPT = (
+    "Você é um assistente chatbot especialista na equipe brasileira de e-sports FURIA. "
+    "Responda a pergunta do fã sobre a equipe (jogadores atuais, staff, resultados recentes, história, etc.) "
+    "de forma informativa e engajada.\n"
+    "**Instrução Importante:** "
+    "Quando houver uma seção 'Informação Atual Relevante', use PRIMARIAMENTE essa informação para formular "
+    "sua resposta. Se a informação necessária não estiver nela (ou se não houver essa seção), use seu "
+    "conhecimento geral, mas AVISE que a informação pode não ser a mais recente. "
+    "Quando houver uma seção 'Conversa Anterior', use-a apenas para entender a que a pergunta se refere."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata do número de tokens (~4 caracteres por token)."""
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def rank_snippets(question: str, snippets: list[str]) -> list[tuple[float, str]]:
+    """
+    Ordena os trechos pela relevância para a pergunta (TF-IDF entre os próprios candidatos),
+    descartando trechos repetidos ou quase repetidos.
+
+    Returns:
+        Lista de tuplas (pontuação, trecho), da maior para a menor pontuação.
+    """
+    query_terms = set(index_terms(question))
+    documents = [Counter(index_terms(snippet)) for snippet in snippets]
+    document_frequency = Counter(term for terms in documents for term in terms)
+    total = len(documents)
+
+    scored = []
+    for position, (snippet, terms) in enumerate(zip(snippets, documents)):
+        length = sum(terms.values()) or 1
+        score = sum(
+            (terms[term] / length) * math.log(1 + total / document_frequency[term])
+            for term in query_terms if term in terms
+        )
+        scored.append((score, position, snippet, set(terms)))
+    # Em caso de empate, vale a ordem original (fontes mais confiáveis vêm primeiro)
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    ranked, kept_terms = [], []
+    for score, _, snippet, terms in scored:
+        if any(_overlap(terms, other) >= _DUPLICATE_SIMILARITY for other in kept_terms):
+            continue
+        ranked.append((score, snippet))
+        kept_terms.append(terms)
+    return ranked
+
+
+def _overlap(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return float(a == b)
+    return len(a & b) / min(len(a), len(b))
+
+
+def select_snippets(question: str, snippets: list[str], token_budget: int = PROMPT_CONTEXT_TOKEN_BUDGET) -> list[str]:
+    """
+    Escolhe os trechos mais relevantes que cabem no orçamento de tokens. Trechos sem nenhum
+    termo da pergunta só entram quando nenhum trecho tem relação com ela.
+    """
+    ranked = rank_snippets(question, snippets)
+    if any(score > 0 for score, _ in ranked):
+        ranked = [(score, snippet) for score, snippet in ranked if score > 0]
+
+    selected, used = [], 0
+    for _, snippet in ranked:
+        cost = estimate_tokens(snippet) + 1
+        if used + cost > token_budget:
+            continue
+        selected.append(snippet)
+        used += cost
+    return selected
+
+
+def build_prompt(user_question: str, context_snippets: list[str] | None = None, history: str | None = None) -> str:
+    """
+    Monta a parte variável do prompt (contexto selecionado, conversa anterior e pergunta);
+    a instrução fixa é SYSTEM_PROMPT.
+    """
+    selected = select_snippets(user_question, context_snippets) if context_snippets else []
+    prompt = ""
+    if selected:
+        prompt += "## Informação Atual Relevante:\n" + "\n".join(selected) + "\n\n"
+    if history:
+        prompt += f"## Conversa Anterior:\n{history}\n\n"
+    return prompt + f"## Pergunta do Fã:\n{user_question}\n\n## Sua Resposta:"
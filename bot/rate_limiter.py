@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import timedelta
+from typing import Any
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from bot.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Limites do Telegram: ~30 mensagens/s no total, ~1 mensagem/s por chat privado e 20/min por grupo
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_GROUP_RATE = float(os.getenv("TELEGRAM_GROUP_RATE", str(20 / 60)))
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+
+# Chamadas que não enviam nada para um chat (e não contam para os limites de envio)
+_UNLIMITED_ENDPOINTS = frozenset({
+    "getUpdates", "getMe", "setWebhook", "deleteWebhook", "getWebhookInfo", "close", "logOut",
+    "getMyCommands", "setMyCommands", "deleteMyCommands",
+})
+# Chamadas que não são mensagens: passam pelo limite global, mas não pelo do chat
+_NON_MESSAGE_ENDPOINTS = frozenset({"sendChatAction", "answerCallbackQuery", "getChat", "getFile"})
+_MAX_IDLE_BUCKETS = 10_000
+
+
+def _seconds(value: float | timedelta) -> float:
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+
+class TokenBucket:
+    """Balde de fichas: permite rajadas de até 'capacity' e, na média, 'rate' chamadas por segundo."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at", "paused_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self) -> float:
+        """Consome uma ficha se houver; senão retorna quantos segundos esperar."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while (wait := self.try_take()) > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def idle(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+class TokenBucketRateLimiter(BaseRateLimiter[int]):
+    """
+    Limitador das chamadas à API do Telegram com baldes de fichas global e por chat.
+
+    Em caso de RetryAfter (429), pausa o chat afetado (ou tudo, se a chamada não for de um chat)
+    pelo tempo pedido pelo Telegram e tenta de novo, até TELEGRAM_MAX_RETRIES vezes. O número
+    de tentativas pode ser trocado por chamada com 'rate_limit_args'.
+    """
+
+    def __init__(self, global_rate: float = TELEGRAM_GLOBAL_RATE, chat_rate: float = TELEGRAM_CHAT_RATE,
+                 group_rate: float = TELEGRAM_GROUP_RATE, chat_burst: float = TELEGRAM_CHAT_BURST,
+                 max_retries: int = TELEGRAM_MAX_RETRIES):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: dict[int | str, TokenBucket] = {}
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        self._chat_buckets.clear()
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= _MAX_IDLE_BUCKETS:
+                self._chat_buckets = {key: b for key, b in self._chat_buckets.items() if not b.idle()}
+            is_group = isinstance(chat_id, str) or (isinstance(chat_id, int) and chat_id < 0)
+            bucket = TokenBucket(self.group_rate if is_group else self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def process_request(self, callback, args: Any, kwargs: dict[str, Any], endpoint: str,
+                              data: dict[str, Any], rate_limit_args: int | None):
+        if endpoint in _UNLIMITED_ENDPOINTS:
+            if endpoint == "getUpdates":
+                # Long polling: a duração é o tempo de espera por updates, não latência
+                return await callback(*args, **kwargs)
+            with metrics.track("upstream", upstream="telegram", endpoint=endpoint):
+                return await callback(*args, **kwargs)
+
+        chat_id = data.get("chat_id")
+        chat_bucket = (
+            self._chat_bucket(chat_id)
+            if chat_id is not None and endpoint not in _NON_MESSAGE_ENDPOINTS else None
+        )
+        max_retries = self.max_retries if rate_limit_args is None else rate_limit_args
+
+        for attempt in range(max_retries + 1):
+            waiting_since = time.perf_counter()
+            if chat_bucket is not None:
+                await chat_bucket.acquire()
+            await self._global_bucket.acquire()
+            metrics.observe("telegram_rate_limit_wait_seconds", time.perf_counter() - waiting_since)
+            try:
+                with metrics.track("upstream", upstream="telegram", endpoint=endpoint):
+                    return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                metrics.inc("telegram_retry_after_total", endpoint=endpoint)
+                if attempt >= max_retries:
+                    raise
+                retry_after = _seconds(e.retry_after)
+                logger.warning(f"Telegram pediu {retry_after:.0f}s de espera em '{endpoint}' "
+                               f"(chat {chat_id}); tentativa {attempt + 1} de {max_retries}.")
+                (chat_bucket or self._global_bucket).pause(retry_after)
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+from bot.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# --- Disjuntor (circuit breaker) ---
+# Depois de CIRCUIT_FAILURE_THRESHOLD falhas seguidas o circuito abre e as chamadas falham na hora
+# por CIRCUIT_OPEN_SECONDS; depois disso uma chamada de teste decide se ele fecha ou abre de novo.
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+# --- Timeouts adaptativos ---
+# O timeout de cada serviço é o p99 das latências recentes vezes ADAPTIVE_TIMEOUT_FACTOR, limitado
+# ao intervalo [mínimo, máximo] do serviço. Até ter ADAPTIVE_TIMEOUT_MIN_SAMPLES medições, usa o máximo.
+# Um timeout dobra o valor na hora (o serviço ficou mais lento do que as medições diziam) e entra nas
+# medições com a duração do timeout, para que o próximo cálculo não volte a encolhê-lo.
+ADAPTIVE_TIMEOUT_FACTOR = float(os.getenv("ADAPTIVE_TIMEOUT_FACTOR", "2.0"))
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = 20
+_LATENCY_WINDOW = 256
+
+# --- Novas tentativas ---
+# Cada sucesso rende RETRY_BUDGET_RATIO fichas (até RETRY_BUDGET_MAX) e cada nova tentativa gasta uma:
+# com o serviço fora do ar as tentativas acabam rápido, em vez de multiplicar a carga sobre ele.
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX = 10.0
+RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "0.2"))
+
+_TRANSIENT_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+CLOSED, OPEN, HALF_OPEN = "fechado", "aberto", "meio-aberto"
+
+
+class CircuitOpenError(Exception):
+    """O circuito do serviço está aberto: a chamada nem foi feita."""
+
+    def __init__(self, upstream: str):
+        super().__init__(f"Circuito de '{upstream}' aberto")
+        self.upstream = upstream
+
+
+def is_transient(error: BaseException) -> bool:
+    """Indica se o erro é uma falha do serviço (timeout, rede, 5xx, 429), que conta para o disjuntor."""
+    if isinstance(error, (OSError, httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in _TRANSIENT_STATUS
+    # Erros do SDK do Google (google.api_core.exceptions) trazem o status HTTP em 'code'
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in _TRANSIENT_STATUS
+
+
+class Upstream:
+    """
+    Camada de resiliência de um serviço externo: disjuntor, timeout adaptativo e novas tentativas
+    com jitter limitadas por um orçamento.
+
+    call() junta tudo; allow(), timeout(), record_success() e record_failure() ficam disponíveis
+    para chamadas que não podem ser repetidas (como o streaming do Gemini).
+    """
+
+    def __init__(self, name: str, min_timeout: float, max_timeout: float, max_retries: int = 1):
+        self.name = name
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.max_retries = max_retries
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._timeout = max_timeout
+        self._observations_since_update = 0
+        self._retry_tokens = RETRY_BUDGET_MAX
+        _upstreams[name] = self
+
+    # --- Disjuntor ---
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"Circuito de '{self.name}': {self.state} -> {state}.")
+            metrics.inc("circuit_transitions_total", upstream=self.name, state=state)
+            self.state = state
+
+    def is_open(self) -> bool:
+        """Indica se as chamadas estão sendo recusadas (sem consumir a chamada de teste do meio-aberto)."""
+        return self.state != CLOSED and time.monotonic() - self._opened_at < CIRCUIT_OPEN_SECONDS
+
+    def allow(self) -> None:
+        """
+        Verifica se a chamada pode ser feita.
+
+        Raises:
+            CircuitOpenError: se o circuito estiver aberto (ou meio-aberto com o teste já em andamento).
+        """
+        if self.state == CLOSED:
+            return
+        if self.is_open():
+            metrics.inc("circuit_rejections_total", upstream=self.name)
+            raise CircuitOpenError(self.name)
+        # Libera uma única chamada de teste; a próxima só depois de outro intervalo, caso esta se perca
+        self._set_state(HALF_OPEN)
+        self._opened_at = time.monotonic()
+
+    def record_success(self, duration: float) -> None:
+        self.consecutive_failures = 0
+        self._set_state(CLOSED)
+        self._retry_tokens = min(RETRY_BUDGET_MAX, self._retry_tokens + RETRY_BUDGET_RATIO)
+        self._latencies.append(duration)
+        self._observations_since_update += 1
+        if self._observations_since_update >= 16:
+            self._update_timeout()
+
+    def record_failure(self, error: BaseException) -> None:
+        if isinstance(error, (TimeoutError, httpx.TimeoutException)):
+            self._record_timeout()
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+            if self.state != OPEN:
+                logger.error(f"Serviço '{self.name}' falhando ({self.consecutive_failures} falhas seguidas, "
+                             f"última: {error!r}); respostas degradadas por {CIRCUIT_OPEN_SECONDS:.0f}s.")
+            self._set_state(OPEN)
+            self._opened_at = time.monotonic()
+
+    # --- Timeout adaptativo ---
+
+    def _update_timeout(self) -> None:
+        self._observations_since_update = 0
+        if len(self._latencies) < ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return
+        ordered = sorted(self._latencies)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        self._timeout = min(self.max_timeout, max(self.min_timeout, p99 * ADAPTIVE_TIMEOUT_FACTOR))
+
+    def _record_timeout(self) -> None:
+        self._latencies.append(self._timeout)
+        widened = min(self.max_timeout, self._timeout * 2)
+        if widened > self._timeout:
+            logger.info(f"Timeout de '{self.name}' aumentado para {widened:.1f}s.")
+            self._timeout = widened
+
+    def timeout(self) -> float:
+        """Timeout atual da chamada, derivado das latências recentes."""
+        return self._timeout
+
+    # --- Chamada completa ---
+
+    def _take_retry_token(self) -> bool:
+        if self._retry_tokens >= 1:
+            self._retry_tokens -= 1
+            return True
+        metrics.inc("retry_budget_exhausted_total", upstream=self.name)
+        return False
+
+    async def call(self, operation: Callable[[float], Awaitable[T]]) -> T:
+        """
+        Executa 'operation(timeout)' com o disjuntor, o timeout adaptativo e as novas tentativas.
+        Só falhas transitórias (ver is_transient) contam para o disjuntor e são repetidas.
+
+        Raises:
+            CircuitOpenError: se o circuito estiver aberto;
+            a exceção da última tentativa, se todas falharem.
+        """
+        attempt = 0
+        while True:
+            self.allow()
+            timeout = self.timeout()
+            started_at = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(operation(timeout), timeout)
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                self.record_failure(e)
+                if attempt >= self.max_retries or self.state == OPEN or not self._take_retry_token():
+                    raise
+                attempt += 1
+                metrics.inc("upstream_retries_total", upstream=self.name)
+                delay = random.uniform(0, RETRY_BACKOFF_BASE * 2 ** attempt)
+                logger.info(f"Falha transitória em '{self.name}' ({e!r}); nova tentativa em {delay:.2f}s.")
+                await asyncio.sleep(delay)
+                continue
+            self.record_success(time.perf_counter() - started_at)
+            return result
+
+    def report(self) -> str:
+        return (f"{self.name}: circuito {self.state}, timeout {self._timeout:.1f}s, "
+                f"falhas seguidas {self.consecutive_failures}, fichas de nova tentativa {self._retry_tokens:.1f}")
+
+
+_upstreams: dict[str, Upstream] = {}
+
+
+def report() -> str:
+    """Estado de todos os serviços externos (para o comando /stats)."""
+    return "\n".join(upstream.report() for upstream in _upstreams.values()) or "Nenhum serviço externo registrado."
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from bot.formatting import format_match
+from bot.match_store import ensure_results, match_store
+
+RESULTS_PAGE_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True, slots=True)
+class ResultsPage:
+    """Uma página do histórico de resultados, com as partidas já formatadas em Markdown."""
+    offset: int
+    count: int
+    total: int
+    block: str
+
+    @property
+    def has_previous(self) -> bool:
+        return self.offset > 0
+
+    @property
+    def has_next(self) -> bool:
+        return self.offset + self.count < self.total
+
+    @property
+    def title(self) -> str:
+        if self.offset == 0:
+            return "Últimos Resultados da FURIA:"
+        return f"Resultados da FURIA ({self.offset + 1} a {self.offset + self.count} de {self.total}):"
+
+    @property
+    def text(self) -> str:
+        return f"*{self.title}*\n\n{self.block}"
+
+
+class ResultsPageCache:
+    """
+    Cache LRU das páginas de resultados já formatadas, indexado por (versão do histórico, offset, tamanho).
+
+    Quando o histórico muda (match_store.version), as páginas antigas deixam de ser encontradas e
+    são descartadas; até lá, mostrar uma página não consulta o banco nem formata nada.
+    """
+
+    def __init__(self, max_pages: int = RESULTS_PAGE_CACHE_SIZE):
+        self.max_pages = max_pages
+        self._pages: OrderedDict[tuple[int, int, int], ResultsPage] = OrderedDict()
+        self._version = 0
+        self.stats = {"hits": 0, "misses": 0}
+
+    async def get(self, offset: int, count: int) -> ResultsPage | None:
+        """
+        Retorna a página que começa em 'offset' (vazia se passar do fim do histórico).
+
+        Returns:
+            A página ou None se não houver dados disponíveis.
+        """
+        if not await ensure_results():
+            return None
+
+        version = match_store.version
+        key = (version, offset, count)
+        page = self._pages.get(key)
+        if page is not None:
+            self._pages.move_to_end(key)
+            self.stats["hits"] += 1
+            return page
+
+        self.stats["misses"] += 1
+        results = await match_store.page(offset, count)
+        page = ResultsPage(offset, len(results), match_store.size, "".join(format_match(r) for r in results))
+        # Se o histórico mudou durante a consulta, a página pode estar misturada: não guarda
+        if match_store.version == version:
+            if version != self._version:
+                self._pages.clear()
+                self._version = version
+            self._pages[key] = page
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return page
+
+
+results_pages = ResultsPageCache()
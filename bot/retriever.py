@@ -1,82 +1,134 @@
+import asyncio
 import json
 import logging
 import os
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from bot import http_client
 from bot.consts import logger
+from bot.knowledge_index import get_knowledge_index
+from bot.metrics import metrics
+from bot.resilience import CircuitOpenError, Upstream
+from bot.search_cache import search_cache
 
 load_dotenv()
 
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+SERPER_SEARCH_URL = os.getenv("SERPER_SEARCH_URL", "https://google.serper.dev/search")
 
+# Disjuntor, timeout adaptativo (de 1.5 a 10s) e uma nova tentativa nas buscas à Serper
+serper_upstream = Upstream("serper", min_timeout=1.5, max_timeout=10.0, max_retries=1)
 
-async def get_current_furia_context(query: str, max_chars: int = 2000) -> str | None:
+
+SERPER_MAX_SNIPPETS = 6
+
+
+def _build_snippets(results: dict) -> list[str] | None:
+    """Monta os trechos de contexto a partir dos resultados orgânicos da Serper."""
+    snippets = []
+    if 'organic' in results:
+        for result in results['organic'][:SERPER_MAX_SNIPPETS]:
+            title = result.get('title', '')
+            link = result.get('link', '')
+            snippet = result.get('snippet', '')
+            if snippet:
+                snippets.append(f"- {title}: {snippet} (Fonte: {link})")
+
+    if not snippets:
+        logger.info("Nenhum resultado relevante encontrado na busca Serper.")
+        return None
+
+    return snippets
+
+
+def _local_snippets(query: str) -> list[str] | None:
+    """Trechos da base local de conhecimento, se ela for suficiente para a pergunta."""
+    try:
+        results = get_knowledge_index().lookup(query)
+    except Exception as e:
+        logger.error(f"Erro ao consultar a base local de conhecimento: {e}")
+        return None
+    if not results:
+        return None
+    return [f"- {passage} (Fonte: base local FURIA)" for _, passage, _ in results]
+
+
+async def get_furia_snippets(query: str) -> list[str] | None:
     """
-    Busca informações atuais sobre a FURIA usando a API Serper.dev
-    e retorna um resumo do contexto encontrado.
+    Busca trechos de informação sobre a FURIA.
+
+    Consulta primeiro a base local de conhecimento (bot/knowledge) e só recorre à
+    API Serper.dev quando a base local não cobre a pergunta.
 
     Args:
-        query: A pergunta original do usuário (usada para refinar a busca);
-        max_chars: limite aproximado de caracteres para o contexto retornado.
+        query: A pergunta original do usuário (usada para refinar a busca).
 
     Returns:
-        Uma string com o contexto encontrado ou None se a busca falhar ou não retornar nada útil.
+        Lista de trechos (um por resultado, com a fonte) ou None se a busca falhar ou não retornar nada útil.
     """
+    local_snippets = _local_snippets(query)
+    if local_snippets:
+        metrics.inc("cache_requests_total", cache="knowledge", result="hit")
+        logger.info(f"Contexto para '{query}' obtido da base local de conhecimento.")
+        return local_snippets
+    metrics.inc("cache_requests_total", cache="knowledge", result="miss")
+
     if not SERPER_API_KEY:
         logger.warning("SERPER_API_KEY não definida. Não é possível buscar contexto atual.")
         return None
 
     search_query = f"FURIA e-sports {query}"
-    logger.info(f"Executando busca na web com Serper: '{search_query}'")
 
-    headers = {
-        'X-API-KEY': SERPER_API_KEY,
-        'Content-Type': 'application/json'
-    }
-    payload = json.dumps({"q": search_query})
-    search_url = "https://google.serper.dev/search"
+    results = await search_cache.get(search_query)
+    if results is not None:
+        metrics.inc("cache_requests_total", cache="search", result="hit")
+        logger.info(f"Busca '{search_query}' servida pelo cache de buscas.")
+        return _build_snippets(results)
+    metrics.inc("cache_requests_total", cache="search", result="miss")
 
-    try:
-        response = requests.post(search_url, headers=headers, data=payload, timeout=10)
-        response.raise_for_status()
-        results = response.json()
-
-        context_parts = []
-        if 'organic' in results:
-            for result in results['organic'][:3]:
-                title = result.get('title', '')
-                link = result.get('link', '')
-                snippet = result.get('snippet', '')
-                if snippet:
-                    context_parts.append(f"- {title}: {snippet} (Fonte: {link})")
-
-        if not context_parts:
-            logger.info("Nenhum resultado relevante encontrado na busca Serper.")
-            return None
-
-        full_context = "\n".join(context_parts)
+    logger.info(f"Executando busca na web com Serper: '{search_query}'")
 
-        return full_context[:max_chars]
+    try:
+        results = await serper_upstream.call(lambda timeout: _search_serper(search_query, timeout))
+        await search_cache.put(search_query, results)
+        return _build_snippets(results)
 
-    except requests.exceptions.Timeout:
+    except CircuitOpenError:
+        logger.warning("Serper indisponível (circuito aberto); busca não realizada.")
+    except (httpx.TimeoutException, asyncio.TimeoutError):
         logger.error("Timeout ao buscar contexto na API Serper.")
-        return None
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Erro na requisição para a API Serper: {e}")
-        return None
     except json.JSONDecodeError as e:
         logger.error(f"Erro ao decodificar resposta JSON da Serper: {e}")
-        return None
     except Exception as e:
         logger.exception(f"Erro inesperado ao buscar contexto na Serper: {e}")
-        return None
 
+    # Serper fora do ar (ou com resposta inválida): uma busca antiga (já expirada) ainda serve de contexto
+    results = await search_cache.get(search_query, allow_expired=True)
+    if results is not None:
+        metrics.inc("cache_requests_total", cache="search", result="fallback")
+        logger.info(f"Busca '{search_query}' servida por uma entrada expirada do cache de buscas.")
+        return _build_snippets(results)
+    return None
 
-if __name__ == '__main__':
-    import asyncio
 
+async def _search_serper(search_query: str, timeout: float) -> dict:
+    headers = {
+        'X-API-KEY': SERPER_API_KEY,
+        'Content-Type': 'application/json'
+    }
+    payload = json.dumps({"q": search_query})
+    with metrics.track("upstream", upstream="serper"):
+        response = await http_client.request("POST", SERPER_SEARCH_URL, headers=headers, content=payload,
+                                             timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
 
 
@@ -84,9 +136,9 @@ if __name__ == '__main__':
         question = "Quem é o CTO da FURIA?"
         # question = "Qual foi o ultimo jogo da furia cs?"
         print(f"Buscando contexto para: {question}")
-        context = await get_current_furia_context(question)
-        if context:
-            print("\nContexto Encontrado:\n", context)
+        snippets = await get_furia_snippets(question)
+        if snippets:
+            print("\nContexto Encontrado:\n", "\n".join(snippets))
         else:
             print("\nNenhum contexto encontrado ou erro na busca.")
 
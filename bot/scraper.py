@@ -1,24 +1,45 @@
 # bot/scraper.py
 
+import asyncio
 import json
 import logging
+import os
 from datetime import datetime, timezone, timedelta
+from typing import NamedTuple
 
-import requests
-from bs4 import BeautifulSoup
+import httpx
+
+from bot import http_client
+from bot.metrics import metrics
+from bot.next_data import NextDataScanner, RESULTS_PATH, extract_json_path, extract_next_data_bs4
+from bot.resilience import CircuitOpenError, Upstream
 
 logger = logging.getLogger(__name__)
 
-DRAFT5_FURIA_RESULTS_URL = "https://draft5.gg/equipe/330-FURIA/resultados"
+DRAFT5_FURIA_RESULTS_URL = os.getenv("DRAFT5_RESULTS_URL", "https://draft5.gg/equipe/330-FURIA/resultados")
 TEAM_ID_FURIA = 330
 
+# Disjuntor, timeout adaptativo (de 2 a 15s) e até 2 novas tentativas nas buscas ao Draft5
+draft5_upstream = Upstream("draft5", min_timeout=2.0, max_timeout=15.0, max_retries=2)
+
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
 
+class MatchResult(NamedTuple):
+    """Registro compacto e imutável de uma partida da FURIA."""
+    furia_score: int | str
+    opponent_score: int | str
+    opponent_name: str
+    tournament_name: str
+    date: str
+    match_id: int | None
+    timestamp: int | None
+
+
 def format_match_result(match_data):
-    """Formata os dados de uma única partida em um dicionário mais limpo."""
+    """Formata os dados de uma única partida em um MatchResult."""
     try:
         team_a = match_data.get('teamA', {})
         team_b = match_data.get('teamB', {})
@@ -46,77 +67,102 @@ def format_match_result(match_data):
             dt_brt = dt_utc.astimezone(timezone(timedelta(hours=-3)))
             date_str = dt_brt.strftime('%d/%m/%Y %H:%M')
 
-        result = {
-            'furia_score': furia_score if furia_score is not None else '?',
-            'opponent_score': opponent_score if opponent_score is not None else '?',
-            'opponent_name': opponent_team.get('teamName', 'Desconhecido'),
-            'tournament_name': tournament.get('tournamentName', 'Torneio desconhecido'),
-            'date': date_str,
-            'match_id': match_data.get('matchId')
-        }
-        return result
+        return MatchResult(
+            furia_score=furia_score if furia_score is not None else '?',
+            opponent_score=opponent_score if opponent_score is not None else '?',
+            opponent_name=opponent_team.get('teamName', 'Desconhecido'),
+            tournament_name=tournament.get('tournamentName', 'Torneio desconhecido'),
+            date=date_str,
+            match_id=match_data.get('matchId'),
+            timestamp=timestamp,
+        )
 
     except Exception as e:
         logger.error(f"Erro ao formatar dados da partida {match_data.get('matchId', 'N/A')}: {e}")
         return None
 
 
-def fetch_results_data(url=DRAFT5_FURIA_RESULTS_URL):
-    """Busca e parseia os dados JSON da página de resultados."""
-    logger.info(f"Buscando resultados de: {url}")
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=15)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        script_tag = soup.find('script', {'id': '__NEXT_DATA__'})
-
-        if not script_tag:
+async def _fetch_results_list_once(url: str, timeout: float):
+    with metrics.track("upstream", upstream="draft5"):
+        async with http_client.stream("GET", url, headers=HEADERS, timeout=timeout) as response:
+            response.raise_for_status()
+            scanner = NextDataScanner()
+            chunks = response.aiter_text()
+            async for chunk in chunks:
+                if scanner.feed(chunk):
+                    break
+
+            if scanner.json_text is not None:
+                try:
+                    return await asyncio.to_thread(extract_json_path, scanner.json_text, RESULTS_PATH)
+                except (KeyError, ValueError) as e:
+                    logger.warning(f"Extração rápida do __NEXT_DATA__ falhou ({e!r}). Usando BeautifulSoup.")
+
+            # Fallback: precisa do documento inteiro
+            rest = [chunk async for chunk in chunks]
+            html = scanner.html + "".join(rest)
+
+        # O parse do HTML é CPU-bound: roda em uma thread para não travar o event loop
+        json_data = await asyncio.to_thread(extract_next_data_bs4, html)
+        if not json_data:
             logger.error("Não foi possível encontrar a tag <script id='__NEXT_DATA__'>")
+            metrics.inc("upstream_errors_total", upstream="draft5")
             return None
 
-        json_data = json.loads(script_tag.string)
-        return json_data
+        return json_data['props']['pageProps']['results']
+
+
+async def fetch_results_list(url=DRAFT5_FURIA_RESULTS_URL):
+    """
+    Busca a página de resultados e extrai a lista 'props.pageProps.results' do __NEXT_DATA__.
 
-    except requests.exceptions.Timeout:
+    O corpo é lido em streaming e a leitura para assim que a tag do __NEXT_DATA__ termina;
+    só a lista de resultados é decodificada. Se a extração rápida falhar, usa o BeautifulSoup.
+    A chamada passa pela camada de resiliência do Draft5 (disjuntor, timeout adaptativo e novas tentativas).
+    """
+    logger.info(f"Buscando resultados de: {url}")
+    try:
+        return await draft5_upstream.call(lambda timeout: _fetch_results_list_once(url, timeout))
+
+    except CircuitOpenError:
+        logger.warning("Draft5 indisponível (circuito aberto); busca não realizada.")
+        return None
+    except (httpx.TimeoutException, asyncio.TimeoutError):
         logger.error(f"Timeout ao tentar buscar a URL: {url}")
         return None
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Erro na requisição para {url}: {e}")
         return None
     except json.JSONDecodeError as e:
         logger.error(f"Erro ao decodificar o JSON da tag <script>: {e}")
         return None
+    except KeyError as e:
+        logger.error(f"Estrutura do JSON inesperada. Chave não encontrada: {e}")
+        return None
     except Exception as e:
         logger.exception(
             f"Erro inesperado ao buscar/parsear dados de {url}: {e}")
         return None
 
 
-def get_furia_latest_results(count=5):
-    """Busca os 'count' últimos resultados da FURIA no Draft5."""
-    json_data = fetch_results_data()
-    if not json_data:
+async def load_furia_results(url=DRAFT5_FURIA_RESULTS_URL):
+    """Busca uma página de resultados do Draft5 e formata todos os resultados encontrados."""
+    results_list = await fetch_results_list(url)
+    if results_list is None:
         return None
 
     try:
-        results_list = json_data['props']['pageProps']['results']
         if not results_list:
             logger.info("Lista de resultados ('results') vazia no JSON.")
-            return []
+            return ()
 
-        formatted_results = []
-        for match in results_list[:count]:
-            formatted = format_match_result(match)
-            if formatted:
-                formatted_results.append(formatted)
+        formatted_results = tuple(
+            formatted for formatted in map(format_match_result, results_list) if formatted
+        )
 
         logger.info(f"Encontrados e formatados {len(formatted_results)} resultados.")
         return formatted_results
 
-    except KeyError as e:
-        logger.error(f"Estrutura do JSON inesperada. Chave não encontrada: {e}")
-        return None
     except Exception as e:
         logger.exception(f"Erro inesperado ao processar a lista de resultados: {e}")
         return None
@@ -124,13 +170,13 @@ def get_furia_latest_results(count=5):
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
-    latest_results = get_furia_latest_results(count=3)
+    latest_results = asyncio.run(load_furia_results())
     if latest_results is None:
         print("Falha ao buscar resultados.")
     elif not latest_results:
         print("Nenhum resultado encontrado.")
     else:
-        print(f"Últimos {len(latest_results)} resultados:")
-        for r in latest_results:
+        print(f"Últimos {min(len(latest_results), 3)} resultados:")
+        for r in latest_results[:3]:
             print(
-                f"- {r['date']}: FURIA {r['furia_score']} x {r['opponent_score']} {r['opponent_name']} ({r['tournament_name']})")
+                f"- {r.date}: FURIA {r.furia_score} x {r.opponent_score} {r.opponent_name} ({r.tournament_name})")
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from bot.db import connect_sqlite
+from bot.text_normalization import normalize_question
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "furia_bot_data/search_cache.sqlite3")
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(6 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+# Entradas expiradas ficam guardadas por mais este tempo, como reserva para quando a Serper estiver fora do ar
+SEARCH_CACHE_MAX_STALE = float(os.getenv("SEARCH_CACHE_MAX_STALE", str(7 * 24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    query_key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_search_cache_last_access ON search_cache (last_access);
+"""
+
+
+class SearchCache:
+    """
+    Cache em disco (SQLite) das respostas brutas da Serper, indexado pela consulta normalizada.
+
+    Sobrevive a reinícios do bot, expira entradas após 'ttl' segundos e mantém no máximo
+    'max_entries' linhas (as menos acessadas são removidas). Entradas expiradas só são apagadas
+    depois de 'max_stale' segundos e podem ser lidas com allow_expired=True. Todo acesso ao banco
+    roda em uma thread, fora do event loop.
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl: float = SEARCH_CACHE_TTL,
+                 max_entries: int = SEARCH_CACHE_MAX_ENTRIES, max_stale: float = SEARCH_CACHE_MAX_STALE):
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = connect_sqlite(self.path)
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def _get(self, key: str, allow_expired: bool = False):
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT response, created_at FROM search_cache WHERE query_key = ?", (key,)
+            ).fetchone()
+            if row is None or (now - row[1] > self.ttl and not allow_expired):
+                return None
+            with connection:
+                connection.execute("UPDATE search_cache SET last_access = ? WHERE query_key = ?", (now, key))
+        return json.loads(row[0])
+
+    def _put(self, key: str, response: dict) -> None:
+        now = time.time()
+        payload = json.dumps(response, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO search_cache (query_key, response, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, payload, now, now),
+                )
+                connection.execute("DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl - self.max_stale,))
+                excess = connection.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    connection.execute(
+                        "DELETE FROM search_cache WHERE query_key IN "
+                        "(SELECT query_key FROM search_cache ORDER BY last_access LIMIT ?)",
+                        (excess,),
+                    )
+
+    async def get(self, query: str, allow_expired: bool = False) -> dict | None:
+        """
+        Retorna a resposta da Serper em cache para a consulta, se existir e não tiver expirado
+        (ou mesmo expirada, com allow_expired=True).
+        """
+        try:
+            return await asyncio.to_thread(self._get, normalize_question(query), allow_expired)
+        except Exception as e:
+            logger.error(f"Erro ao ler o cache de buscas: {e}")
+            return None
+
+    async def put(self, query: str, response: dict) -> None:
+        """Guarda a resposta bruta da Serper para a consulta."""
+        try:
+            await asyncio.to_thread(self._put, normalize_question(query), response)
+        except Exception as e:
+            logger.error(f"Erro ao gravar no cache de buscas: {e}")
+
+
+search_cache = SearchCache()
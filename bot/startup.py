@@ -0,0 +1,28 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Importado antes de tudo em bot.main: marca o início da inicialização do bot
+_started_at = time.perf_counter()
+_marks: dict[str, float] = {}
+
+
+def mark(name: str) -> float:
+    """Registra (uma única vez) quanto tempo se passou desde o início até a etapa 'name'."""
+    if name not in _marks:
+        _marks[name] = time.perf_counter() - _started_at
+    return _marks[name]
+
+
+def report() -> str:
+    """Resumo das etapas de inicialização registradas até agora, em ordem."""
+    steps = ", ".join(f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in sorted(_marks.items(), key=lambda i: i[1]))
+    return f"Tempos de inicialização: {steps}"
+
+
+async def log_first_update(update: object, context) -> None:
+    """Handler (TypeHandler) que registra o tempo até o primeiro update recebido."""
+    if "primeiro_update" not in _marks:
+        mark("primeiro_update")
+        logger.info(report())
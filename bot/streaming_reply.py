@@ -0,0 +1,162 @@
+import logging
+import os
+import time
+
+from telegram import Message
+from telegram.constants import MessageLimit, ParseMode
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre duas edições da mesma mensagem (o Telegram limita edições por chat)
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+MAX_MESSAGE_LENGTH = MessageLimit.MAX_TEXT_LENGTH
+
+
+def markdown_safe_prefix(text: str) -> str:
+    """
+    Retorna o maior prefixo de 'text' sem entidades Markdown abertas (*negrito*, _itálico_,
+    `código`, ```bloco``` e [links](url)), para que textos parciais possam ser enviados com
+    parse_mode Markdown sem erro de parse.
+    """
+    safe_end = 0
+    index = 0
+    length = len(text)
+    open_marker = None
+
+    while index < length:
+        if open_marker is not None:
+            if text.startswith(open_marker, index):
+                index += len(open_marker)
+                open_marker = None
+                safe_end = index
+            else:
+                index += 1
+            continue
+
+        char = text[index]
+        if text.startswith("```", index):
+            open_marker = "```"
+            index += 3
+        elif char in "*_`":
+            open_marker = char
+            index += 1
+        elif char == "\\":
+            index = min(index + 2, length)
+            safe_end = index
+        elif char == "[":
+            label_end = text.find("]", index)
+            if label_end == -1 or not text.startswith("(", label_end + 1):
+                break
+            url_end = text.find(")", label_end)
+            if url_end == -1:
+                break
+            index = safe_end = url_end + 1
+        else:
+            index += 1
+            safe_end = index
+
+    return text[:safe_end]
+
+
+class StreamingReply:
+    """
+    Resposta que cresce conforme o texto chega: a primeira mensagem é enviada assim que há
+    texto e depois é editada no lugar. As edições são agrupadas (no máximo uma a cada
+    STREAM_EDIT_INTERVAL segundos) e textos parciais são cortados em um ponto seguro do Markdown.
+    Textos maiores que o limite do Telegram continuam em uma nova mensagem.
+    """
+
+    def __init__(self, reply_to: Message, edit_interval: float = STREAM_EDIT_INTERVAL):
+        self.reply_to = reply_to
+        self.edit_interval = edit_interval
+        self.text = ""
+        self._message_start = 0
+        self._message: Message | None = None
+        self._sent_text = ""
+        self._last_edit = 0.0
+
+    @property
+    def _current(self) -> str:
+        return self.text[self._message_start:]
+
+    async def append(self, chunk: str) -> None:
+        """Adiciona um pedaço de texto e atualiza a mensagem se já passou o intervalo mínimo."""
+        if not chunk:
+            return
+        self.text += chunk
+
+        if len(self._current) > MAX_MESSAGE_LENGTH:
+            await self._split_message()
+
+        if self._message is None or time.monotonic() - self._last_edit >= self.edit_interval:
+            await self._push(markdown_safe_prefix(self._current))
+
+    async def send_complete(self, text: str, footer: str | None = None) -> str:
+        """Envia um texto já completo (ex.: vindo de cache), sem etapas intermediárias."""
+        self.text += text
+        while len(self._current) > MAX_MESSAGE_LENGTH:
+            await self._split_message()
+        return await self.finish(footer)
+
+    async def finish(self, footer: str | None = None) -> str:
+        """
+        Envia a versão final (com Markdown completo) e retorna o texto inteiro.
+
+        O 'footer' (ex.: o aviso de resposta gerada por IA) vai na mesma mensagem quando cabe,
+        e não faz parte do texto retornado.
+        """
+        current = self._current
+        if not self.text:
+            return self.text
+        if footer and current and len(current) + 2 + len(footer) <= MAX_MESSAGE_LENGTH:
+            await self._push(f"{current}\n\n{footer}", final=True)
+            return self.text
+
+        if current:
+            await self._push(current, final=True)
+        if footer:
+            await self.reply_to.reply_text(footer)
+        return self.text
+
+    async def _split_message(self) -> None:
+        """Fecha a mensagem atual no último parágrafo/linha que cabe e continua em uma nova."""
+        current = self._current
+        cut = current.rfind("\n", 0, MAX_MESSAGE_LENGTH)
+        if cut <= 0:
+            cut = MAX_MESSAGE_LENGTH
+        await self._push(current[:cut], final=True)
+        self._message_start += cut
+        self._message = None
+        self._sent_text = ""
+
+    async def _push(self, text: str, final: bool = False) -> None:
+        if not text.strip() or text == self._sent_text:
+            return
+        try:
+            # Edições intermediárias não esperam o Telegram liberar o envio: são só puladas
+            await self._send_or_edit(text, ParseMode.MARKDOWN, rate_limit_args=None if final else 0)
+        except RetryAfter as e:
+            if not final:
+                # Pula esta edição; a próxima (ou a final) leva o texto atualizado
+                self._last_edit = time.monotonic() + e.retry_after
+                return
+            raise
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return
+            # Markdown gerado pela LLM nem sempre é válido para o Telegram: envia como texto puro
+            logger.debug(f"Falha no parse do Markdown ({e}); enviando texto puro.")
+            await self._send_or_edit(text, None)
+
+    async def _send_or_edit(self, text: str, parse_mode, rate_limit_args=None) -> None:
+        # Os atalhos de Message (reply_text/edit_text) não aceitam 'rate_limit_args': usa o bot direto
+        bot = self.reply_to.get_bot()
+        if self._message is None:
+            self._message = await bot.send_message(chat_id=self.reply_to.chat_id, text=text, parse_mode=parse_mode,
+                                                   rate_limit_args=rate_limit_args)
+        else:
+            await bot.edit_message_text(text, chat_id=self._message.chat_id, message_id=self._message.message_id,
+                                        parse_mode=parse_mode, rate_limit_args=rate_limit_args)
+        self._sent_text = text
+        self._last_edit = time.monotonic()
@@ -0,0 +1,64 @@
+import re
+import unicodedata
+
+# Palavras sem conteúdo para a busca/comparação de perguntas. Pronomes interrogativos
+# (quem, qual, quando...) ficam de fora porque mudam o sentido da pergunta.
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de da do das dos e em no na nos nas num numa por pelo pela pelos pelas
+para pra pro com sem sob sobre ao aos que se me te lhe eu tu ele ela voces vcs vc voce
+foi ser e sao esta estao era eram tem ter ha sera seria
+me diga fala falar sabe saber gostaria queria quero pode poderia favor ai la aqui
+isso isto esse essa aquele aquela mais muito bem entao tipo
+furia
+""".split())
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def strip_accents(text: str) -> str:
+    """Remove acentos ('é' -> 'e', 'ç' -> 'c')."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> list[str]:
+    """Quebra o texto em palavras minúsculas e sem acento."""
+    return _WORD_RE.findall(strip_accents(text.lower()))
+
+
+def content_tokens(text: str) -> list[str]:
+    """Palavras do texto sem as stopwords."""
+    return [token for token in tokenize(text) if token not in STOPWORDS]
+
+
+def normalize_question(text: str) -> str:
+    """Forma canônica de uma pergunta: sem acentos, caixa, pontuação e stopwords."""
+    tokens = content_tokens(text)
+    return " ".join(tokens) if tokens else " ".join(tokenize(text))
+
+
+# Sufixos removidos pelo stemming leve, do mais longo para o mais curto
+_STEM_SUFFIXES = (
+    "amento", "mente", "acoes", "aram", "eram", "iram", "ador", "adora", "acao",
+    "ada", "ado", "ida", "ido", "ava", "ou", "ao", "ar", "er", "ir",
+)
+
+
+def light_stem(token: str) -> str:
+    """
+    Stemming leve para português, usado nos índices de busca: remove plurais e sufixos comuns
+    ('fundou', 'fundada', 'fundadores' -> 'fund'; 'jogos', 'jogador' -> 'jog').
+    """
+    if len(token) > 5 and token.endswith("oes"):
+        token = token[:-3] + "ao"
+    for suffix in ("adores", "adoras"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    for suffix in _STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    if len(token) > 3 and token[-1] in "aeo":
+        return token[:-1]
+    return token
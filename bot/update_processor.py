@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, Awaitable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def chat_key(update: object) -> object:
+    """Chave de ordenação do update: o chat (ou o usuário, se não houver chat); None se não houver nenhum."""
+    if isinstance(update, Update):
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return ("user", update.effective_user.id)
+    return None
+
+
+class ChatSerializedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processa updates de chats diferentes em paralelo (até 'max_concurrent_updates' ao mesmo
+    tempo), mas os updates de um mesmo chat um de cada vez e na ordem de chegada, para que o
+    estado do ConversationHandler de cada chat continue consistente.
+
+    A vez no chat é obtida antes da vaga global: um chat com muitas mensagens pendentes ocupa
+    no máximo uma vaga e não atrasa os demais.
+    """
+
+    __slots__ = ("_chat_locks",)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # chat -> (lock, quantidade de updates usando ou aguardando o lock)
+        self._chat_locks: dict[object, list] = {}
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = chat_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        entry = self._chat_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chat_locks[key]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
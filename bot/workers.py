@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+# --- Vários processos ---
+# Com BOT_WORKERS >= 2, o processo principal só recebe os updates (polling ou webhook) e os distribui
+# entre BOT_WORKERS processos pelo usuário: todos os updates de um usuário (no privado ou em grupos)
+# vão sempre para o mesmo worker, que os processa em ordem. O user_data e as conversas (por chat e
+# usuário) de cada usuário ficam em um único worker, que é o único a gravá-los; o histórico de
+# partidas e os caches da Serper e de respostas ficam em bancos SQLite compartilhados pelos workers.
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "0"))
+# Tempo que cada worker tem para terminar os updates em andamento ao parar
+WORKER_STOP_TIMEOUT = float(os.getenv("WORKER_STOP_TIMEOUT", "30"))
+ANSWER_CACHE_SHARED_PATH = "furia_bot_data/answer_cache.sqlite3"
+
+_STOP = None
+
+
+def shard_of(update: Update, workers: int) -> int:
+    """
+    Worker responsável pelo update: o mesmo para todos os updates do usuário (ou do chat, nos
+    updates sem usuário). Com o chat, um usuário que fala com o bot no privado e em um grupo
+    cairia em dois workers, e cada um regravaria o user_data dele por cima do outro.
+    """
+    if update.effective_user is not None:
+        return update.effective_user.id % workers
+    if update.effective_chat is not None:
+        return update.effective_chat.id % workers
+    return 0
+
+
+def configure_worker_environment(workers: int) -> None:
+    """
+    Ajusta as variáveis de ambiente herdadas pelos workers (precisa rodar antes de iniciá-los):
+    o limite global de envio do Telegram vale para o bot inteiro e é dividido entre eles, e o
+    cache de respostas passa a ser compartilhado em SQLite.
+    """
+    from bot.notifications import FANOUT_RATE
+    from bot.rate_limiter import TELEGRAM_GLOBAL_RATE
+
+    os.environ["TELEGRAM_GLOBAL_RATE"] = str(TELEGRAM_GLOBAL_RATE / workers)
+    # Os avisos saem só pelo primeiro worker, dentro da parte dele do limite global
+    os.environ["FANOUT_RATE"] = str(FANOUT_RATE / workers)
+    os.environ.setdefault("ANSWER_CACHE_DB_PATH", ANSWER_CACHE_SHARED_PATH)
+
+
+class WorkerPool:
+    """
+    Processos que executam a aplicação completa do bot, cada um com a sua fila de updates.
+
+    O processo principal entrega cada update (serializado em JSON) à fila do worker do seu usuário
+    (ver shard_of); a ordem dos updates de um usuário é a ordem de chegada na fila. Um worker que
+    morre é iniciado de novo no próximo update destinado a ele (os updates que ele estava
+    processando se perdem, como em uma queda do bot com um único processo).
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._context = multiprocessing.get_context("spawn")
+        self._queues = [self._context.Queue() for _ in range(workers)]
+        self._ready = [self._context.Event() for _ in range(workers)]
+        self._processes: list[multiprocessing.Process | None] = [None] * workers
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=_worker_main, args=(index, self._queues[index], self._ready[index]), name=f"furia-worker-{index}"
+        )
+        process.start()
+        self._processes[index] = process
+        logger.info(f"Worker {index} iniciado (pid {process.pid}).")
+
+    def start(self) -> None:
+        configure_worker_environment(self.workers)
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Aguarda até que todos os workers estejam recebendo updates."""
+        return all(ready.wait(timeout) for ready in self._ready)
+
+    def submit(self, update: Update) -> None:
+        """Entrega o update ao worker do seu usuário."""
+        index = shard_of(update, self.workers)
+        process = self._processes[index]
+        if process is None or not process.is_alive():
+            logger.error(f"Worker {index} parado (código {process.exitcode if process else None}); reiniciando...")
+            self._spawn(index)
+        self._queues[index].put(update.to_json())
+
+    def stop(self) -> None:
+        """Pede que os workers terminem os updates pendentes e aguarda que eles encerrem."""
+        for queue, process in zip(self._queues, self._processes):
+            if process is not None and process.is_alive():
+                queue.put(_STOP)
+        for index, process in enumerate(self._processes):
+            if process is None:
+                continue
+            process.join(WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                logger.warning(f"Worker {index} não encerrou em {WORKER_STOP_TIMEOUT:.0f}s; finalizando à força.")
+                process.terminate()
+                process.join()
+        logger.info("Workers finalizados.")
+
+
+async def forward_update(update: Update, context) -> None:
+    """Handler do processo principal: repassa o update ao worker do usuário."""
+    context.application.bot_data["worker_pool"].submit(update)
+
+
+def _worker_main(index: int, updates: multiprocessing.Queue, ready) -> None:
+    # Ctrl+C chega a todo o grupo de processos: quem encerra os workers é o processo principal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Importado aqui: bot.main importa este módulo
+    from bot.knowledge_index import get_knowledge_index
+    from bot.main import build_application
+
+    get_knowledge_index()
+    asyncio.run(_serve(build_application(worker_index=index), index, updates, ready))
+
+
+async def _serve(application, index: int, updates: multiprocessing.Queue, ready) -> None:
+    """Executa a aplicação sem Updater: os updates chegam pela fila do worker."""
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stopped.set)
+
+    def enqueue(payload: str) -> None:
+        application.update_queue.put_nowait(Update.de_json(json.loads(payload), application.bot))
+
+    def read_updates() -> None:
+        while (payload := updates.get()) is not _STOP:
+            loop.call_soon_threadsafe(enqueue, payload)
+        loop.call_soon_threadsafe(stopped.set)
+
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        threading.Thread(target=read_updates, name=f"worker-{index}-updates", daemon=True).start()
+        ready.set()
+        logger.info(f"Worker {index} pronto.")
+        await stopped.wait()
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+    finally:
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+    logger.info(f"Worker {index} finalizado.")
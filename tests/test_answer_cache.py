@@ -0,0 +1,31 @@
+import unittest
+
+from bot.answer_cache import AnswerCache
+
+
+class NearDuplicateTest(unittest.TestCase):
+    """Perguntas quase iguais no texto, mas com número ou nome diferente, não compartilham a resposta."""
+
+    def setUp(self):
+        self.cache = AnswerCache()
+
+    def test_different_year_is_a_miss(self):
+        self.cache.put("Quem era o AWPer da FURIA em 2023?", "resposta de 2023")
+        self.assertIsNone(self.cache.get("Quem era o AWPer da FURIA em 2024?"))
+
+        self.cache.put("Quantos títulos a FURIA ganhou em 2022?", "resposta de 2022")
+        self.assertIsNone(self.cache.get("Quantos títulos a FURIA ganhou em 2019?"))
+
+    def test_different_player_is_a_miss(self):
+        self.cache.put("Quantos anos tem o KSCERATO?", "idade do KSCERATO")
+        self.assertIsNone(self.cache.get("Quantos anos tem o yuurih?"))
+
+    def test_spelling_variation_is_a_hit(self):
+        self.cache.put("Quem é o técnico do time de Valorant da FURIA?", "o técnico")
+        self.assertEqual(self.cache.get("quem e o tecnico do time de valorant da furia"), "o técnico")
+        self.assertEqual(self.cache.get("Quem é o técnico do time de Valorrant da FURIA?"), "o técnico")
+        self.assertEqual(self.cache.stats["near_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()